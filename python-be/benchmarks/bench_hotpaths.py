@@ -0,0 +1,335 @@
+"""
+Microbenchmarks for the backend hot paths, offline: SQLite instead of MySQL,
+and a fake HTTP session and Speech SDK instead of the providers.
+
+Cases: translate_text (payload build, guard, parse), transcribe_audio (VAD,
+chunking and the STT calls), convert_to_wav (ffmpeg; skipped when it is
+missing), the recap endpoint over 10k turns, voice list post-processing,
+to_dict + JSON of 10k turns and 1k sessions, and PUT /languages/bulk with
+500 items.
+
+Prints a JSON summary. Medians are compared with benchmarks/baselines.json;
+a case slower than its baseline by more than ``--threshold`` is a
+regression and the exit status is 1. Baselines are machine specific:
+refresh them with ``--update`` on the machine that runs the check.
+
+    python benchmarks/bench_hotpaths.py --runs 5
+    python benchmarks/bench_hotpaths.py --only recap_10k_turns --update
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC = BENCH_DIR.parent / "src"
+BASELINES = BENCH_DIR / "baselines.json"
+# Below this, differences are timer noise rather than regressions
+NOISE_MS = 0.5
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-hotpaths-")
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(WORKDIR, "cache"))
+os.environ.setdefault("VOICE_CATALOG_PATH", os.path.join(WORKDIR, "voices.json"))
+sys.path.insert(0, str(SRC))
+
+import numpy as np  # noqa: E402
+
+from app import create_app  # noqa: E402
+from config import MODEL_URL_MAP  # noqa: E402
+from db.migrate import run_migrations  # noqa: E402
+from db.sql import db  # noqa: E402
+from models.language import LanguageSetting  # noqa: E402
+from models.session import Session  # noqa: E402
+from models.translation import Translation  # noqa: E402
+from services import http_client  # noqa: E402
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+class FakeResponse:
+    def __init__(self, body: dict):
+        self.status_code = 200
+        self._body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession:
+    """Answers every provider call at once, after reading the request body."""
+
+    def post(self, url, json=None, data=None, files=None, **kwargs):
+        if hasattr(data, "read"):
+            data.read()
+        for _, (_, fp) in (files or {}).items():
+            fp.read()
+        if "speech" in url:
+            return FakeResponse({"DisplayText": "Hello there, how can I help you?"})
+        if "transcriptions" in url:
+            return FakeResponse({"text": "Hello there, how can I help you?"})
+        return FakeResponse(
+            {"choices": [{"message": {"content": "Hej, hvordan kan jeg hjælpe dig?"}}]}
+        )
+
+
+def _speech_wav(path: str, seconds: float, rate: int = 16000, channels: int = 1) -> None:
+    """Bursts of tone ('speech') separated by quiet noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    speech = (np.sin(2 * np.pi * 220 * t) * ((t % 2.0) < 1.4)) * 8000
+    samples = (speech + rng.normal(0, 30, t.size)).astype(np.int16)
+    with wave.open(path, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(np.repeat(samples, channels).tobytes())
+
+
+def _fake_voices(count: int = 600) -> SimpleNamespace:
+    import azure.cognitiveservices.speech as speechsdk
+
+    locales = ["da-DK", "en-GB", "en-US", "de-DE", "fr-FR", "uk-UA", "ar-SA", "tr-TR"]
+    locales += [f"{lang}-{region}" for lang in ("es", "pt", "nl", "sv", "pl", "ro")
+                for region in ("ES", "PT", "NL", "SE", "PL", "RO", "MX", "BR")]
+    voices = [
+        SimpleNamespace(
+            name=f"Microsoft Server Speech Text to Speech Voice ({loc}, Voice{i}Neural)",
+            short_name=f"{loc}-Voice{i}Neural",
+            locale=loc,
+            local_name=f"Voice {i}",
+            gender=speechsdk.SynthesisVoiceGender.Female,
+            voice_type=speechsdk.SynthesisVoiceType.OnlineNeural,
+        )
+        for i in range(count)
+        for loc in [locales[i % len(locales)]]
+    ]
+    return SimpleNamespace(reason=speechsdk.ResultReason.VoicesListRetrieved, voices=voices)
+
+
+# ---- cases: each sets up its data and returns the callable to time ---------
+
+
+def case_translate_text(app):
+    from services.translation_service import translate_text
+
+    def run():
+        for i in range(200):
+            translate_text(f"Good morning, this is message {i}.", "gpt4o-mini", "en-GB", "da-DK")
+
+    return run
+
+
+def case_transcribe_audio(app):
+    from services.transcription_service import transcribe_audio
+
+    path = os.path.join(WORKDIR, "clip.wav")
+    _speech_wav(path, 60)
+    return lambda: transcribe_audio(path, "azure_speech", "en-GB")
+
+
+def case_convert_to_wav(app):
+    import shutil
+
+    from services.transcription_service import convert_to_wav
+
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg not installed")
+    src = os.path.join(WORKDIR, "clip-44k.wav")
+    _speech_wav(src, 20, rate=44100, channels=2)
+    return lambda: convert_to_wav(src, os.path.join(WORKDIR, "clip-16k.wav"))
+
+
+def case_recap_10k_turns(app):
+    client = app.test_client()
+    with app.app_context():
+        db.session.add(LanguageSetting(code="en-GB", enabled=True, summary_model="gpt4o-mini"))
+        session = Session(language_a="en-GB", language_b="da-DK")
+        db.session.add(session)
+        db.session.flush()
+        db.session.add_all(
+            Translation(
+                session_id=session.id,
+                from_lang="en-GB" if i % 2 else "da-DK",
+                to_lang="da-DK" if i % 2 else "en-GB",
+                original=f"This is turn number {i} of a long conversation.",
+                translated=f"Dette er tur nummer {i} i en lang samtale.",
+            )
+            for i in range(10_000)
+        )
+        db.session.commit()
+        url = f"/api/v1/sessions/recap?session_id={session.id}"
+
+    def run():
+        response = client.get(url, headers=API_KEY_HEADER)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    return run
+
+
+def case_list_voices(app):
+    import azure.cognitiveservices.speech as speechsdk
+
+    from services import voices
+
+    result = _fake_voices()
+    synthesizer = SimpleNamespace(
+        get_voices_async=lambda: SimpleNamespace(get=lambda: result)
+    )
+
+    def run():
+        with mock.patch.object(voices, "make_speech_config"), mock.patch.object(
+            speechsdk, "SpeechSynthesizer", return_value=synthesizer
+        ):
+            voices.VoiceCatalog(voices._fetch_voices(), time.time())
+
+    return run
+
+
+def case_to_dict_10k(app):
+    from datetime import datetime
+
+    turns = [
+        Translation(
+            id=i,
+            session_id="s",
+            from_lang="en-GB",
+            to_lang="da-DK",
+            original=f"Turn {i}",
+            translated=f"Tur {i}",
+            created_at=datetime(2025, 1, 1),
+        )
+        for i in range(10_000)
+    ]
+    sessions = [Session(id=str(i), language_a="en-GB", language_b="da-DK") for i in range(1000)]
+    return lambda: json.dumps(
+        {"turns": [t.to_dict() for t in turns], "sessions": [s.to_dict() for s in sessions]}
+    )
+
+
+def case_languages_bulk_500(app):
+    client = app.test_client()
+    items = [
+        {
+            "code": f"x{i:03d}-XX",
+            "enabled": i % 3 == 0,
+            "voice": f"x{i:03d}-XX-VoiceNeural",
+            "translation_model": "gpt4o-mini",
+        }
+        for i in range(500)
+    ]
+
+    def run():
+        response = client.put("/api/v1/languages/bulk", json=items, headers=API_KEY_HEADER)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    return run
+
+
+CASES = {
+    "translate_text_200": case_translate_text,
+    "transcribe_audio_60s": case_transcribe_audio,
+    "convert_to_wav_20s": case_convert_to_wav,
+    "recap_10k_turns": case_recap_10k_turns,
+    "list_voices_600": case_list_voices,
+    "to_dict_10k": case_to_dict_10k,
+    "languages_bulk_500": case_languages_bulk_500,
+}
+
+
+def _summary(values: list[float]) -> dict:
+    ms = sorted(v * 1000 for v in values)
+    return {
+        "min_ms": round(ms[0], 2),
+        "median_ms": round(statistics.median(ms), 2),
+        "max_ms": round(ms[-1], 2),
+    }
+
+
+def _measure(build, app, runs: int) -> dict:
+    try:
+        run = build(app)
+    except Exception as e:
+        return {"skipped": str(e)}
+    # The first call pays imports and fills caches
+    run()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return _summary(samples)
+
+
+def _compare(results: dict, baselines: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name, {}).get("median_ms")
+        if baseline is None or "median_ms" not in result:
+            continue
+        limit = baseline * (1 + threshold) + NOISE_MS
+        result["baseline_ms"] = baseline
+        result["change"] = f"{result['median_ms'] / baseline - 1:+.0%}"
+        if result["median_ms"] > limit:
+            regressions.append(f"{name}: {result['median_ms']} ms > {limit:.2f} ms")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--only", action="append", choices=sorted(CASES))
+    parser.add_argument(
+        "--threshold", type=float, default=None,
+        help="allowed slowdown over the baseline median (default: from baselines.json)",
+    )
+    parser.add_argument("--update", action="store_true", help="write the medians as baselines")
+    args = parser.parse_args()
+
+    stored = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    threshold = args.threshold if args.threshold is not None else stored.get("threshold", 0.25)
+    baselines = stored.get("cases", {})
+
+    MODEL_URL_MAP.clear()
+    MODEL_URL_MAP.update(
+        {
+            "gpt4o-mini": "https://bench.invalid/openai/deployments/gpt4o-mini/chat",
+            "azure_speech": "https://bench.invalid/speech/recognition",
+        }
+    )
+    http_client._session, http_client._session_pid = FakeSession(), os.getpid()
+
+    app = create_app(
+        {"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{WORKDIR}/bench.db"}
+    )
+    with app.app_context():
+        run_migrations()
+
+    results = {
+        name: _measure(CASES[name], app, args.runs) for name in (args.only or CASES)
+    }
+    regressions = _compare(results, baselines, threshold)
+    print(json.dumps({"runs": args.runs, "threshold": threshold, "cases": results}, indent=2))
+
+    if args.update:
+        for name, result in results.items():
+            if "median_ms" in result:
+                baselines[name] = {"median_ms": result["median_ms"]}
+        BASELINES.write_text(
+            json.dumps({"threshold": threshold, "cases": baselines}, indent=2) + "\n"
+        )
+    elif regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Cold-start benchmark: time to import the app module and to build the app.
+
+Each sample runs in a fresh interpreter so nothing is cached in
+``sys.modules``. Prints a JSON summary; ``--importtime`` also prints the ten
+slowest modules from ``python -X importtime``.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+_PROBE = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ, PYTHONPATH=str(SRC), PYTHONDONTWRITEBYTECODE="1")
+    # create_app must not need a reachable database
+    env.setdefault("MYSQL_HOST", "127.0.0.1")
+    return env
+
+
+def _sample() -> tuple[float, float]:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=SRC,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    return float(out[-2]), float(out[-1])
+
+
+def _slowest_imports(limit: int = 10) -> list[dict]:
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=SRC,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda r: -r["cumulative_ms"])[:limit]
+
+
+def _summary(values: list[float]) -> dict:
+    ms = sorted(v * 1000 for v in values)
+    return {
+        "min_ms": round(ms[0], 1),
+        "median_ms": round(statistics.median(ms), 1),
+        "max_ms": round(ms[-1], 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true")
+    args = parser.parse_args()
+
+    samples = [_sample() for _ in range(args.runs)]
+    result = {
+        "runs": args.runs,
+        "import_app": _summary([s[0] for s in samples]),
+        "create_app": _summary([s[1] for s in samples]),
+        "total": _summary([s[0] + s[1] for s in samples]),
+    }
+    if args.importtime:
+        result["slowest_imports"] = _slowest_imports()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+gunicorn settings: ``gunicorn -c gunicorn.conf.py 'src.app:create_app()'``.
+
+The app is preloaded: the master imports and warms it once, before binding
+the port, and the workers fork with libraries and caches already in memory.
+Each worker then warms its own connections before it accepts requests.
+See src/services/warmup.py.
+"""
+
+import os
+
+from services import warmup
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:80")
+# Threaded workers, so open session event streams do not each hold a process
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+preload_app = True
+
+# Background threads created while the app is imported would stay in the master
+warmup.mark_preloading()
+
+
+def on_starting(server):
+    warmup.warm_master()
+
+
+def post_fork(server, worker):
+    warmup.after_fork()
+
+
+def post_worker_init(worker):
+    warmup.warm_worker(worker.wsgi)
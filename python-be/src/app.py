@@ -13,13 +13,21 @@ import logging
 import os
 from pathlib import Path
 
-from dotenv import load_dotenv
 from flask import Flask, abort, request, send_from_directory
 from flask_cors import CORS
 from flask_restx import Api
 
 from auth import register_auth_check
 from db.sql import init_db
+from db.migrate import init_migrate
+from services.group_commit import init_group_commit
+from services.admission import register_admission_control
+from services.retention import init_retention
+from services.translation_memory import init_translation_memory
+from services.warmup import warm_worker
+from services.compression import init_compression
+from services.deadline import DeadlineExceeded, deadline_exceeded, init_deadlines
+from services.json_codec import FastJSONProvider, output_json
 from routes.misc import ns_misc
 from routes.sessions import ns_sessions
 from routes.languages import ns_languages
@@ -27,7 +35,6 @@ from routes.languages import ns_languages
 __version__ = "0.5.0‑debug"
 
 # ── basic setup ──────────────────────────────────────────────────────────────
-load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logging.info("🚀 running version %s of app.py", __version__)
 
@@ -49,32 +56,57 @@ CANDIDATE_STATIC_DIRS: list[Path] = [
 
 PRIMARY_STATIC = CANDIDATE_STATIC_DIRS[0]
 
-app = Flask(
-    __name__,
-    static_folder=str(PRIMARY_STATIC),
-    static_url_path="/static",  # expose assets at /static/…
-)
 
-CORS(
-    app,
-    resources={r"/api/v1/*": {"origins": "*"}},
-    allow_headers=["Content-Type", "x-api-key"],
-)
-
-init_db(app)
-register_auth_check(app)
-
-api = Api(
-    app,
-    title="Translator API",
-    version="1.0",
-    prefix="/api",
-    doc="/api/docs",
-)
-
-api.add_namespace(ns_misc, path="/v1/misc")
-api.add_namespace(ns_sessions, path="/v1/sessions")
-api.add_namespace(ns_languages, path="/v1/languages")
+def create_app(test_config: dict | None = None) -> Flask:
+    """
+    Application factory. Building the app opens no connections and creates
+    no tables – run ``flask migrate`` once per deploy for the schema.
+    """
+    app = Flask(
+        __name__,
+        static_folder=str(PRIMARY_STATIC),
+        static_url_path="/static",  # expose assets at /static/…
+    )
+    if test_config:
+        app.config.update(test_config)
+    app.json = FastJSONProvider(app)
+
+    CORS(
+        app,
+        resources={r"/api/v1/*": {"origins": "*"}},
+        allow_headers=["Content-Type", "x-api-key", "Idempotency-Key", "X-Request-Timeout"],
+        expose_headers=["Idempotent-Replayed"],
+    )
+
+    # Registered first so it runs after every other after_request hook
+    init_compression(app)
+    # Before the other request hooks, so admission queueing counts too
+    init_deadlines(app)
+    init_db(app)
+    init_migrate(app)
+    init_group_commit(app)
+    init_retention(app)
+    init_translation_memory(app)
+    register_auth_check(app)
+    register_admission_control(app)
+
+    api = Api(
+        app,
+        title="Translator API",
+        version="1.0",
+        prefix="/api",
+        doc="/api/docs",
+    )
+    api.representation("application/json")(output_json)
+    api.errorhandler(DeadlineExceeded)(deadline_exceeded)
+
+    api.add_namespace(ns_misc, path="/v1/misc")
+    api.add_namespace(ns_sessions, path="/v1/sessions")
+    api.add_namespace(ns_languages, path="/v1/languages")
+
+    app.add_url_rule("/", "spa", spa, defaults={"path": ""})
+    app.add_url_rule("/<path:path>", "spa", spa)
+    return app
 
 
 # ── helpers ──────────────────────────────────────────────────────────────────
@@ -90,9 +122,7 @@ def _log_candidate(kind: str, target: Path, exists: bool) -> None:
 #     )
 
 
-# ── SPA / asset catch‑all ────────────────────────────────────────────────────
-@app.route("/", defaults={"path": ""})
-@app.route("/<path:path>")
+# ── SPA / asset catch‑all (registered in create_app) ─────────────────────────
 def spa(path: str):
     """
     • /api/* handled by blueprints.
@@ -135,4 +165,6 @@ if __name__ == "__main__":
 
     port = int(os.getenv("PORT", 80))
     logging.info("Starting Flask dev server on port %s", port)
-    app.run(host="0.0.0.0", port=port, debug=True)
+    dev_app = create_app()
+    warm_worker(dev_app)
+    dev_app.run(host="0.0.0.0", port=port, debug=True)
@@ -1,11 +1,14 @@
 import os
+import time
+import hashlib
 import logging
-import requests
+import threading
+
 from flask import request, make_response, jsonify
-from jose import jwt
-from dotenv import load_dotenv
 
-load_dotenv()
+import config  # noqa: F401  (loads .env before the settings below are read)
+from services.shared_cache import get_cache
+
 logger = logging.getLogger(__name__)
 
 # Load from environment
@@ -16,26 +19,157 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 JWKS_URL = f"https://login.microsoftonline.com/{TENANT_ID}/discovery/v2.0/keys"
 ISSUER = f"https://login.microsoftonline.com/{TENANT_ID}/v2.0"
 
-# cache JWKS keys
+# JWKS refresh behaviour
+JWKS_TTL_SECONDS = float(os.getenv("JWKS_TTL_SECONDS", 3600))
+JWKS_TIMEOUT_SECONDS = float(os.getenv("JWKS_TIMEOUT_SECONDS", 5))
+# Lower bound between two fetches, so unknown kids cannot hammer the endpoint
+JWKS_MIN_REFRESH_SECONDS = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", 30))
+
+# Verified-token cache
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 1024))
+JWT_CACHE_MAX_SECONDS = float(os.getenv("JWT_CACHE_MAX_SECONDS", 3600))
+
+# cache JWKS keys (raw document + kid -> key index)
 _jwks_cache = None
+_jwks_by_kid: dict[str, dict] = {}
+_jwks_fetched_at = 0.0
+_jwks_lock = threading.Lock()
+_jwks_refresher_pid = None
+# The last document fetched by any worker on this host
+_jwks_shared = get_cache("jwks", max_items=1, ttl=JWKS_TTL_SECONDS)
+
+# sha256(token) hex -> claims, shared by the workers of a host
+_claims_cache = get_cache("jwt-claims", max_items=JWT_CACHE_SIZE)
+
+
+def _use_jwks(document: dict, fetched_at: float) -> None:
+    """Install ``document`` (fetched at wall-clock ``fetched_at``) as this worker's keys."""
+    global _jwks_cache, _jwks_by_kid, _jwks_fetched_at
+
+    _jwks_by_kid = {k["kid"]: k for k in document.get("keys", []) if "kid" in k}
+    _jwks_cache = document
+    _jwks_fetched_at = time.monotonic() - max(0.0, time.time() - fetched_at)
+
+
+def refresh_jwks(force: bool = False) -> None:
+    """
+    Fetch the JWKS document and rebuild the kid index.
+
+    Concurrent callers are coalesced: whoever gets the lock first does the
+    fetch, everybody who was waiting on it reuses that result. A document
+    another worker fetched more recently than ours is adopted instead.
+    """
+    seen_at = _jwks_fetched_at
+    with _jwks_lock:
+        if _jwks_fetched_at != seen_at:
+            return  # someone refreshed while we waited
+        age = time.monotonic() - _jwks_fetched_at
+        if _jwks_cache is not None:
+            if not force and age < JWKS_TTL_SECONDS:
+                return
+            if age < JWKS_MIN_REFRESH_SECONDS:
+                return
 
+        shared = _jwks_shared.get("document")
+        if shared is not None:
+            shared_age = time.time() - shared["fetched_at"]
+            newer = _jwks_cache is None or shared_age < age
+            # A forced refresh (unknown kid) only trusts a sibling's very recent fetch
+            if newer and (not force or shared_age < JWKS_MIN_REFRESH_SECONDS):
+                _use_jwks(shared["document"], shared["fetched_at"])
+                return
 
-def get_jwks_keys():
-    global _jwks_cache
-    if _jwks_cache is None:
-        resp = requests.get(JWKS_URL)
+        import requests
+
+        resp = requests.get(JWKS_URL, timeout=JWKS_TIMEOUT_SECONDS)
         resp.raise_for_status()
-        _jwks_cache = resp.json()
+        document = resp.json()
+
+        fetched_at = time.time()
+        _use_jwks(document, fetched_at)
+        _jwks_shared.set("document", {"document": document, "fetched_at": fetched_at})
+        logger.info("JWKS refreshed: %d keys", len(_jwks_by_kid))
+
+
+def _jwks_refresh_loop() -> None:
+    while True:
+        time.sleep(JWKS_TTL_SECONDS)
+        try:
+            # Not forced: a document a sibling worker just fetched will do
+            refresh_jwks()
+        except Exception as e:
+            logger.warning("Background JWKS refresh failed: %s", str(e))
+
+
+def _ensure_jwks_refresher() -> None:
+    """Start the background refresher once per process (also after a fork)."""
+    global _jwks_refresher_pid
+    if _jwks_refresher_pid == os.getpid():
+        return
+    with _jwks_lock:
+        if _jwks_refresher_pid == os.getpid():
+            return
+        _jwks_refresher_pid = os.getpid()
+        threading.Thread(
+            target=_jwks_refresh_loop, name="jwks-refresh", daemon=True
+        ).start()
+
+
+def get_jwks_keys():
+    _ensure_jwks_refresher()
+    if _jwks_cache is None or time.monotonic() - _jwks_fetched_at >= JWKS_TTL_SECONDS:
+        try:
+            refresh_jwks()
+        except Exception:
+            # Serve the stale document rather than failing every request
+            if _jwks_cache is None:
+                raise
+            logger.warning("JWKS refresh failed, using cached keys", exc_info=True)
     return _jwks_cache
 
 
+def get_signing_key(kid):
+    get_jwks_keys()
+    key = _jwks_by_kid.get(kid)
+    if key is None:
+        # Unknown kid usually means the keys were rotated: refresh once
+        refresh_jwks(force=True)
+        key = _jwks_by_kid.get(kid)
+    if key is None:
+        raise LookupError("Public key not found.")
+    return key
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _cached_claims(digest: bytes):
+    return _claims_cache.get(digest.hex())
+
+
+def _remember_claims(digest: bytes, claims: dict, now: float) -> None:
+    expires_at = now + JWT_CACHE_MAX_SECONDS
+    if "exp" in claims:
+        expires_at = min(expires_at, float(claims["exp"]))
+    if expires_at <= now:
+        return
+    _claims_cache.set(digest.hex(), claims, ttl=expires_at - now)
+
+
 def validate_jwt_token(token):
-    keys = get_jwks_keys()
-    header = jwt.get_unverified_header(token)
+    digest = _token_digest(token)
+    now = time.time()
 
-    key = next((k for k in keys["keys"] if k["kid"] == header["kid"]), None)
-    if not key:
-        raise Exception("Public key not found.")
+    claims = _cached_claims(digest)
+    if claims is not None:
+        return claims
+
+    # python-jose pulls in cryptography; only load it once a token shows up
+    from jose import jwt
+
+    header = jwt.get_unverified_header(token)
+    key = get_signing_key(header.get("kid"))
 
     payload = jwt.decode(
         token,
@@ -45,6 +179,7 @@ def validate_jwt_token(token):
         issuer=ISSUER,
     )
 
+    _remember_claims(digest, payload, now)
     return payload
 
 
@@ -61,6 +196,7 @@ def register_auth_check(app):
             or request.path.startswith("/api/docs")
             or request.path.startswith("/api/swagger")
             or request.path.startswith("/api/v1/misc/ping")
+            or request.path.startswith("/api/v1/misc/ready")
             or request.path.startswith("/swagger")
             or request.path.startswith("/swaggerui")
             or request.path.startswith("/openapi")
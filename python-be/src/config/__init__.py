@@ -10,6 +10,98 @@ from .config import (
     STATUS_ONGOING,
     STATUS_FINISHED,
     DEFAULT_AUDIO_PATH,
-    AZURE_SPEECH_REGION
+    AZURE_SPEECH_REGION,
+    VOICE_CATALOG_PATH,
+    VOICE_CATALOG_TTL_SECONDS,
+    GENERATION_POLL_SECONDS,
+    GROUP_COMMIT_ENABLED,
+    GROUP_COMMIT_WINDOW_MS,
+    GROUP_COMMIT_MAX_BATCH,
+    GROUP_COMMIT_TIMEOUT_SECONDS,
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_POOL_WAIT_MS,
+    ADMISSION_MAX_INFLIGHT_LLM,
+    ADMISSION_LISTING_SHARE,
+    ADMISSION_QUEUE_SECONDS,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    RETENTION_ENABLED,
+    RETENTION_ARCHIVE_AFTER_DAYS,
+    RETENTION_ABANDONED_AFTER_HOURS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_BATCH_PAUSE_SECONDS,
+    RETENTION_INTERVAL_SECONDS,
+    SEARCH_BACKEND,
+    TRANSLATION_HEDGE_ENABLED,
+    TRANSLATION_HEDGE_PERCENTILE,
+    TRANSLATION_HEDGE_MIN_DELAY_MS,
+    TRANSLATION_HEDGE_MAX_DELAY_MS,
+    TRANSLATION_HEDGE_FALLBACKS,
+    TRANSLATION_TIMEOUT_SECONDS,
+    BREAKER_ENABLED,
+    BREAKER_WINDOW_SECONDS,
+    BREAKER_MIN_CALLS,
+    BREAKER_ERROR_RATE,
+    BREAKER_SLOW_CALL_SECONDS,
+    BREAKER_SLOW_CALL_RATE,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_HALF_OPEN_CALLS,
+    PROVIDER_MAX_CONCURRENCY,
+    PROVIDER_CONCURRENCY,
+    PROVIDER_QUEUE_SECONDS,
+    TRANSCRIPTION_TIMEOUT_SECONDS,
+    RECAP_TIMEOUT_SECONDS,
+    TTS_TIMEOUT_SECONDS,
+    RATE_LIMITS,
+    RATE_LIMIT_BURST_SECONDS,
+    RATE_LIMIT_QUEUE_SECONDS,
+    RATE_LIMIT_WORKERS,
+    TM_ENABLED,
+    TM_SERVE_THRESHOLD,
+    TM_EXAMPLE_THRESHOLD,
+    TM_MAX_EXAMPLES,
+    TM_MAX_ROWS,
+    TM_REFRESH_SECONDS,
+    VAD_ENABLED,
+    VAD_FRAME_MS,
+    VAD_MARGIN_DB,
+    VAD_FLOOR_DB,
+    VAD_PAD_MS,
+    VAD_MIN_SPEECH_MS,
+    VAD_MAX_PAUSE_MS,
+    TRANSCRIBE_CHUNK_SECONDS,
+    TRANSCRIBE_CHUNK_OVERLAP_SECONDS,
+    TRANSCRIBE_PARALLELISM,
+    CHANNEL_BACKEND,
+    CHANNEL_REDIS_URL,
+    CHANNEL_KEEPALIVE_SECONDS,
+    CHANNEL_STREAM_SECONDS,
+    CHANNEL_QUEUE_SIZE,
+    CHANNEL_MAX_STREAMS,
+    SHARED_CACHE_ENABLED,
+    SHARED_CACHE_PATH,
+    SHARED_CACHE_SLOTS,
+    SHARED_CACHE_SLOT_BYTES,
+    SHARED_CACHE_WAYS,
+    WARMUP_ENABLED,
+    WARMUP_TIMEOUT_SECONDS,
+    DB_BACKEND,
+    SQLITE_PATH,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_MB,
+    DB_REPLICA_URL,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_STICKY_SECONDS,
+    DB_REPLICA_CHECK_SECONDS,
+    COMPRESSION_ENABLED,
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    IDEMPOTENCY_ENABLED,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS,
+    REQUEST_DEADLINE_ENABLED,
+    REQUEST_DEADLINE_SECONDS,
+    REQUEST_DEADLINE_MAX_SECONDS,
+    REQUEST_DEADLINES,
 )
 from .languages import LANGUAGES
@@ -1,5 +1,10 @@
 import os
 
+from dotenv import load_dotenv
+
+# The one place .env is loaded; modules reading os.environ import config first
+load_dotenv()
+
 PROMTE_WHISPER_URL = os.getenv("PROMTE_WHISPER")
 PROMTE_4O_URL = os.getenv("PROMTE_4O")
 PROMTE_API_KEY = os.getenv("PROMTE_API_KEY")
@@ -17,6 +22,213 @@ AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
 AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION")
 AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_KEY")
 
+# Per-user directory for files shared by the workers of a host (tmpfs by
+# default); it must be private to the user (mode 0700) and is created if missing
+_RUNTIME_DIR = os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp", f"translator-{os.geteuid()}"
+)
+
+# Voice catalog snapshot shared by all workers on a host; its directory must
+# be private to the user, like _RUNTIME_DIR
+VOICE_CATALOG_PATH = os.getenv("VOICE_CATALOG_PATH", os.path.join(_RUNTIME_DIR, "voices.json"))
+VOICE_CATALOG_TTL_SECONDS = float(os.getenv("VOICE_CATALOG_TTL_SECONDS", 24 * 3600))
+
+# Cache tier shared by the worker processes of a host: a memory-mapped file
+# (tmpfs by default) of SHARED_CACHE_SLOTS slots, SHARED_CACHE_WAYS per set.
+# Keep slots x slot bytes within the tmpfs size (Docker's /dev/shm: 64 MB).
+# The file's directory must be private to the user, like _RUNTIME_DIR
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true"
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(_RUNTIME_DIR, "cache"))
+SHARED_CACHE_SLOTS = int(os.getenv("SHARED_CACHE_SLOTS", 512))
+# Values larger than a slot stay in the worker's own tier
+SHARED_CACHE_SLOT_BYTES = int(os.getenv("SHARED_CACHE_SLOT_BYTES", 64 * 1024))
+SHARED_CACHE_WAYS = int(os.getenv("SHARED_CACHE_WAYS", 8))
+
+# How long a worker trusts its copy of a cache generation counter before
+# re-reading it from the database (writes in the same worker apply at once)
+GENERATION_POLL_SECONDS = float(os.getenv("GENERATION_POLL_SECONDS", 2))
+
+# Warm-up before a worker takes traffic (see gunicorn.conf.py); readiness
+# reports 503 until it is done. Keep the timeout below gunicorn's --timeout
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 20))
+
+# Database: "mysql" (MYSQL_* settings, see db/sql.py) or "sqlite", an embedded
+# file at SQLITE_PATH for single-node deployments (see db/sqlite.py)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/translator.db")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", 64))
+
+# Optional read replica: GET requests read from it (see db/replica.py)
+DB_REPLICA_URL = os.getenv("DB_REPLICA_URL")
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 5))
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", 10))
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", 1))
+
+# Group commit for /sessions/translate writes (off by default, on for SQLite)
+GROUP_COMMIT_ENABLED = os.getenv(
+    "GROUP_COMMIT_ENABLED", "true" if DB_BACKEND == "sqlite" else "false"
+).lower() == "true"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", 5))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("GROUP_COMMIT_TIMEOUT_SECONDS", 10))
+
+# Admission control: shed load with 429 once the DB pool or model calls saturate
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_POOL_WAIT_MS = float(os.getenv("ADMISSION_MAX_POOL_WAIT_MS", 250))
+ADMISSION_MAX_INFLIGHT_LLM = int(os.getenv("ADMISSION_MAX_INFLIGHT_LLM", 16))
+# Listing endpoints are shed once load reaches this share of the limits above
+ADMISSION_LISTING_SHARE = float(os.getenv("ADMISSION_LISTING_SHARE", 0.5))
+# How long interactive requests may queue for capacity before getting a 429
+ADMISSION_QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", 2))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 2))
+
+# Response compression negotiated from Accept-Encoding: brotli when the
+# module is installed, else gzip; smaller bodies are sent uncompressed
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+# Idempotency-Key support for /sessions/translate and /sessions/tts: a retry
+# with the same key within IDEMPOTENCY_TTL_SECONDS gets the first response.
+# A request identical to one still running waits up to
+# IDEMPOTENCY_WAIT_SECONDS for it; keep this above the slowest request
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 600))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 90))
+
+# Request deadlines: each API request's time budget in seconds, per endpoint
+# as endpoint=seconds pairs (0: none), else REQUEST_DEADLINE_SECONDS. Clients
+# may ask for their own with X-Request-Timeout, up to the max
+REQUEST_DEADLINE_ENABLED = os.getenv("REQUEST_DEADLINE_ENABLED", "true").lower() == "true"
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 30))
+REQUEST_DEADLINE_MAX_SECONDS = float(os.getenv("REQUEST_DEADLINE_MAX_SECONDS", 120))
+REQUEST_DEADLINES = {
+    endpoint: float(seconds)
+    for endpoint, seconds in (
+        pair.split("=", 1)
+        for pair in os.getenv(
+            "REQUEST_DEADLINES",
+            "sessions_translate=60,sessions_speech_to_speech=90,sessions_recap=90,"
+            "sessions_text_to_speech=20,sessions_session_events=0,"
+            "sessions_export_conversations=0",
+        ).split(",")
+        if "=" in pair
+    )
+}
+
+# Retention: archive old sessions, purge abandoned ones
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+RETENTION_ARCHIVE_AFTER_DAYS = float(os.getenv("RETENTION_ARCHIVE_AFTER_DAYS", 90))
+RETENTION_ABANDONED_AFTER_HOURS = float(os.getenv("RETENTION_ABANDONED_AFTER_HOURS", 24))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", 200))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", 0.2))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", 3600))
+
+# Hedged translation: if the primary model has not answered within its
+# TRANSLATION_HEDGE_PERCENTILE latency, send the same request to a fallback
+TRANSLATION_HEDGE_ENABLED = os.getenv("TRANSLATION_HEDGE_ENABLED", "false").lower() == "true"
+TRANSLATION_HEDGE_PERCENTILE = float(os.getenv("TRANSLATION_HEDGE_PERCENTILE", 95))
+# Delay bounds; the max is also used until enough latencies are recorded
+TRANSLATION_HEDGE_MIN_DELAY_MS = float(os.getenv("TRANSLATION_HEDGE_MIN_DELAY_MS", 250))
+TRANSLATION_HEDGE_MAX_DELAY_MS = float(os.getenv("TRANSLATION_HEDGE_MAX_DELAY_MS", 3000))
+# primary=fallback pairs; both must be present in MODEL_URL_MAP
+TRANSLATION_HEDGE_FALLBACKS = dict(
+    pair.split("=", 1)
+    for pair in os.getenv(
+        "TRANSLATION_HEDGE_FALLBACKS",
+        "gpt4o-mini=promte_4o,gpt35=gpt4o-mini,promte_4o=gpt4o-mini",
+    ).split(",")
+    if "=" in pair
+)
+TRANSLATION_TIMEOUT_SECONDS = float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", 60))
+
+# Per-provider circuit breakers (keyed by model key, e.g. "promte_4o")
+BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", 60))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 10))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", 0.5))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", 15))
+BREAKER_SLOW_CALL_RATE = float(os.getenv("BREAKER_SLOW_CALL_RATE", 0.8))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 30))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", 1))
+# Bulkheads: concurrent calls per provider in one worker, with per-provider
+# overrides as key=limit pairs, and how long a call may wait for a slot
+PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", 8))
+PROVIDER_CONCURRENCY = {
+    key: int(limit)
+    for key, limit in (
+        pair.split("=", 1)
+        for pair in os.getenv("PROVIDER_CONCURRENCY", "").split(",")
+        if "=" in pair
+    )
+}
+PROVIDER_QUEUE_SECONDS = float(os.getenv("PROVIDER_QUEUE_SECONDS", 0.5))
+TRANSCRIPTION_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", 30))
+RECAP_TIMEOUT_SECONDS = float(os.getenv("RECAP_TIMEOUT_SECONDS", 90))
+TTS_TIMEOUT_SECONDS = float(os.getenv("TTS_TIMEOUT_SECONDS", 20))
+
+# Client-side TPM/RPM limits per model deployment, as
+# key=tokens_per_minute/requests_per_minute pairs (e.g. gpt4o-mini=150000/900)
+RATE_LIMITS = {
+    key: tuple(float(v) for v in quota.split("/", 1))
+    for key, quota in (
+        pair.split("=", 1)
+        for pair in os.getenv("RATE_LIMITS", "").split(",")
+        if "=" in pair and "/" in pair
+    )
+}
+# Buckets hold this many seconds of quota, which bounds bursts
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", 10))
+RATE_LIMIT_QUEUE_SECONDS = float(os.getenv("RATE_LIMIT_QUEUE_SECONDS", 2))
+# Worker processes sharing each quota (gunicorn workers x replicas)
+RATE_LIMIT_WORKERS = max(1, int(os.getenv("RATE_LIMIT_WORKERS", 1)))
+
+# Translation memory: reuse past translations (off by default). Scores are
+# character n-gram Jaccard similarities between normalised source texts
+TM_ENABLED = os.getenv("TM_ENABLED", "false").lower() == "true"
+TM_SERVE_THRESHOLD = float(os.getenv("TM_SERVE_THRESHOLD", 0.95))
+TM_EXAMPLE_THRESHOLD = float(os.getenv("TM_EXAMPLE_THRESHOLD", 0.6))
+TM_MAX_EXAMPLES = int(os.getenv("TM_MAX_EXAMPLES", 3))
+# Rows held per worker (older ones are evicted) and how often new rows are indexed
+TM_MAX_ROWS = int(os.getenv("TM_MAX_ROWS", 200000))
+TM_REFRESH_SECONDS = float(os.getenv("TM_REFRESH_SECONDS", 5))
+
+# Voice activity detection before speech-to-text
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", 30))
+# Speech must be this far above the clip's noise floor, and above VAD_FLOOR_DB
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", 12))
+VAD_FLOOR_DB = float(os.getenv("VAD_FLOOR_DB", -55))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", 240))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", 120))
+VAD_MAX_PAUSE_MS = int(os.getenv("VAD_MAX_PAUSE_MS", 600))
+# Long recordings are cut at pauses into chunks of at most this length
+# (the Azure short-audio API takes ~60 s) and transcribed in parallel
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", 30))
+TRANSCRIBE_CHUNK_OVERLAP_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", 1.5))
+TRANSCRIBE_PARALLELISM = int(os.getenv("TRANSCRIBE_PARALLELISM", 4))
+
+# Push channel per session (GET /sessions/<id>/events): "memory" fans out
+# within one worker process, "redis" across workers and replicas
+CHANNEL_BACKEND = os.getenv("CHANNEL_BACKEND", "memory").lower()
+CHANNEL_REDIS_URL = os.getenv("CHANNEL_REDIS_URL", "redis://localhost:6379/0")
+CHANNEL_KEEPALIVE_SECONDS = float(os.getenv("CHANNEL_KEEPALIVE_SECONDS", 15))
+# Streams end after this long; clients reconnect and resume from Last-Event-ID
+CHANNEL_STREAM_SECONDS = float(os.getenv("CHANNEL_STREAM_SECONDS", 300))
+# Events buffered per client; a client further behind is disconnected
+CHANNEL_QUEUE_SIZE = int(os.getenv("CHANNEL_QUEUE_SIZE", 100))
+# Open streams per worker process. Each holds one of the worker's
+# GUNICORN_THREADS threads, so keep it well below that; more get a 503
+CHANNEL_MAX_STREAMS = int(
+    os.getenv("CHANNEL_MAX_STREAMS", max(1, int(os.getenv("GUNICORN_THREADS", 16)) // 2))
+)
+
+# Conversation search: "mysql" (FULLTEXT), "embedded" (in-process index) or "auto"
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto").lower()
+
 STATUS_CREATED = "created"
 STATUS_LANGUAGE_SET = "language_set"
 STATUS_ONGOING = "ongoing"
@@ -0,0 +1,72 @@
+"""
+Explicit schema setup: ``flask migrate``.
+
+Creating tables used to happen on every worker start; it now runs once per
+deploy (see the Dockerfile CMD), so importing the app never touches the
+database. The command is idempotent: it creates missing tables, adds indexes
+declared on models that an older schema lacks, the MySQL FULLTEXT index
+used by search, and the cache generation counters.
+"""
+
+import logging
+
+from sqlalchemy import inspect
+
+from db.sql import db
+
+logger = logging.getLogger(__name__)
+
+
+def _load_models() -> None:
+    # Register every table on db.metadata, whichever routes were imported
+    import models.cache_generation  # noqa: F401
+    import models.language  # noqa: F401
+    import models.replica_heartbeat  # noqa: F401
+    import models.session  # noqa: F401
+    import models.session_archive  # noqa: F401
+    import models.translation  # noqa: F401
+
+
+def _create_missing_indexes() -> list[str]:
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    return created
+
+
+def run_migrations() -> list[str]:
+    """Bring the schema up to date. Returns a description of each change."""
+    from services.response_cache import seed_generations
+    from services.search import FULLTEXT_INDEX_NAME, ensure_fulltext_index
+
+    _load_models()
+    inspector = inspect(db.engine)
+    missing_tables = [
+        t.name for t in db.metadata.sorted_tables if not inspector.has_table(t.name)
+    ]
+    # Primary only; a read replica gets the schema through replication
+    db.create_all(bind_key=None)
+    changes = [f"created table {name}" for name in missing_tables]
+
+    changes += [f"created index {name}" for name in _create_missing_indexes()]
+    if ensure_fulltext_index():
+        changes.append(f"created index {FULLTEXT_INDEX_NAME}")
+    changes += [f"seeded generation {name}" for name in seed_generations()]
+    for change in changes:
+        logger.info("migrate: %s", change)
+    return changes
+
+
+def init_migrate(app) -> None:
+    """Register the ``flask migrate`` command."""
+
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Create missing tables and indexes."""
+        changes = run_migrations()
+        print("\n".join(changes) if changes else "schema is up to date")
@@ -0,0 +1,103 @@
+import time
+import threading
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# Weight of the newest sample in the moving average of checkout waits
+_EWMA_ALPHA = 0.2
+# A wait average older than this no longer says anything about the pool
+_WAIT_SAMPLE_MAX_AGE = 5.0
+
+
+class PoolMetrics:
+    """Per-process counters for connection checkouts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.ewma_wait = 0.0
+        self.last_sample_at = 0.0
+
+    def start_wait(self) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def end_wait(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.ewma_wait += _EWMA_ALPHA * (waited - self.ewma_wait)
+            self.last_sample_at = time.monotonic()
+
+    def recent_wait(self) -> float:
+        """Moving average of checkout wait in seconds, 0 once it has gone stale."""
+        if time.monotonic() - self.last_sample_at > _WAIT_SAMPLE_MAX_AGE:
+            return 0.0
+        return self.ewma_wait
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    _local = threading.local()
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; only time the outer call
+        if getattr(self._local, "timing", False):
+            return super()._do_get()
+
+        self._local.timing = True
+        pool_metrics.start_wait()
+        started = time.monotonic()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self._local.timing = False
+            pool_metrics.end_wait(time.monotonic() - started, timed_out)
+
+
+def pool_stats(engine) -> dict:
+    """Snapshot of pool occupancy and checkout waits for the metrics endpoint."""
+    pool = engine.pool
+    stats = {
+        "pool_class": type(pool).__name__,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        "size": pool.size() if hasattr(pool, "size") else None,
+    }
+    m = pool_metrics
+    stats.update(
+        {
+            "waiting": m.waiting,
+            "checkouts": m.checkouts,
+            "timeouts": m.timeouts,
+            "avg_wait_ms": round(
+                1000 * m.total_wait / max(m.checkouts + m.timeouts, 1), 3
+            ),
+            "max_wait_ms": round(1000 * m.max_wait, 3),
+            "recent_wait_ms": round(1000 * m.recent_wait(), 3),
+        }
+    )
+    if engine.dialect.name == "sqlite":
+        from db.sqlite import writer_queue
+
+        stats["writer_queue"] = writer_queue.stats()
+    return stats
@@ -0,0 +1,231 @@
+"""
+Read-replica routing (DB_REPLICA_URL).
+
+The replica is a second engine under the "replica" bind. During GET and
+HEAD requests, ``RoutingSession`` sends reads to it; flushes and UPDATE /
+DELETE / INSERT statements always go to the primary, and once a request has
+written, the rest of it reads the primary too. A view can opt out with
+``@primary_only``.
+
+Reads stay on the primary when the replica may not have the data yet:
+  • read-your-writes – a conversation session written within
+    DB_REPLICA_STICKY_SECONDS (by any worker on the host; the group-commit
+    writer included) is read from the primary, and so is everything a client
+    reads within that time after its own write (a short-lived cookie)
+  • lag – a monitor thread per worker stamps a heartbeat row on the primary
+    every DB_REPLICA_CHECK_SECONDS and reads it back from the replica; when
+    the stamp is older than DB_REPLICA_MAX_LAG_SECONDS, or could not be read,
+    all reads go to the primary until the replica catches up
+"""
+
+import os
+import time
+import logging
+import threading
+
+from flask import g, has_request_context, request, current_app
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session as OrmSession
+
+from config import (
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_STICKY_SECONDS,
+    DB_REPLICA_CHECK_SECONDS,
+)
+from services.shared_cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = "replica"
+STICKY_COOKIE = "db_primary_until"
+_READ_METHODS = ("GET", "HEAD")
+
+_db = None
+_app = None
+_recent_writes = get_cache("db-recent-writes", 4096, ttl=DB_REPLICA_STICKY_SECONDS)
+_lag = None
+_checked_at = 0.0
+_monitor_pid = None
+_monitor_lock = threading.Lock()
+_stats = {"replica_reads": 0, "sticky": 0, "lagging": 0, "primary_only": 0}
+
+
+class RoutingSession(FlaskSession):
+    """Picks the replica for reads when the current request allows it."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, "is_dml", False)
+            and has_request_context()
+            and g.get("db_replica")
+        ):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def primary_only(view):
+    """Mark a view method whose reads must see the primary (e.g. a replay)."""
+    view.db_primary_only = True
+    return view
+
+
+# ---- writes -----------------------------------------------------------------
+
+
+def _written_session_ids(session) -> set:
+    ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table == "sessions":
+            ids.add(obj.id)
+        elif table == "translations":
+            ids.add(obj.session_id)
+    ids.discard(None)
+    return ids
+
+
+def _after_flush(session, flush_context) -> None:
+    for session_id in _written_session_ids(session):
+        _recent_writes.set(session_id, True)
+    _wrote()
+
+
+def _after_orm_execute(state) -> None:
+    if state.is_update or state.is_delete or state.is_insert:
+        _wrote()
+
+
+def _wrote() -> None:
+    if has_request_context():
+        # Read our own write for the rest of the request and in the next ones
+        g.db_replica = False
+        g.db_wrote = True
+
+
+# ---- lag --------------------------------------------------------------------
+
+
+def check_replica() -> float:
+    """Stamp the heartbeat on the primary, read it back from the replica."""
+    global _lag, _checked_at
+    from models.replica_heartbeat import ReplicaHeartbeat
+
+    try:
+        with _app.app_context():
+            now_ms = int(time.time() * 1000)
+            updated = (
+                _db.session.query(ReplicaHeartbeat)
+                .filter(ReplicaHeartbeat.id == 1)
+                .update({ReplicaHeartbeat.beat_ms: now_ms})
+            )
+            if not updated:
+                _db.session.add(ReplicaHeartbeat(id=1, beat_ms=now_ms))
+            _db.session.commit()
+            with _db.engines[REPLICA_BIND].connect() as connection:
+                beat_ms = connection.execute(
+                    select(ReplicaHeartbeat.beat_ms).where(ReplicaHeartbeat.id == 1)
+                ).scalar()
+        _lag = time.time() - beat_ms / 1000 if beat_ms else float("inf")
+    except Exception as e:
+        logger.warning("Replica lag check failed: %s", e)
+        _lag = None
+    _checked_at = time.monotonic()
+    return _lag
+
+
+def _monitor_loop() -> None:
+    while True:
+        check_replica()
+        time.sleep(DB_REPLICA_CHECK_SECONDS)
+
+
+def _ensure_monitor() -> None:
+    # The thread does not survive a fork, so start one per worker process
+    global _monitor_pid
+    if _monitor_pid == os.getpid():
+        return
+    with _monitor_lock:
+        if _monitor_pid != os.getpid():
+            threading.Thread(target=_monitor_loop, name="replica-lag", daemon=True).start()
+            _monitor_pid = os.getpid()
+
+
+def replica_usable() -> bool:
+    _ensure_monitor()
+    fresh = time.monotonic() - _checked_at < max(3 * DB_REPLICA_CHECK_SECONDS, 5.0)
+    return fresh and _lag is not None and _lag <= DB_REPLICA_MAX_LAG_SECONDS
+
+
+# ---- routing ----------------------------------------------------------------
+
+
+def _view_is_primary_only() -> bool:
+    view = current_app.view_functions.get(request.endpoint)
+    handler = getattr(getattr(view, "view_class", None), request.method.lower(), view)
+    return getattr(handler, "db_primary_only", False)
+
+
+def _route_request() -> None:
+    g.db_replica = False
+    if request.method not in _READ_METHODS or request.endpoint is None:
+        return
+    if _view_is_primary_only():
+        _stats["primary_only"] += 1
+        return
+    session_id = (request.view_args or {}).get("session_id") or request.args.get("session_id")
+    try:
+        client_sticky = float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        client_sticky = False
+    if client_sticky or (session_id and _recent_writes.get(session_id)):
+        _stats["sticky"] += 1
+        return
+    if not replica_usable():
+        _stats["lagging"] += 1
+        return
+    _stats["replica_reads"] += 1
+    g.db_replica = True
+
+
+def _remember_client_write(response):
+    if g.get("db_wrote"):
+        until = time.time() + DB_REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            STICKY_COOKIE,
+            f"{until:.3f}",
+            max_age=int(DB_REPLICA_STICKY_SECONDS) + 1,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+_listening = False
+
+
+def init_replica(app, db) -> None:
+    """Route ``app``'s read-only requests to its "replica" bind."""
+    global _db, _app, _listening
+    _db, _app = db, app
+    app.before_request(_route_request)
+    app.after_request(_remember_client_write)
+    if not _listening:
+        event.listen(OrmSession, "after_flush", _after_flush)
+        event.listen(OrmSession, "do_orm_execute", _after_orm_execute)
+        _listening = True
+
+
+def replica_stats() -> dict:
+    if _db is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "lag_seconds": round(_lag, 3) if _lag is not None else None,
+        "usable": replica_usable(),
+        **_stats,
+    }
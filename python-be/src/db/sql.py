@@ -1,8 +1,12 @@
 import os
 from flask_sqlalchemy import SQLAlchemy
-from dotenv import load_dotenv
+from sqlalchemy.pool import QueuePool
 
-load_dotenv()
+from config import DB_BACKEND, SQLITE_PATH, DB_REPLICA_URL  # (also loads .env first)
+from db.pool import TimedQueuePool
+from db.replica import REPLICA_BIND, RoutingSession, init_replica
+from db.sqlite import configure_sqlite
+from services.deadline import configure_engine
 
 MYSQL_USER = os.getenv("MYSQL_USER")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
@@ -14,31 +18,66 @@ MYSQL_DB = os.getenv("MYSQL_DB")
 # Set MYSQL_SSL=true in .env for cloud deployments
 MYSQL_SSL = os.getenv("MYSQL_SSL", "false").lower() == "true"
 
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+# Connection pool sizing (per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 2))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))
 
-db = SQLAlchemy()
+if DB_BACKEND == "sqlite":
+    DATABASE_URL = f"sqlite:///{os.path.abspath(SQLITE_PATH)}"
+else:
+    DATABASE_URL = (
+        f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+    )
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 def init_db(app):
-    app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
+    """
+    Bind the SQLAlchemy extension to ``app``. No connection is opened here;
+    the schema is created by the ``flask migrate`` command (see db/migrate.py).
+    """
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", DATABASE_URL)
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    if DB_REPLICA_URL:
+        # Plain QueuePool: replica waits must not count as primary pool pressure
+        app.config.setdefault("SQLALCHEMY_BINDS", {}).setdefault(
+            REPLICA_BIND, {"url": DB_REPLICA_URL, "poolclass": QueuePool}
+        )
+    binds = app.config.get("SQLALCHEMY_BINDS") or {}
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-    engine_options = {
-        # Ping connections before each use
-        "pool_pre_ping": True,
-        # Reconnect if a connection is older than X seconds
-        "pool_recycle": 3600,
-        "pool_size": 5,
-        "max_overflow": 2,
-    }
+    # Pool tuning applies to the MySQL server; other URLs (e.g. SQLite in
+    # tests) keep SQLAlchemy's defaults for their dialect
+    if uri.startswith("mysql"):
+        engine_options = {
+            # Ping connections before each use
+            "pool_pre_ping": True,
+            # Reconnect if a connection is older than X seconds
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            # QueuePool that records checkout waits (see db/pool.py)
+            "poolclass": TimedQueuePool,
+        }
 
-    # Only enable SSL for cloud databases
-    if MYSQL_SSL:
-        engine_options["connect_args"] = {"ssl": {"ssl_verify_cert": True}}
+        # Only enable SSL for cloud databases
+        if MYSQL_SSL:
+            engine_options["connect_args"] = {"ssl": {"ssl_verify_cert": True}}
 
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
-    db.init_app(app)
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options)
+    elif uri == DATABASE_URL:
+        # The embedded database file's directory (e.g. a mounted volume)
+        os.makedirs(os.path.dirname(os.path.abspath(SQLITE_PATH)), exist_ok=True)
 
-    # Auto-create tables if they don't exist
+    db.init_app(app)
     with app.app_context():
-        db.create_all()
+        for engine in db.engines.values():
+            configure_engine(engine)
+            if engine.dialect.name == "sqlite":
+                configure_sqlite(engine)
+    if REPLICA_BIND in binds:
+        init_replica(app, db)
@@ -0,0 +1,147 @@
+"""
+Embedded SQLite mode (DB_BACKEND=sqlite) for single-node deployments.
+
+Every connection is tuned on connect: WAL journaling so readers never block
+the writer, synchronous=NORMAL (durable at each WAL checkpoint, safe with
+WAL), a busy timeout for writers in other worker processes, a larger page
+cache and foreign keys enforced as MySQL does.
+
+SQLite allows one writer at a time. Within a process, sessions that are
+about to write queue up in FIFO order in a ``WriterQueue`` and hold it until
+their transaction ends, so concurrent requests wait their turn instead of
+spinning in SQLite's busy handler and failing with "database is locked".
+/sessions/translate inserts also go through the group-commit writer, which
+this mode turns on by default.
+"""
+
+import time
+import threading
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.orm import Session as OrmSession
+
+from config import SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_MB
+
+_INFO_KEY = "sqlite_writer"
+
+
+class WriterQueue:
+    """FIFO lock: waiters are served in arrival order."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy = False
+        self._waiters: deque[threading.Event] = deque()
+        self.writes = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.max_wait = 0.0
+
+    def acquire(self, timeout: float) -> bool:
+        with self._lock:
+            self.writes += 1
+            if not self._busy and not self._waiters:
+                self._busy = True
+                return True
+            turn = threading.Event()
+            self._waiters.append(turn)
+            self.waits += 1
+
+        started = time.monotonic()
+        granted = turn.wait(timeout)
+        with self._lock:
+            if not granted:
+                if turn in self._waiters:
+                    self._waiters.remove(turn)
+                    self.timeouts += 1
+                    return False
+                # Handed over just as the wait timed out
+            self.max_wait = max(self.max_wait, time.monotonic() - started)
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                # Hand over directly, so nobody can cut in line
+                self._waiters.popleft().set()
+            else:
+                self._busy = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = len(self._waiters)
+        return {
+            "writes": self.writes,
+            "queued": queued,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "max_wait_ms": round(1000 * self.max_wait, 3),
+        }
+
+
+writer_queue = WriterQueue()
+
+
+def _set_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        "journal_mode=WAL",
+        "synchronous=NORMAL",
+        f"busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"cache_size=-{SQLITE_CACHE_MB * 1024}",
+        "temp_store=MEMORY",
+        "foreign_keys=ON",
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+def _is_sqlite(session) -> bool:
+    bind = session.bind
+    if bind is None:
+        try:
+            bind = session.get_bind()
+        except Exception:
+            return False
+    return bind.dialect.name == "sqlite"
+
+
+def _join_writers(session) -> None:
+    if session.info.get(_INFO_KEY) or not _is_sqlite(session):
+        return
+    if not writer_queue.acquire(SQLITE_BUSY_TIMEOUT_MS / 1000):
+        raise exc.OperationalError(
+            "write", {}, Exception("database is locked (writer queue timeout)")
+        )
+    session.info[_INFO_KEY] = True
+
+
+def _before_flush(session, flush_context, instances) -> None:
+    _join_writers(session)
+
+
+def _before_orm_execute(state) -> None:
+    # Bulk UPDATE / DELETE / INSERT statements skip the flush
+    if state.is_update or state.is_delete or state.is_insert:
+        _join_writers(state.session)
+
+
+def _after_transaction_end(session, transaction) -> None:
+    # Only the outermost transaction ends the write
+    if transaction.parent is None and session.info.pop(_INFO_KEY, False):
+        writer_queue.release()
+
+
+_listening = False
+
+
+def configure_sqlite(engine) -> None:
+    """Tune ``engine``'s connections and queue this process's writers."""
+    global _listening
+    event.listen(engine, "connect", _set_pragmas)
+    if not _listening:
+        event.listen(OrmSession, "before_flush", _before_flush)
+        event.listen(OrmSession, "do_orm_execute", _before_orm_execute)
+        event.listen(OrmSession, "after_transaction_end", _after_transaction_end)
+        _listening = True
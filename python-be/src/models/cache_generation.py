@@ -0,0 +1,13 @@
+from db.sql import db
+
+
+class CacheGeneration(db.Model):
+    """
+    Monotonic counters used to version cached API responses.
+    A write to the data behind a cached response bumps its counter.
+    """
+
+    __tablename__ = "cache_generations"
+
+    name = db.Column(db.String(32), primary_key=True)  # e.g., "language_settings"
+    value = db.Column(db.Integer, nullable=False, default=0)
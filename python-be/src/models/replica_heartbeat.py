@@ -0,0 +1,13 @@
+from db.sql import db
+
+
+class ReplicaHeartbeat(db.Model):
+    """
+    Single row the workers stamp on the primary; how old the stamp is on the
+    read replica is its replication lag (see db/replica.py).
+    """
+
+    __tablename__ = "replica_heartbeat"
+
+    id = db.Column(db.Integer, primary_key=True)
+    beat_ms = db.Column(db.BigInteger, nullable=False)  # epoch milliseconds
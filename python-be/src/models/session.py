@@ -17,7 +17,7 @@ class Session(db.Model):
     language_b = db.Column(db.String(10))
     model_a = db.Column(db.JSON)
     model_b = db.Column(db.JSON)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     translations = db.relationship("Translation", backref="session", lazy=True)
 
     def to_dict(self):
@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy.dialects import mysql
+from db.sql import db
+
+
+class SessionArchive(db.Model):
+    """
+    A finished session moved out of the hot tables by the retention worker.
+    The session and all its translations are stored as zlib-compressed JSON.
+    """
+
+    __tablename__ = "session_archives"
+
+    session_id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(50))
+    language_a = db.Column(db.String(10))
+    language_b = db.Column(db.String(10))
+    created_at = db.Column(db.DateTime, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    translation_count = db.Column(db.Integer, default=0)
+    payload = db.Column(
+        db.LargeBinary().with_variant(mysql.LONGBLOB(), "mysql"), nullable=False
+    )
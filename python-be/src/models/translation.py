@@ -14,6 +14,7 @@ class Translation(db.Model):
 
     def to_dict(self):
         return {
+            "id": self.id,
             "from": self.from_lang,
             "to": self.to_lang,
             "original": self.original,
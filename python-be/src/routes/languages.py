@@ -1,7 +1,13 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
 from flask import request
 from db.sql import db
 from models.language import LanguageSetting
+from services.response_cache import (
+    SETTINGS_GENERATION,
+    bump_generation,
+    cached_json_response,
+    get_generation,
+)
 
 ns_languages = Namespace("languages", description="Language settings management")
 
@@ -82,6 +88,7 @@ class LanguageDetail(Resource):
         if "summary_model" in data:
             lang.summary_model = data["summary_model"]
 
+        bump_generation(SETTINGS_GENERATION)
         db.session.commit()
         return lang.to_dict()
 
@@ -120,21 +127,30 @@ class LanguageBulkUpdate(Resource):
 
             updated.append(lang)
 
+        bump_generation(SETTINGS_GENERATION)
         db.session.commit()
         return {"updated": len(updated), "languages": [l.to_dict() for l in updated]}
 
 
+def _enabled_languages():
+    languages = (
+        LanguageSetting.query.filter_by(enabled=True)
+        .order_by(LanguageSetting.code)
+        .all()
+    )
+    return marshal([lang.to_dict() for lang in languages], language_model)
+
+
 @ns_languages.route("/enabled")
 class EnabledLanguages(Resource):
-    @ns_languages.marshal_list_with(language_model)
+    @ns_languages.response(200, "Success", [language_model])
     def get(self):
         """Get only enabled languages (for the translator dropdown)"""
-        languages = (
-            LanguageSetting.query.filter_by(enabled=True)
-            .order_by(LanguageSetting.code)
-            .all()
+        return cached_json_response(
+            "languages-enabled",
+            get_generation(SETTINGS_GENERATION),
+            _enabled_languages,
         )
-        return [lang.to_dict() for lang in languages]
 
 
 # Languages enabled by default for new installations
@@ -200,6 +216,8 @@ class SeedLanguages(Resource):
             db.session.add(lang)
             created += 1
 
+        if created:
+            bump_generation(SETTINGS_GENERATION)
         db.session.commit()
         return {
             "created": created,
@@ -1,5 +1,19 @@
 from flask_restx import Namespace, Resource, fields
 import os
+from db.sql import db
+from db.pool import pool_stats
+from db.replica import replica_stats
+from services.admission import admission_stats
+from services.translation_service import hedge_stats
+from services.circuit_breaker import breaker_stats
+from services.rate_limit import rate_limit_stats
+from services.translation_memory import memory_stats
+from services.session_channel import channel_stats
+from services.shared_cache import cache_stats
+from services.compression import compression_stats
+from services.idempotency import idempotency_stats
+from services.deadline import deadline_stats
+from services.warmup import warmup_report
 
 ns_misc = Namespace("misc", description="Misc endpoints")
 
@@ -15,6 +29,14 @@ class Ping(Resource):
         return {"message": "pong"}
 
 
+@ns_misc.route("/ready")
+class Ready(Resource):
+    def get(self):
+        """Readiness probe: 503 until this worker has finished its warm-up."""
+        report = warmup_report()
+        return report, 200 if report["ready"] else 503
+
+
 @ns_misc.route("/echo")
 class Echo(Resource):
     @ns_misc.expect(echo_model)
@@ -22,3 +44,28 @@ class Echo(Resource):
         # Read payload from ns_misc.payload
         data = ns_misc.payload
         return {"you_sent": data, "env_msg": os.getenv("TEST_ENV_VAR", "not set")}
+
+
+@ns_misc.route("/metrics")
+class Metrics(Resource):
+    def get(self):
+        """Live DB pool, admission, hedging, provider and quota counters for this worker."""
+        # Imported here so numpy stays out of app start-up
+        from services.vad import vad_stats
+
+        return {
+            "db_pool": pool_stats(db.engine),
+            "db_replica": replica_stats(),
+            "admission": admission_stats(),
+            "translation": hedge_stats(),
+            "providers": breaker_stats(),
+            "rate_limits": rate_limit_stats(),
+            "translation_memory": memory_stats(),
+            "vad": vad_stats(),
+            "channel": channel_stats(),
+            "cache": cache_stats(),
+            "warmup": warmup_report(),
+            "compression": compression_stats(),
+            "idempotency": idempotency_stats(),
+            "deadlines": deadline_stats(),
+        }
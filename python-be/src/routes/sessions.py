@@ -1,15 +1,26 @@
-import azure.cognitiveservices.speech as speechsdk
 import os
+import re
+import json
+import base64
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from flask_restx import Namespace, Resource, reqparse
-from flask import request, Response
+from flask import current_app, request, Response, stream_with_context
 from werkzeug.datastructures import FileStorage
 from db.sql import db
+from db.replica import primary_only
 from models.session import Session
 from models.translation import Translation
 from models.language import LanguageSetting
-import requests
 
-from services.voices import list_voices
+from services.voices import get_catalog, catalog_generation
+from services.response_cache import (
+    SETTINGS_GENERATION,
+    cached_json_response,
+    get_generation,
+)
 
 from config import (
     MODEL_URL_MAP,
@@ -18,20 +29,109 @@ from config import (
     STATUS_LANGUAGE_SET,
     STATUS_ONGOING,
     STATUS_FINISHED,
-    AZURE_SPEECH_KEY,
-    AZURE_SPEECH_REGION,
+    RECAP_TIMEOUT_SECONDS,
 )
 
 from services.transcription_service import transcribe_audio
-from services.translation_service import translate_text
+from services.translation_service import (
+    split_sentences,
+    stream_translate,
+    translate_text,
+)
+from services.tts_service import synthesize_speech
+from services.admission import track_llm_call
+from services.circuit_breaker import ProviderUnavailable, provider_guard
+from services.rate_limit import post_within_quota
+from services.retention import load_archived_session
+from services.search import search_translations
+from services.export import stream_export
+from services.session_channel import (
+    RETRY_MS,
+    close_stream,
+    open_stream,
+    publish,
+    session_events,
+    turn_event,
+)
+from services.idempotency import idempotent
+from services import deadline
+from services.deadline import DeadlineExceeded, deadline_exceeded
 
 
-def make_speech_config() -> speechsdk.SpeechConfig:
+FALLBACK_VOICE = "en-GB-LibbyNeural"
 
-    return speechsdk.SpeechConfig(
-        subscription=AZURE_SPEECH_KEY,
-        region=AZURE_SPEECH_REGION,
-    )
+
+def _language_models(lang_code: str):
+    """(transcribe_model, translation_model) for a language, or None if unsupported."""
+    # Try database settings first, then fallback to hardcoded config
+    db_lang = LanguageSetting.query.filter_by(code=lang_code).first()
+    lang_config = LANGUAGES.get(lang_code)
+
+    if db_lang:
+        return (
+            db_lang.transcribe_model or "azure_speech",
+            db_lang.translation_model or "gpt4o-mini",
+        )
+    if lang_config:
+        return (
+            lang_config["models"].get("transcribeModel", "azure_speech"),
+            lang_config["models"].get("translationModel", "gpt4o-mini"),
+        )
+    return None
+
+
+def _default_voice(lang_code: str):
+    # lookup default voice - check database first, then fallback to hardcoded config
+    db_lang = LanguageSetting.query.filter_by(code=lang_code).first()
+    if db_lang and db_lang.voice:
+        return db_lang.voice
+    if lang_code in LANGUAGES:
+        return LANGUAGES[lang_code]["default_voice"]
+    return None
+
+
+def _save_upload(audio_file: FileStorage) -> str:
+    """
+    Save an uploaded clip under a new temporary name (keeping a plain file
+    extension, which picks the decoder) and return its path. Client file
+    names are never used as paths. The caller removes the file.
+    """
+    suffix = os.path.splitext(audio_file.filename or "")[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,5}", suffix):
+        suffix = ""
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix)
+    with os.fdopen(fd, "wb") as out:
+        audio_file.save(out)
+    return path
+
+
+def _save_translation(session_obj: Session, fields: dict) -> int:
+    """Store a turn, then push it to the session's channel. Returns its id."""
+    # Saved even if the deadline passes meanwhile (see services/deadline.py)
+    with deadline.budget(None):
+        was_ongoing = session_obj.status == STATUS_ONGOING
+        writer = current_app.extensions.get("group_commit")
+        if writer:
+            # Batched with other requests; returns once the row is committed
+            translation_id = writer.write(fields)
+            translation = Translation(id=translation_id, created_at=datetime.utcnow(), **fields)
+        else:
+            translation = Translation(**fields)
+            db.session.add(translation)
+            session_obj.status = STATUS_ONGOING
+            db.session.flush()
+            translation_id = translation.id
+            db.session.commit()
+
+        if not was_ongoing:
+            publish(session_obj.id, "status", {**session_obj.to_dict(), "status": STATUS_ONGOING})
+        publish(session_obj.id, "turn", turn_event(translation), translation_id)
+    return translation_id
+
+
+def _unavailable(exc: ProviderUnavailable):
+    """503 for a call refused by a circuit breaker or bulkhead."""
+    return {"error": str(exc)}, 503, {"Retry-After": str(exc.retry_after)}
 
 
 ns_sessions = Namespace("sessions", description="Session-related endpoints")
@@ -49,53 +149,60 @@ class StartSession(Resource):
         return {"session_id": session.id, "status": session.status}
 
 
-@ns_sessions.route("/available-languages")
-class AvailableLanguages(Resource):
-    def get(self):
-        """
-        Returns enabled languages from database settings.
-        Falls back to hardcoded LANGUAGES config if database is empty.
-        Danish (da-DK) is excluded as it's always the "other" language.
-        """
-        # Try to get enabled languages from database
-        db_languages = (
-            LanguageSetting.query.filter_by(enabled=True)
-            .filter(LanguageSetting.code != "da-DK")
-            .order_by(LanguageSetting.code)
-            .all()
-        )
-
-        if db_languages:
-            # Get voice info for locale names
-            voices = list_voices()
-            voice_map = {v["locale"]: v for v in voices}
+def _available_languages():
+    """
+    Returns enabled languages from database settings.
+    Falls back to hardcoded LANGUAGES config if database is empty.
+    Danish (da-DK) is excluded as it's always the "other" language.
+    """
+    # Try to get enabled languages from database
+    db_languages = (
+        LanguageSetting.query.filter_by(enabled=True)
+        .filter(LanguageSetting.code != "da-DK")
+        .order_by(LanguageSetting.code)
+        .all()
+    )
 
-            return [
-                {
-                    "code": lang.code,
-                    "english_name": voice_map.get(lang.code, {}).get(
-                        "locale_english_name", lang.code
-                    ),
-                    "native_name": voice_map.get(lang.code, {}).get(
-                        "locale_native_name", lang.code
-                    ),
-                    "voice": lang.voice,
-                }
-                for lang in db_languages
-            ]
+    if db_languages:
+        # Locale display names are precomputed in the voice catalog
+        locale_names = get_catalog().locale_names
 
-        # Fallback to hardcoded config if no database settings
         return [
             {
-                "code": code,
-                "english_name": details["english_name"],
-                "native_name": details["native_name"],
-                "region": details["region"],
+                "code": lang.code,
+                "english_name": locale_names.get(lang.code, {}).get(
+                    "english_name", lang.code
+                ),
+                "native_name": locale_names.get(lang.code, {}).get(
+                    "native_name", lang.code
+                ),
+                "voice": lang.voice,
             }
-            for code, details in LANGUAGES.items()
-            if code != "da-DK"
+            for lang in db_languages
         ]
 
+    # Fallback to hardcoded config if no database settings
+    return [
+        {
+            "code": code,
+            "english_name": details["english_name"],
+            "native_name": details["native_name"],
+            "region": details["region"],
+        }
+        for code, details in LANGUAGES.items()
+        if code != "da-DK"
+    ]
+
+
+@ns_sessions.route("/available-languages")
+class AvailableLanguages(Resource):
+    def get(self):
+        """Enabled languages; cached until the settings or voice catalog change."""
+        generation = (get_generation(SETTINGS_GENERATION), catalog_generation())
+        return cached_json_response(
+            "available-languages", generation, _available_languages
+        )
+
 
 @ns_sessions.route("/select-language")
 class SelectLanguage(Resource):
@@ -145,6 +252,7 @@ class SelectLanguage(Resource):
         session_obj.model_b = model_b
         session_obj.status = STATUS_LANGUAGE_SET
         db.session.commit()
+        publish(session_id, "status", session_obj.to_dict())
 
         return session_obj.to_dict()
 
@@ -152,6 +260,7 @@ class SelectLanguage(Resource):
 @ns_sessions.route("/translate")
 class Translate(Resource):
     @ns_sessions.expect(audio_parser)
+    @idempotent
     def post(self):
         args = audio_parser.parse_args()
         audio_file = args.get("audio")
@@ -165,30 +274,24 @@ class Translate(Resource):
         if not session_obj:
             return {"error": "Session not found"}, 404
 
-        # Try database settings first, then fallback to hardcoded config
-        db_lang = LanguageSetting.query.filter_by(code=from_lang).first()
-        lang_config = LANGUAGES.get(from_lang)
-
-        if db_lang:
-            transcribe_model = db_lang.transcribe_model or "azure_speech"
-            translation_model = db_lang.translation_model or "gpt4o-mini"
-        elif lang_config:
-            transcribe_model = lang_config["models"].get("transcribeModel", "azure_speech")
-            translation_model = lang_config["models"].get("translationModel", "gpt4o-mini")
-        else:
+        models = _language_models(from_lang)
+        if not models:
             return {"error": f"Unsupported language: {from_lang}"}, 400
+        transcribe_model, translation_model = models
 
         # Step 1: Possibly transcribe
         if audio_file or not text:
             # We have audio or empty text, so do transcription
             audio_path = DEFAULT_AUDIO_PATH
             if audio_file:
-                temp_path = os.path.join("/tmp", audio_file.filename)
-                audio_file.save(temp_path)
-                audio_path = temp_path
+                audio_path = _save_upload(audio_file)
 
             try:
                 original = transcribe_audio(audio_path, transcribe_model, from_lang)
+            except ProviderUnavailable as e:
+                return _unavailable(e)
+            except DeadlineExceeded as e:
+                return deadline_exceeded(e)
             except Exception as e:
                 return {"error": str(e)}, 500
             finally:
@@ -199,23 +302,28 @@ class Translate(Resource):
             # No audio, use the provided text directly
             original = text
 
+        if not (original or "").strip():
+            return {"error": "No speech detected"}, 422
+
         # Step 2: Translate (translation_model already set above)
         try:
             translated = translate_text(original, translation_model, from_lang, to_lang)
+        except ProviderUnavailable as e:
+            return _unavailable(e)
+        except DeadlineExceeded as e:
+            return deadline_exceeded(e)
         except Exception as e:
             return {"error": str(e)}, 500
 
         # Step 3: Save result
-        new_translation = Translation(
-            session_id=session_id,
-            from_lang=from_lang,
-            to_lang=to_lang,
-            original=original,
-            translated=translated,
-        )
-        db.session.add(new_translation)
-        session_obj.status = STATUS_ONGOING
-        db.session.commit()
+        fields = {
+            "session_id": session_id,
+            "from_lang": from_lang,
+            "to_lang": to_lang,
+            "original": original,
+            "translated": translated,
+        }
+        _save_translation(session_obj, fields)
 
         return {
             "session_id": session_id,
@@ -226,6 +334,125 @@ class Translate(Resource):
         }
 
 
+def _event(kind: str, **fields) -> str:
+    return json.dumps({"type": kind, **fields}, ensure_ascii=False) + "\n"
+
+
+def _audio_event(index: int, future) -> str:
+    try:
+        audio = future.result()
+    except Exception as e:
+        return _event("audio", index=index, error=str(e))
+    return _event(
+        "audio",
+        index=index,
+        mimetype="audio/wav",
+        data=base64.b64encode(audio).decode("ascii"),
+    )
+
+
+@ns_sessions.route("/speech-to-speech")
+class SpeechToSpeech(Resource):
+    @ns_sessions.expect(audio_parser)
+    def post(self):
+        """
+        One conversation turn in a single request: audio in, NDJSON events out.
+
+        Events, one JSON object per line:
+          {"type": "transcript", "original": ...}
+          {"type": "translation", "index": n, "text": <sentence>}
+          {"type": "audio", "index": n, "mimetype": "audio/wav", "data": <base64>}
+          {"type": "done", "session_id", "from", "to", "original", "translated"}
+          {"type": "error", "error": ...}
+        Speech for a sentence is synthesised as soon as that sentence has been
+        translated, while the model is still writing the rest.
+        """
+        args = audio_parser.parse_args()
+        audio_file = args.get("audio")
+        form = request.form or {}
+        session_id = form.get("session_id")
+        from_lang = form.get("from")
+        to_lang = form.get("to")
+
+        session_obj = Session.query.get(session_id)
+        if not session_obj:
+            return {"error": "Session not found"}, 404
+        if not audio_file:
+            return {"error": "No audio supplied"}, 400
+
+        models = _language_models(from_lang)
+        if not models:
+            return {"error": f"Unsupported language: {from_lang}"}, 400
+        transcribe_model, translation_model = models
+        voice = _default_voice(to_lang) or FALLBACK_VOICE
+
+        audio_path = _save_upload(audio_file)
+        try:
+            original = transcribe_audio(audio_path, transcribe_model, from_lang)
+        except ProviderUnavailable as e:
+            return _unavailable(e)
+        except DeadlineExceeded as e:
+            return deadline_exceeded(e)
+        except Exception as e:
+            return {"error": str(e)}, 500
+        finally:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+
+        if not (original or "").strip():
+            return {"error": "No speech detected"}, 422
+
+        def events():
+            yield _event("transcript", original=original)
+
+            sentences = []
+            pending = deque()
+            # One synthesis at a time keeps the audio in sentence order
+            with ThreadPoolExecutor(1, thread_name_prefix="s2s-tts") as tts:
+                try:
+                    pieces = stream_translate(original, translation_model, from_lang, to_lang)
+                    for index, sentence in enumerate(split_sentences(pieces)):
+                        sentences.append(sentence)
+                        text = sentence.strip()
+                        yield _event("translation", index=index, text=text)
+                        audio = tts.submit(deadline.carry(synthesize_speech), text, voice)
+                        pending.append((index, audio))
+                        while pending and pending[0][1].done():
+                            yield _audio_event(*pending.popleft())
+                except Exception as e:
+                    for _, future in pending:
+                        future.cancel()
+                    yield _event("error", error=str(e))
+                    return
+                while pending:
+                    yield _audio_event(*pending.popleft())
+
+            translated = "".join(sentences).strip()
+            _save_translation(
+                session_obj,
+                {
+                    "session_id": session_id,
+                    "from_lang": from_lang,
+                    "to_lang": to_lang,
+                    "original": original,
+                    "translated": translated,
+                },
+            )
+            yield _event(
+                "done",
+                session_id=session_id,
+                original=original,
+                translated=translated,
+                **{"from": from_lang, "to": to_lang},
+            )
+
+        return Response(
+            stream_with_context(events()),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
 @ns_sessions.route("/finish-session")
 class FinishSession(Resource):
     def post(self):
@@ -237,6 +464,7 @@ class FinishSession(Resource):
 
         session_obj.status = STATUS_FINISHED
         db.session.commit()
+        publish(session_id, "status", session_obj.to_dict())
         return {"session_id": session_id, "status": STATUS_FINISHED}
 
 
@@ -316,14 +544,29 @@ class Recap(Resource):
             "temperature": 0.4,
         }
 
-        resp = requests.post(summary_url, headers=headers, json=payload)
-        if resp.status_code != 200:
-            return {"error": "Summary failed", "details": resp.text}, 500
+        try:
+            with provider_guard(summary_model_key), track_llm_call():
+                resp = post_within_quota(
+                    summary_model_key,
+                    summary_url,
+                    payload,
+                    headers=headers,
+                    timeout=RECAP_TIMEOUT_SECONDS,
+                )
+                if resp.status_code != 200:
+                    raise RuntimeError(resp.text)
+        except ProviderUnavailable as e:
+            return _unavailable(e)
+        except DeadlineExceeded as e:
+            return deadline_exceeded(e)
+        except Exception as e:
+            return {"error": "Summary failed", "details": str(e)}, 500
 
         if summary_model_key in ["gpt4o-mini", "gpt35", "promte_4o"]:
             summary_text = resp.json()["choices"][0]["message"]["content"].strip()
         else:
             summary_text = resp.text.strip()
+        publish(session_id, "recap", {"summary": summary_text})
 
         return {
             "session_id": session_id,
@@ -339,11 +582,85 @@ class ListSessions(Resource):
         return [s.to_dict() for s in sessions]
 
 
+@ns_sessions.route("/search")
+class SearchConversations(Resource):
+    def get(self):
+        """
+        Full-text search over past turns.
+
+        Query parameters: q (required), languages (one or two comma-separated
+        codes), since / until (ISO dates), page, per_page (max 100).
+        """
+        query = request.args.get("q", "").strip()
+        if not query:
+            return {"error": "Missing query parameter 'q'"}, 400
+
+        languages = [c for c in request.args.get("languages", "").split(",") if c]
+        try:
+            since = request.args.get("since")
+            since = datetime.fromisoformat(since) if since else None
+            until = request.args.get("until")
+            until = datetime.fromisoformat(until) if until else None
+            page = max(int(request.args.get("page", 1)), 1)
+            per_page = min(max(int(request.args.get("per_page", 20)), 1), 100)
+        except ValueError as e:
+            return {"error": f"Invalid parameter: {e}"}, 400
+
+        return search_translations(query, languages[:2], since, until, page, per_page)
+
+
+@ns_sessions.route("/export")
+class ExportConversations(Resource):
+    def get(self):
+        """
+        Stream all translations with their session data. Sessions without
+        translations have no records.
+
+        Query parameters: format (ndjson | csv), gzip (true/false),
+        since / until (ISO dates), status, language, and after (the last
+        ``cursor`` received, to resume an interrupted export).
+        """
+        fmt = request.args.get("format", "ndjson").lower()
+        if fmt not in ("ndjson", "csv"):
+            return {"error": "format must be 'ndjson' or 'csv'"}, 400
+        compress = request.args.get("gzip", "false").lower() == "true"
+
+        try:
+            since = request.args.get("since")
+            since = datetime.fromisoformat(since) if since else None
+            until = request.args.get("until")
+            until = datetime.fromisoformat(until) if until else None
+            after = int(request.args.get("after", 0))
+        except ValueError as e:
+            return {"error": f"Invalid parameter: {e}"}, 400
+
+        chunks = stream_export(
+            fmt,
+            compress,
+            after=after,
+            since=since,
+            until=until,
+            status=request.args.get("status"),
+            language=request.args.get("language"),
+        )
+        filename = f"translations-export.{fmt}" + (".gz" if compress else "")
+        mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+        return Response(
+            stream_with_context(chunks),
+            mimetype="application/gzip" if compress else mimetype,
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
+
+
 @ns_sessions.route("/<string:session_id>")
 class GetSession(Resource):
     def get(self, session_id):
         session_obj = Session.query.get(session_id)
         if not session_obj:
+            # Old sessions live in the archive; decompress on demand
+            archived = load_archived_session(session_id)
+            if archived:
+                return archived
             return {"error": "Session not found"}, 404
 
         return {
@@ -352,6 +669,42 @@ class GetSession(Resource):
         }
 
 
+@ns_sessions.route("/<string:session_id>/events")
+class SessionEvents(Resource):
+    # The replay must include every turn published before the live stream
+    @primary_only
+    def get(self, session_id):
+        """
+        Server-sent events for one session, for every screen showing it.
+
+        Events: ``status`` (the session, sent first and on every change),
+        ``turn`` (a new translation; its id is the SSE id) and ``recap``.
+        Turns after ``Last-Event-ID`` (or ``?after=<turn id>``) are replayed
+        first, so a reconnecting client misses nothing. The stream ends
+        after CHANNEL_STREAM_SECONDS; clients reconnect with the last id.
+        Auth headers are required, so read it with fetch, not EventSource.
+        Past CHANNEL_MAX_STREAMS open streams in this worker: 503.
+        """
+        if not Session.query.get(session_id):
+            return {"error": "Session not found"}, 404
+        try:
+            after = int(request.headers.get("Last-Event-ID") or request.args.get("after", 0))
+        except ValueError as e:
+            return {"error": f"Invalid parameter: {e}"}, 400
+
+        if not open_stream():
+            retry_after = str(RETRY_MS // 1000)
+            return {"error": "Too many open event streams"}, 503, {"Retry-After": retry_after}
+        response = Response(
+            stream_with_context(session_events(session_id, after)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # Also runs when the client leaves before the stream started
+        response.call_on_close(close_stream)
+        return response
+
+
 @ns_sessions.route("/transcribe")
 class Transcribe(Resource):
     @ns_sessions.expect(audio_parser)
@@ -377,12 +730,14 @@ class Transcribe(Resource):
 
         audio_path = DEFAULT_AUDIO_PATH
         if audio_file:
-            temp_path = os.path.join("/tmp", audio_file.filename)
-            audio_file.save(temp_path)
-            audio_path = temp_path
+            audio_path = _save_upload(audio_file)
 
         try:
             recognized_text = transcribe_audio(audio_path, transcribe_model, from_lang)
+        except ProviderUnavailable as e:
+            return _unavailable(e)
+        except DeadlineExceeded as e:
+            return deadline_exceeded(e)
         except Exception as e:
             return {"error": str(e)}, 500
         finally:
@@ -395,7 +750,10 @@ class Transcribe(Resource):
 @ns_sessions.route("/available-voices")
 class AvailableVoices(Resource):
     def get(self):
-        return list_voices()
+        catalog = get_catalog()
+        return cached_json_response(
+            "available-voices", catalog.fetched_at, lambda: catalog.voices
+        )
 
 
 @ns_sessions.route("/tts")
@@ -409,8 +767,12 @@ class TextToSpeech(Resource):
         "lang": "fr-FR",                 # optional – pick default_voice for this lang
         "session_id": "<uuid>"           # optional – derive lang from the session
     }
+
+    Send an ``Idempotency-Key`` header to have retries answered with the
+    first attempt's audio (see services/idempotency.py).
     """
 
+    @idempotent
     def post(self):
         data = request.get_json(force=True)
 
@@ -437,25 +799,21 @@ class TextToSpeech(Resource):
                         sess.language_b if text.startswith("da-") else sess.language_a
                     )
 
-            # lookup default voice - check database first, then fallback to hardcoded config
             if lang_code:
-                db_lang = LanguageSetting.query.filter_by(code=lang_code).first()
-                if db_lang and db_lang.voice:
-                    voice = db_lang.voice
-                elif lang_code in LANGUAGES:
-                    voice = LANGUAGES[lang_code]["default_voice"]
+                voice = _default_voice(lang_code)
 
         # final safety net
         if not voice:
-            voice = "en-GB-LibbyNeural"
+            voice = FALLBACK_VOICE
 
         # --- 3. synthesise ---------------------------------------------------
-        speech_config = make_speech_config()
-        speech_config.speech_synthesis_voice_name = voice
-        synthesizer = speechsdk.SpeechSynthesizer(speech_config, audio_config=None)
-
-        result = synthesizer.speak_text_async(text).get()
-        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+        try:
+            audio = synthesize_speech(text, voice)
+        except ProviderUnavailable as e:
+            return _unavailable(e)
+        except DeadlineExceeded as e:
+            return deadline_exceeded(e)
+        except RuntimeError:
             return {"error": "TTS failed"}, 500
 
-        return Response(result.audio_data, 200, mimetype="audio/wav")
+        return Response(audio, 200, mimetype="audio/wav")
@@ -0,0 +1,120 @@
+"""
+Saturation-aware admission control.
+
+Load is judged from two per-worker signals: how long recent requests waited
+for a database connection, and how many model calls are in flight. The
+listing endpoints in LISTING_PATHS are shed with 429 as soon as load reaches
+ADMISSION_LISTING_SHARE of the limits; every other endpoint may queue for
+ADMISSION_QUEUE_SECONDS and is only rejected once the full limits are
+exceeded.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from flask import request, make_response, jsonify
+from db.pool import pool_metrics
+from services import deadline
+from config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_POOL_WAIT_MS,
+    ADMISSION_MAX_INFLIGHT_LLM,
+    ADMISSION_LISTING_SHARE,
+    ADMISSION_QUEUE_SECONDS,
+    ADMISSION_RETRY_AFTER_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# GET endpoints shed first: the cached listings, the session list, search
+# and export. Anything else is a conversation or admin request
+LISTING_PATHS = {
+    "/api/v1/languages/enabled",
+    "/api/v1/sessions/available-languages",
+    "/api/v1/sessions/available-voices",
+    "/api/v1/sessions/list",
+    "/api/v1/sessions/search",
+    "/api/v1/sessions/export",
+}
+
+# Re-check interval while an interactive request is queued
+_QUEUE_POLL_SECONDS = 0.05
+
+_cond = threading.Condition()
+_inflight_llm = 0
+_stats = {"queued": 0, "shed_interactive": 0, "shed_listing": 0}
+
+
+@contextmanager
+def track_llm_call():
+    """Count a model call as in flight for the duration of the block."""
+    global _inflight_llm
+    with _cond:
+        _inflight_llm += 1
+    try:
+        yield
+    finally:
+        with _cond:
+            _inflight_llm -= 1
+            _cond.notify()
+
+
+def _overload_reason(share: float):
+    if pool_metrics.recent_wait() * 1000 > ADMISSION_MAX_POOL_WAIT_MS * share:
+        return "database"
+    if _inflight_llm >= ADMISSION_MAX_INFLIGHT_LLM * share:
+        return "model calls"
+    return None
+
+
+def _wait_for_capacity(timeout: float):
+    """Block until the full limits are met again; return the reason if not."""
+    reason = _overload_reason(1.0)
+    if reason is None:
+        return None
+
+    deadline = time.monotonic() + timeout
+    with _cond:
+        _stats["queued"] += 1
+        while reason is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _cond.wait(min(remaining, _QUEUE_POLL_SECONDS))
+            reason = _overload_reason(1.0)
+    return reason
+
+
+def admission_stats() -> dict:
+    with _cond:
+        return {"inflight_llm": _inflight_llm, **_stats}
+
+
+def register_admission_control(app):
+    @app.before_request
+    def admit():
+        if not ADMISSION_ENABLED or request.method == "OPTIONS":
+            return
+        path = request.path
+        if not path.startswith("/api/v1/") or path.startswith("/api/v1/misc/"):
+            return
+
+        if request.method == "GET" and path in LISTING_PATHS:
+            reason = _overload_reason(ADMISSION_LISTING_SHARE)
+            counter = "shed_listing"
+        else:
+            reason = _wait_for_capacity(deadline.timeout(ADMISSION_QUEUE_SECONDS, "admission"))
+            counter = "shed_interactive"
+        if reason is None:
+            return
+
+        with _cond:
+            _stats[counter] += 1
+        logger.warning("Shedding %s %s: %s saturated", request.method, path, reason)
+        return make_response(
+            jsonify({"error": f"Server busy ({reason}), please retry"}),
+            429,
+            {"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+        )
@@ -0,0 +1,197 @@
+"""
+Per-provider circuit breakers and concurrency bulkheads.
+
+Every outbound model call runs inside ``provider_guard(model_key)``. Each
+model key gets its own breaker and its own slot limit, so one degraded
+dependency fails fast with ProviderUnavailable instead of tying up every
+worker thread, and the other providers stay usable.
+
+Breaker states:
+  • closed    – calls pass; outcomes over the last BREAKER_WINDOW_SECONDS are
+                kept and the breaker opens once the error rate or the share of
+                calls slower than BREAKER_SLOW_CALL_SECONDS crosses its limit
+  • open      – calls are rejected for BREAKER_OPEN_SECONDS
+  • half-open – up to BREAKER_HALF_OPEN_CALLS trial calls; a good one closes
+                the breaker, a failed or slow one opens it again
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from config import (
+    BREAKER_ENABLED,
+    BREAKER_WINDOW_SECONDS,
+    BREAKER_MIN_CALLS,
+    BREAKER_ERROR_RATE,
+    BREAKER_SLOW_CALL_SECONDS,
+    BREAKER_SLOW_CALL_RATE,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_HALF_OPEN_CALLS,
+    PROVIDER_MAX_CONCURRENCY,
+    PROVIDER_CONCURRENCY,
+    PROVIDER_QUEUE_SECONDS,
+)
+from services import deadline
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(RuntimeError):
+    """A provider call was rejected without being attempted."""
+
+    def __init__(self, provider: str, reason: str, retry_after: float):
+        super().__init__(f"{provider} unavailable: {reason}")
+        self.provider = provider
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # (finished_at, failed, slow) for calls made while closed
+        self._outcomes: deque = deque()
+        self._opened_at = 0.0
+        self._trials = 0
+        self._inflight = 0
+        self._stats = {"short_circuited": 0, "rejected_busy": 0, "opened": 0}
+
+    def _open(self, now: float) -> None:
+        if self.state != OPEN:
+            logger.warning("Circuit for %s opened", self.name)
+            self._stats["opened"] += 1
+        self.state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+
+    def _admit(self) -> bool:
+        """Raise if the call may not proceed; return True for a half-open trial."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self._opened_at + BREAKER_OPEN_SECONDS - now
+                if remaining > 0:
+                    self._stats["short_circuited"] += 1
+                    raise ProviderUnavailable(self.name, "circuit open", remaining)
+                self.state = HALF_OPEN
+                self._trials = 0
+            if self.state == HALF_OPEN:
+                if self._trials >= BREAKER_HALF_OPEN_CALLS:
+                    self._stats["short_circuited"] += 1
+                    raise ProviderUnavailable(self.name, "circuit half-open", 1)
+                self._trials += 1
+                return True
+            return False
+
+    def _record(self, trial: bool, failed: bool, elapsed: float) -> None:
+        slow = elapsed >= BREAKER_SLOW_CALL_SECONDS
+        with self._lock:
+            now = time.monotonic()
+            if trial:
+                self._trials -= 1
+                if failed or slow:
+                    self._open(now)
+                elif self.state == HALF_OPEN:
+                    logger.info("Circuit for %s closed", self.name)
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            if self.state != CLOSED:
+                # Started before the breaker tripped; says nothing new
+                return
+
+            self._outcomes.append((now, failed, slow))
+            while self._outcomes and self._outcomes[0][0] < now - BREAKER_WINDOW_SECONDS:
+                self._outcomes.popleft()
+            calls = len(self._outcomes)
+            if calls < BREAKER_MIN_CALLS:
+                return
+            errors = sum(1 for _, f, _ in self._outcomes if f)
+            slows = sum(1 for _, _, s in self._outcomes if s)
+            if errors / calls >= BREAKER_ERROR_RATE or slows / calls >= BREAKER_SLOW_CALL_RATE:
+                self._open(now)
+
+    @contextmanager
+    def call(self):
+        """
+        Guard one provider call. Any exception in the block counts as a
+        failure, except ProviderUnavailable, DeadlineExceeded and
+        GeneratorExit, which are not recorded: the request's own budget (which
+        the client may shorten) ran out, or the client went away.
+        """
+        queue_timeout = deadline.timeout(PROVIDER_QUEUE_SECONDS, self.name)
+        trial = self._admit() if BREAKER_ENABLED else False
+        if not self._slots.acquire(timeout=queue_timeout):
+            with self._lock:
+                self._stats["rejected_busy"] += 1
+                if trial:
+                    self._trials -= 1
+            raise ProviderUnavailable(self.name, "too many concurrent calls", 1)
+
+        with self._lock:
+            self._inflight += 1
+        started = time.monotonic()
+        failed = True
+        try:
+            yield
+            failed = False
+        except (ProviderUnavailable, deadline.DeadlineExceeded, GeneratorExit):
+            # Refused before reaching the provider (e.g. client-side quota),
+            # cut short by the request's deadline or abandoned by the client
+            failed = None
+            raise
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._inflight -= 1
+                if trial and failed is None:
+                    self._trials -= 1
+            if BREAKER_ENABLED and failed is not None:
+                self._record(trial, failed, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            errors = sum(1 for _, f, _ in self._outcomes if f)
+            return {
+                "state": self.state,
+                "inflight": self._inflight,
+                "max_concurrency": self.max_concurrency,
+                "window_calls": calls,
+                "window_error_rate": round(errors / calls, 3) if calls else 0.0,
+                **self._stats,
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _registry_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            limit = PROVIDER_CONCURRENCY.get(provider, PROVIDER_MAX_CONCURRENCY)
+            breaker = _breakers[provider] = CircuitBreaker(provider, limit)
+        return breaker
+
+
+def provider_guard(provider: str):
+    """Context manager wrapping one outbound call to ``provider`` (a model key)."""
+    return get_breaker(provider).call()
+
+
+def breaker_stats() -> dict:
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
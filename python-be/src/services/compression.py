@@ -0,0 +1,153 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Text responses (JSON, NDJSON, CSV, HTML, ...) of at least
+COMPRESSION_MIN_BYTES are sent brotli-compressed when the client accepts
+"br" and the brotli module is installed, otherwise gzip-compressed when the
+client accepts it. The client's q-values decide between the two.
+
+Streamed responses stay streamed: each chunk is compressed and flushed as
+it is produced, so the client can decode everything sent so far. Server-sent
+events, file downloads (``send_file``), partial and already encoded
+responses are left alone.
+
+A compressed body is a different representation, so its ETag is made weak;
+``Vary: Accept-Encoding`` tells caches to keep the representations apart.
+"""
+
+import gzip
+import zlib
+import logging
+
+from flask import request
+
+from config import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+)
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_COMPRESSIBLE = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+_UNCOMPRESSED_STATUS = (204, 206, 304)
+
+_stats = {"compressed": 0, "streamed": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def _encodings() -> list:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(size: int | None = None) -> str | None:
+    """The encoding to send this request's response in, if any."""
+    if not COMPRESSION_ENABLED:
+        return None
+    if size is not None and size < COMPRESSION_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(_encodings())
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _compress_stream(chunks, encoding: str):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+        def encode(chunk):
+            return compressor.process(chunk) + compressor.flush()
+
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+        def encode(chunk):
+            return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        finish = compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield encode(chunk)
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _is_compressible(response) -> bool:
+    mimetype = response.mimetype or ""
+    if mimetype == "text/event-stream":
+        return False
+    return mimetype.startswith("text/") or mimetype in _COMPRESSIBLE
+
+
+def weaken_etag(response) -> None:
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        response.headers["ETag"] = "W/" + etag
+
+
+def _compress_response(response):
+    if (
+        response.status_code < 200
+        or response.status_code in _UNCOMPRESSED_STATUS
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not _is_compressible(response)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+
+    if response.is_streamed:
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+        _stats["streamed"] += 1
+    else:
+        body = response.get_data()
+        encoding = negotiate_encoding(len(body))
+        if encoding is None:
+            return response
+        encoded = compress(body, encoding)
+        response.set_data(encoded)
+        _stats["compressed"] += 1
+        _stats["bytes_in"] += len(body)
+        _stats["bytes_out"] += len(encoded)
+
+    response.headers["Content-Encoding"] = encoding
+    weaken_etag(response)
+    return response
+
+
+def init_compression(app) -> None:
+    """Compress ``app``'s responses for clients that accept it."""
+    if COMPRESSION_ENABLED:
+        app.after_request(_compress_response)
+    else:
+        logger.info("Response compression disabled")
+
+
+def compression_stats() -> dict:
+    return {"enabled": COMPRESSION_ENABLED, "encodings": _encodings(), **_stats}
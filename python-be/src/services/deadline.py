@@ -0,0 +1,230 @@
+"""
+End-to-end request deadlines.
+
+Every API request gets a time budget when it starts: its endpoint's entry
+in REQUEST_DEADLINES, else REQUEST_DEADLINE_SECONDS, or what the client asks
+for in an ``X-Request-Timeout`` header (seconds, at most
+REQUEST_DEADLINE_MAX_SECONDS). A budget of 0 means no deadline (the event
+stream and the export).
+
+Each step of the pipeline takes the time left as its timeout, capped by its
+own setting (``timeout(cap, stage)``): model and speech requests, TTS
+synthesis, ffmpeg, waiting for admission, a provider slot or quota, a
+coalesced duplicate, and database reads (a MAX_EXECUTION_TIME hint on MySQL,
+a progress handler on SQLite). Once the budget is spent the next step raises
+DeadlineExceeded instead of starting, the streams in flight are abandoned,
+and the endpoint answers 504 – a request the browser has given up on stops
+holding a worker.
+
+Writes are not cut short: a turn whose translation is done is saved, and
+its response kept for an Idempotency-Key retry.
+
+The deadline lives in a context variable; ``carry`` hands it to work
+submitted to a thread pool.
+"""
+
+import time
+import subprocess
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+
+from config import (
+    REQUEST_DEADLINE_ENABLED,
+    REQUEST_DEADLINE_SECONDS,
+    REQUEST_DEADLINE_MAX_SECONDS,
+    REQUEST_DEADLINES,
+)
+
+HEADER = "X-Request-Timeout"
+# SQLite calls the progress handler every this many virtual machine steps
+_SQLITE_PROGRESS_STEPS = 10_000
+
+# time.monotonic() by which the current request must be answered, or None
+_deadline: ContextVar = ContextVar("request_deadline", default=None)
+_stats = {"requests": 0, "client_set": 0, "exceeded": 0}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before or during ``stage``."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded ({stage})")
+        self.stage = stage
+
+
+def remaining():
+    """Seconds left in the current request's budget; None without a deadline."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(stage: str) -> None:
+    """Raise DeadlineExceeded if the budget is spent."""
+    if expired():
+        raise DeadlineExceeded(stage)
+
+
+def timeout(cap, stage: str):
+    """
+    Timeout for the next step of ``stage``: the time left, at most ``cap``
+    (None: no cap). Raises DeadlineExceeded if no time is left.
+    """
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise DeadlineExceeded(stage)
+    return left if cap is None else min(cap, left)
+
+
+def _is_timeout(exc: Exception) -> bool:
+    # requests is loaded lazily (see services/http_client.py); only a call
+    # that already imported it can have raised its Timeout
+    import requests
+
+    return isinstance(exc, (requests.Timeout, subprocess.TimeoutExpired))
+
+
+@contextmanager
+def bounded(stage: str):
+    """Report a timeout in the block as DeadlineExceeded once the budget is spent."""
+    try:
+        yield
+    except Exception as e:
+        if expired() and _is_timeout(e):
+            raise DeadlineExceeded(stage) from e
+        raise
+
+
+@contextmanager
+def budget(seconds):
+    """Run the block under a deadline ``seconds`` from now (None: none)."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def carry(fn):
+    """``fn`` wrapped to run under the current deadline, e.g. in a thread pool."""
+    at = _deadline.get()
+
+    def run(*args, **kwargs):
+        token = _deadline.set(at)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    return run
+
+
+# ---- database ---------------------------------------------------------------
+
+
+def _bound_statement(conn, cursor, statement, parameters, context, executemany):
+    left = remaining()
+    if left is None or statement.lstrip()[:6].upper() != "SELECT":
+        return statement, parameters
+    if left <= 0:
+        raise DeadlineExceeded("database")
+    if conn.dialect.name == "mysql":
+        # MySQL aborts a read-only SELECT that runs past the hint
+        statement = "SELECT /*+ MAX_EXECUTION_TIME(%d) */%s" % (
+            max(1, int(left * 1000)),
+            statement.lstrip()[6:],
+        )
+    return statement, parameters
+
+
+def _sqlite_progress(dbapi_connection):
+    def interrupt() -> int:
+        # Non-zero aborts the statement; writes in progress are left alone
+        return int(expired() and not dbapi_connection.in_transaction)
+
+    return interrupt
+
+
+def _on_sqlite_connect(dbapi_connection, connection_record) -> None:
+    dbapi_connection.set_progress_handler(
+        _sqlite_progress(dbapi_connection), _SQLITE_PROGRESS_STEPS
+    )
+
+
+def configure_engine(engine) -> None:
+    """Bound ``engine``'s reads by the current request's deadline."""
+    event.listen(engine, "before_cursor_execute", _bound_statement, retval=True)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _on_sqlite_connect)
+
+
+# ---- requests ---------------------------------------------------------------
+
+
+def _requested_budget():
+    header = request.headers.get(HEADER)
+    if header:
+        try:
+            seconds = float(header)
+        except ValueError:
+            seconds = 0
+        if seconds > 0:
+            _stats["client_set"] += 1
+            return min(seconds, REQUEST_DEADLINE_MAX_SECONDS)
+    return REQUEST_DEADLINES.get(request.endpoint, REQUEST_DEADLINE_SECONDS)
+
+
+def _start_request() -> None:
+    if request.endpoint is None or not request.path.startswith("/api/"):
+        return
+    seconds = _requested_budget()
+    _stats["requests"] += 1
+    g.deadline_token = _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def deadline_exceeded(exc: DeadlineExceeded):
+    """504 for a request whose budget ran out (also the API's error handler)."""
+    return {"error": str(exc)}, 504
+
+
+def _count_exceeded(response):
+    if response.status_code == 504:
+        _stats["exceeded"] += 1
+    return response
+
+
+def _end_request(exc) -> None:
+    token = g.pop("deadline_token", None)
+    if token is not None:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # Torn down in another context than the request started in
+            _deadline.set(None)
+
+
+def init_deadlines(app) -> None:
+    """Give each of ``app``'s API requests a deadline."""
+    if not REQUEST_DEADLINE_ENABLED:
+        return
+    app.before_request(_start_request)
+    app.after_request(_count_exceeded)
+    app.teardown_request(_end_request)
+
+
+def deadline_stats() -> dict:
+    return {
+        "enabled": REQUEST_DEADLINE_ENABLED,
+        "default_seconds": REQUEST_DEADLINE_SECONDS,
+        "endpoints": REQUEST_DEADLINES,
+        **_stats,
+    }
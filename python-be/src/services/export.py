@@ -0,0 +1,122 @@
+"""
+Streaming export of translations joined with their sessions.
+
+One record per translation, so sessions without any translation (never
+started, or no turn yet) are not in the export; the session listing has
+them. Keying records by translation keeps the resume cursor well defined.
+
+Rows are read through a server-side cursor (``yield_per``) as plain column
+tuples, encoded as NDJSON or CSV and optionally gzip-compressed chunk by
+chunk, so memory stays flat regardless of export size. Every record carries
+its translation id as ``cursor``; passing the last one seen as ``after``
+resumes an interrupted export.
+"""
+
+import io
+import csv
+import zlib
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from services.json_codec import dumps
+
+EXPORT_BATCH_SIZE = 1000
+# Flush to the client once this much encoded output has accumulated
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FIELDS = [
+    "cursor",
+    "session_id",
+    "session_status",
+    "language_a",
+    "language_b",
+    "from",
+    "to",
+    "original",
+    "translated",
+    "created_at",
+]
+
+
+def _export_query(after=0, since=None, until=None, status=None, language=None):
+    q = (
+        db.session.query(
+            Translation.id,
+            Translation.session_id,
+            Session.status,
+            Session.language_a,
+            Session.language_b,
+            Translation.from_lang,
+            Translation.to_lang,
+            Translation.original,
+            Translation.translated,
+            Translation.created_at,
+        )
+        .join(Session, Session.id == Translation.session_id)
+        .filter(Translation.id > after)
+    )
+    if since:
+        q = q.filter(Translation.created_at >= since)
+    if until:
+        q = q.filter(Translation.created_at < until)
+    if status:
+        q = q.filter(Session.status == status)
+    if language:
+        q = q.filter(
+            (Translation.from_lang == language) | (Translation.to_lang == language)
+        )
+    return q.order_by(Translation.id).yield_per(EXPORT_BATCH_SIZE)
+
+
+def _records(query):
+    for row in query:
+        values = list(row)
+        created_at = values[-1]
+        values[-1] = created_at.isoformat() if created_at else None
+        yield dict(zip(EXPORT_FIELDS, values))
+
+
+def _ndjson_lines(records):
+    for record in records:
+        yield dumps(record) + b"\n"
+
+
+def _csv_lines(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _chunked(lines, compress: bool):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending, size = [], 0
+    for line in lines:
+        data = line if isinstance(line, bytes) else line.encode()
+        pending.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            chunk = b"".join(pending)
+            pending, size = [], 0
+            if compressor:
+                # Sync flush so the client can decode everything sent so far
+                chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield chunk
+    tail = b"".join(pending)
+    if compressor:
+        tail = compressor.compress(tail) + compressor.flush()
+    if tail:
+        yield tail
+
+
+def stream_export(fmt="ndjson", compress=False, **filters):
+    """Yield encoded export chunks. Needs an application context while iterating."""
+    records = _records(_export_query(**filters))
+    lines = _csv_lines(records) if fmt == "csv" else _ndjson_lines(records)
+    return _chunked(lines, compress)
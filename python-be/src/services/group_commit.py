@@ -0,0 +1,154 @@
+"""
+Group-commit writer for Translation rows.
+
+Requests hand their new translation to a per-process writer thread, which
+collects everything that arrives within GROUP_COMMIT_WINDOW_MS and writes it
+in a single transaction (one fsync instead of one per utterance). The caller
+blocks on the returned future until that transaction has committed. A write
+that times out while still queued is withdrawn, so a retry cannot store the
+turn twice.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from config import (
+    STATUS_ONGOING,
+    GROUP_COMMIT_ENABLED,
+    GROUP_COMMIT_WINDOW_MS,
+    GROUP_COMMIT_MAX_BATCH,
+    GROUP_COMMIT_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    def __init__(self, app, window_ms: float, max_batch: int):
+        self.app = app
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[tuple[dict, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self) -> None:
+        # The thread does not survive a fork, so start one per worker process
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, name="group-commit", daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, fields: dict) -> Future:
+        """Queue a Translation insert; the future resolves to its id once durable."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((fields, future))
+        return future
+
+    def write(self, fields: dict, timeout: float = GROUP_COMMIT_TIMEOUT_SECONDS) -> int:
+        """
+        Insert a Translation and return its id. A write still queued after
+        ``timeout`` is withdrawn (never written) and raises TimeoutError; one
+        already being committed is waited for up to another ``timeout``.
+        """
+        future = self.submit(fields)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            if future.cancel():
+                # Still queued: the writer will skip it
+                raise
+        # Already in a transaction; its outcome is decided shortly
+        return future.result(timeout=timeout)
+
+    # -- writer thread --------------------------------------------------------
+
+    def _take(self, timeout=None):
+        """Next queued write that has not been withdrawn by its caller."""
+        while True:
+            item = self._queue.get(timeout=timeout)
+            if item[1].set_running_or_notify_cancel():
+                return item
+
+    def _collect(self) -> list:
+        batch = [self._take()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._take(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                with self.app.app_context():
+                    self._flush(batch)
+            except Exception as exc:
+                # Keep the thread alive; fail whatever this batch left unresolved
+                logger.exception("Group commit writer failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _flush(self, batch: list) -> None:
+        try:
+            ids = self._commit([fields for fields, _ in batch])
+        except Exception as exc:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            # Retry one by one so a single bad row does not fail its neighbours
+            logger.warning(
+                "Group commit of %d rows failed, retrying singly", len(batch)
+            )
+            for item in batch:
+                self._flush([item])
+            return
+        finally:
+            db.session.remove()
+
+        for (_, future), translation_id in zip(batch, ids):
+            future.set_result(translation_id)
+        logger.debug("Group commit wrote %d translations", len(batch))
+
+    @staticmethod
+    def _commit(rows: list[dict]) -> list[int]:
+        translations = [Translation(**fields) for fields in rows]
+        db.session.add_all(translations)
+        session_ids = {fields["session_id"] for fields in rows}
+        db.session.query(Session).filter(Session.id.in_(session_ids)).update(
+            {Session.status: STATUS_ONGOING}, synchronize_session=False
+        )
+        db.session.flush()
+        # Read ids before commit expires the objects
+        ids = [t.id for t in translations]
+        db.session.commit()
+        return ids
+
+
+def init_group_commit(app) -> None:
+    """Attach a writer to ``app.extensions`` when GROUP_COMMIT_ENABLED is set."""
+    if GROUP_COMMIT_ENABLED:
+        app.extensions["group_commit"] = GroupCommitWriter(
+            app, GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH
+        )
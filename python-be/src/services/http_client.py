@@ -0,0 +1,37 @@
+"""
+Keep-alive HTTP session for provider calls.
+
+``requests.post`` opens (and TLS-handshakes) a new connection per call. One
+``requests.Session`` per worker process keeps the connections to each
+provider host open between calls, and warm-up opens them before the first
+request arrives.
+"""
+
+import os
+import threading
+
+from config import PROVIDER_MAX_CONCURRENCY
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """This process's pooled ``requests.Session``."""
+    global _session, _session_pid
+    # Pooled sockets must not be shared across a fork: one session per pid
+    if _session_pid == os.getpid():
+        return _session
+    with _session_lock:
+        if _session_pid != os.getpid():
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # Enough idle connections per host for the provider bulkhead
+            adapter = HTTPAdapter(pool_maxsize=PROVIDER_MAX_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session, _session_pid = session, os.getpid()
+    return _session
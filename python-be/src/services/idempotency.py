@@ -0,0 +1,255 @@
+"""
+Idempotency keys and request coalescing for POST views (``@idempotent``).
+
+A client retrying after a dropped connection sends the same
+``Idempotency-Key`` header again. The retry is answered with the response
+of the first attempt, kept for IDEMPOTENCY_TTL_SECONDS in the shared cache
+so any worker on the host can serve it, instead of transcribing,
+translating and saving the turn a second time. Replays carry
+``Idempotent-Replayed: true``; a key reused for a different request is a 422.
+
+Identical requests running at the same time are coalesced (singleflight):
+one calls the providers, the others wait for it and return its response.
+Within a worker, waiters block on the running call – this applies to
+requests with the same key and, without a key, to requests with the same
+body (form fields and audio included). Across workers, a keyed request
+takes a marker in the shared cache (set-if-absent, so exactly one worker
+gets it) while it runs, and a retry arriving at another worker polls for
+its response instead of starting over.
+
+Responses with status 5xx, 408, 409, 425 or 429 are not kept, so a retry
+after a failure runs again. Neither are responses too large for a shared
+cache slot (long TTS audio): only the worker that produced them replays them
+while they run, other workers run the request again.
+"""
+
+import json
+import time
+import hashlib
+import threading
+from functools import wraps
+
+from flask import Response, request
+
+from config import IDEMPOTENCY_ENABLED, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_WAIT_SECONDS
+from services import deadline
+from services.shared_cache import get_cache
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+_MAX_KEY_LENGTH = 255
+_RUN_AGAIN_STATUSES = (408, 409, 425, 429)
+# How often a retry polls for the response of a request running in another worker
+_POLL_SECONDS = 0.05
+
+# "<path>:<key>" -> response of the first attempt, or _RUN_AGAIN
+_responses = get_cache("idempotency", 1024, ttl=IDEMPOTENCY_TTL_SECONDS)
+# "<path>:<key>" -> request fingerprint, while the request runs
+_running = get_cache("idempotency-running", 1024, ttl=IDEMPOTENCY_WAIT_SECONDS)
+_RUN_AGAIN = {"run_again": True}
+
+_inflight: dict[str, "_Call"] = {}
+_lock = threading.Lock()
+_stats = {"replayed": 0, "coalesced": 0, "awaited": 0, "mismatched": 0, "timeouts": 0}
+
+
+class _Call:
+    """A running request that identical ones wait for."""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.record = None
+        self.error = None
+
+
+def _fingerprint() -> str:
+    """Hash of the path and body; form fields and files for form posts."""
+    digest = hashlib.blake2b(request.path.encode(), digest_size=16)
+    if request.mimetype in ("multipart/form-data", "application/x-www-form-urlencoded"):
+        # Multipart boundaries differ between attempts, so hash the parts
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"\0{name}={value}".encode())
+        for name, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"\0{name}:{file.filename}\0".encode())
+            for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
+                digest.update(chunk)
+            file.stream.seek(0)
+    else:
+        body = request.get_json(silent=True) if request.is_json else None
+        if body is not None:
+            digest.update(json.dumps(body, sort_keys=True).encode())
+        else:
+            digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+# ---- responses --------------------------------------------------------------
+
+
+def _capture(rv, fingerprint: str) -> dict:
+    """A view's return value as a record that can be replayed."""
+    if isinstance(rv, Response):
+        return {
+            "fingerprint": fingerprint,
+            "status": rv.status_code,
+            "mimetype": rv.mimetype,
+            "headers": {
+                k: v for k, v in rv.headers.items() if k not in ("Content-Type", "Content-Length")
+            },
+            "body": rv.get_data(),
+        }
+    if not isinstance(rv, tuple):
+        rv = (rv,)
+    return {
+        "fingerprint": fingerprint,
+        "status": rv[1] if len(rv) > 1 else 200,
+        "headers": dict(rv[2]) if len(rv) > 2 else {},
+        "data": rv[0],
+    }
+
+
+def _replay(record: dict):
+    headers = {**record["headers"], REPLAYED_HEADER: "true"}
+    if "body" in record:
+        return Response(
+            record["body"], record["status"], headers=headers, mimetype=record["mimetype"]
+        )
+    return record["data"], record["status"], headers
+
+
+def _mismatch():
+    _stats["mismatched"] += 1
+    return {"error": f"{HEADER} was already used for a different request"}, 422
+
+
+def _pack(record: dict):
+    # Audio bodies are stored as bytes: a JSON header line, then the body
+    if "body" not in record:
+        return record
+    meta = {k: v for k, v in record.items() if k != "body"}
+    return json.dumps(meta).encode() + b"\n" + record["body"]
+
+
+def _unpack(value) -> dict:
+    if isinstance(value, bytes):
+        meta, _, body = value.partition(b"\n")
+        return {**json.loads(meta), "body": body}
+    return value
+
+
+# ---- keyed requests across workers ------------------------------------------
+
+
+def _claim(flight: str, fingerprint: str):
+    """
+    The first attempt's record, waiting for it while another worker runs it;
+    None once this worker holds the running marker and runs the request.
+    """
+    awaited = False
+    while True:
+        value = _responses.get(flight)
+        if value is None or value == _RUN_AGAIN:
+            # Set-if-absent in the shared tier: one worker gets the marker
+            if not _running.add(flight, fingerprint):
+                if not awaited:
+                    _stats["awaited"] += 1
+                    awaited = True
+                # Bounded by the marker's TTL should that worker die
+                deadline.check("coalesced request")
+                time.sleep(_POLL_SECONDS)
+                continue
+            # It may have finished between the two reads
+            value = _responses.get(flight)
+            if value is None or value == _RUN_AGAIN:
+                return None
+            _running.delete(flight)
+        return _unpack(value)
+
+
+def _finish(flight: str, record=None) -> None:
+    kept = (
+        record is not None
+        and record["status"] < 500
+        and record["status"] not in _RUN_AGAIN_STATUSES
+        and _responses.set(flight, _pack(record))
+    )
+    if not kept:
+        # Retries waiting in other workers run the request themselves
+        _responses.set(flight, _RUN_AGAIN, ttl=IDEMPOTENCY_WAIT_SECONDS)
+    _running.delete(flight)
+
+
+# ---- decorator --------------------------------------------------------------
+
+
+def _follow(call: _Call, fingerprint: str):
+    if call.fingerprint != fingerprint:
+        return _mismatch()
+    _stats["coalesced"] += 1
+    if not call.done.wait(deadline.timeout(IDEMPOTENCY_WAIT_SECONDS, "coalesced request")):
+        deadline.check("coalesced request")
+        _stats["timeouts"] += 1
+        return {"error": "An identical request is still in progress"}, 409, {"Retry-After": "1"}
+    if call.error is not None:
+        raise call.error
+    if call.record is None:
+        # The key's first attempt was a different request
+        return _mismatch()
+    return _replay(call.record)
+
+
+def idempotent(view):
+    """Serve retries and concurrent duplicates of a POST view with one response."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not IDEMPOTENCY_ENABLED:
+            return view(*args, **kwargs)
+        key = request.headers.get(HEADER)
+        if key is not None and not 0 < len(key) <= _MAX_KEY_LENGTH:
+            return {"error": f"{HEADER} must be 1 to {_MAX_KEY_LENGTH} characters"}, 400
+        fingerprint = _fingerprint()
+        flight = f"{request.path}:{key}" if key else f"{request.path}#{fingerprint}"
+
+        with _lock:
+            call = _inflight.get(flight)
+            leading = call is None
+            if leading:
+                call = _inflight[flight] = _Call(fingerprint)
+        if not leading:
+            return _follow(call, fingerprint)
+
+        claimed = False
+        try:
+            if key:
+                record = _claim(flight, fingerprint)
+                if record is not None:
+                    if record["fingerprint"] != fingerprint:
+                        return _mismatch()
+                    call.record = record
+                    _stats["replayed"] += 1
+                    return _replay(record)
+                claimed = True
+            rv = view(*args, **kwargs)
+            call.record = _capture(rv, fingerprint)
+            if claimed:
+                _finish(flight, call.record)
+            return rv
+        except BaseException as e:
+            call.error = e
+            if claimed:
+                _finish(flight)
+            raise
+        finally:
+            with _lock:
+                del _inflight[flight]
+            call.done.set()
+
+    return wrapper
+
+
+def idempotency_stats() -> dict:
+    with _lock:
+        running = len(_inflight)
+    return {"enabled": IDEMPOTENCY_ENABLED, "running": running, **_stats}
@@ -0,0 +1,246 @@
+"""
+Client-side rate limiting for model deployments with TPM/RPM quotas.
+
+Each deployment URL listed in RATE_LIMITS gets a token bucket and a request
+bucket that refill continuously at the quota rate. Before a call, the prompt
+and completion tokens are estimated and spent from both buckets; if either is
+short, the caller queues for up to RATE_LIMIT_QUEUE_SECONDS. Responses
+resynchronise the buckets: ``x-ratelimit-remaining-*`` headers set the
+levels, ``usage.total_tokens`` corrects the estimate, and a 429 drains both
+buckets until ``Retry-After`` has passed.
+
+Buckets hold RATE_LIMIT_BURST_SECONDS of quota, so traffic is spread over
+the minute instead of spending the whole quota at once and stalling.
+"""
+
+import time
+import logging
+import threading
+
+from config import (
+    MODEL_URL_MAP,
+    RATE_LIMITS,
+    RATE_LIMIT_BURST_SECONDS,
+    RATE_LIMIT_QUEUE_SECONDS,
+    RATE_LIMIT_WORKERS,
+)
+from services import deadline
+from services.circuit_breaker import ProviderUnavailable
+from services.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+# Rough tokens per UTF-8 byte; non-Latin scripts use more bytes per token
+_BYTES_PER_TOKEN = 4
+_TOKENS_PER_MESSAGE = 4
+# Translations are about as long as their source; leave headroom
+_COMPLETION_FACTOR = 1.5
+_COMPLETION_MIN_TOKENS = 32
+
+
+class RateLimited(ProviderUnavailable):
+    """The deployment's quota is used up for longer than a caller may wait."""
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (amounts above capacity wait for a full bucket)."""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate else float("inf")
+
+
+class DeploymentLimiter:
+    def __init__(self, name: str, tokens_per_minute: float, requests_per_minute: float):
+        self.name = name
+        self.tokens = TokenBucket(tokens_per_minute, RATE_LIMIT_BURST_SECONDS)
+        self.requests = TokenBucket(requests_per_minute, RATE_LIMIT_BURST_SECONDS)
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._stats = {"calls": 0, "queued": 0, "rejected": 0, "throttled": 0}
+
+    def _refill(self, now: float) -> None:
+        self.tokens.refill(now)
+        self.requests.refill(now)
+
+    def acquire(self, tokens: float, deadline: float) -> None:
+        """Spend one request and ``tokens`` tokens, waiting until ``deadline`` at most."""
+        with self._cond:
+            queued = False
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(
+                    self._blocked_until - now,
+                    self.tokens.wait_for(tokens),
+                    self.requests.wait_for(1),
+                )
+                if wait <= 0:
+                    # May go negative for oversized prompts; later calls repay it
+                    self.tokens.level -= tokens
+                    self.requests.level -= 1
+                    self._stats["calls"] += 1
+                    return
+                if now + wait > deadline:
+                    self._stats["rejected"] += 1
+                    raise RateLimited(self.name, "rate limit reached", wait)
+                if not queued:
+                    self._stats["queued"] += 1
+                    queued = True
+                self._cond.wait(wait)
+
+    def observe(self, response, estimated_tokens: float, read_usage: bool = True) -> float:
+        """
+        Resynchronise from a response. Returns the Retry-After delay for a
+        429, else 0. ``read_usage`` must be False for streamed responses,
+        whose body belongs to the caller.
+        """
+        headers = response.headers
+        with self._cond:
+            self._refill(time.monotonic())
+            if response.status_code == 429:
+                self._stats["throttled"] += 1
+                retry_after = _retry_after(headers)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                self.tokens.level = min(self.tokens.level, 0.0)
+                self.requests.level = min(self.requests.level, 0.0)
+                return retry_after
+
+            remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens")
+            remaining_requests = _header_number(headers, "x-ratelimit-remaining-requests")
+            # Headers count the whole deployment; this worker owns its share
+            if remaining_tokens is not None:
+                self.tokens.level = min(
+                    self.tokens.capacity, remaining_tokens / RATE_LIMIT_WORKERS
+                )
+            elif read_usage:
+                actual = _usage_tokens(response)
+                if actual is not None:
+                    self.tokens.level += estimated_tokens - actual
+            if remaining_requests is not None:
+                self.requests.level = min(
+                    self.requests.capacity, remaining_requests / RATE_LIMIT_WORKERS
+                )
+            self._cond.notify_all()
+        return 0.0
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "tokens_available": int(self.tokens.level),
+                "requests_available": round(self.requests.level, 1),
+                **self._stats,
+            }
+
+
+def _header_number(headers, name: str):
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers) -> float:
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = _header_number(headers, name)
+        if value is not None:
+            return value / 1000.0
+    value = _header_number(headers, "retry-after")
+    return value if value is not None else 1.0
+
+
+def _usage_tokens(response):
+    try:
+        return float(response.json()["usage"]["total_tokens"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def estimate_tokens(payload: dict) -> float:
+    """Prompt plus expected completion tokens for a chat payload."""
+    prompt = 0.0
+    user = 0.0
+    for message in payload.get("messages", []):
+        size = len(message.get("content", "").encode()) / _BYTES_PER_TOKEN
+        prompt += size + _TOKENS_PER_MESSAGE
+        if message.get("role") == "user":
+            user += size
+    completion = payload.get("max_tokens") or max(
+        _COMPLETION_MIN_TOKENS, user * _COMPLETION_FACTOR
+    )
+    return prompt + completion
+
+
+_limiters: dict[str, DeploymentLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_limiter(model_key: str):
+    """The limiter for the deployment behind ``model_key``, or None if unlimited."""
+    quota = RATE_LIMITS.get(model_key)
+    url = MODEL_URL_MAP.get(model_key)
+    if not quota or not url:
+        return None
+    with _registry_lock:
+        # Model keys sharing a deployment URL share its quota
+        limiter = _limiters.get(url)
+        if limiter is None:
+            tpm, rpm = quota
+            limiter = _limiters[url] = DeploymentLimiter(
+                model_key, tpm / RATE_LIMIT_WORKERS, rpm / RATE_LIMIT_WORKERS
+            )
+        return limiter
+
+
+def post_within_quota(model_key: str, url: str, payload: dict, **kwargs):
+    """
+    ``requests.post(url, json=payload, **kwargs)`` paced by the deployment's
+    quota, over this worker's keep-alive session. A 429 is retried after its
+    Retry-After if that fits in the queue budget; otherwise RateLimited is
+    raised. ``timeout`` is capped by the time left in the request's deadline.
+    """
+    session = get_session()
+    limiter = get_limiter(model_key)
+    cap = kwargs.pop("timeout", None)
+
+    def post():
+        with deadline.bounded(model_key):
+            return session.post(
+                url, json=payload, timeout=deadline.timeout(cap, model_key), **kwargs
+            )
+
+    if limiter is None:
+        return post()
+
+    estimated = estimate_tokens(payload)
+    queue_until = time.monotonic() + deadline.timeout(RATE_LIMIT_QUEUE_SECONDS, model_key)
+    while True:
+        limiter.acquire(estimated, queue_until)
+        response = post()
+        retry_after = limiter.observe(
+            response, estimated, read_usage=not kwargs.get("stream")
+        )
+        if not retry_after:
+            return response
+        # Give the connection back to the pool; a streamed 429 is never read
+        response.close()
+        logger.info("%s returned 429, retry after %.1fs", model_key, retry_after)
+        if time.monotonic() + retry_after > queue_until:
+            raise RateLimited(model_key, "quota exceeded", retry_after)
+
+
+def rate_limit_stats() -> dict:
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,136 @@
+"""
+Serialized-response cache for the read-mostly listing endpoints.
+
+Each cached body is tagged with the generation of the data it was built
+from. Writes bump the generation (stored in the database so every worker
+sees it), which makes the next request rebuild the body. Bodies carry a
+strong ETag so unchanged data is answered with 304 Not Modified. The
+compressed variants of a body (see services/compression.py) are cached next
+to it, so they are not recompressed per request either.
+
+Bodies and generation reads live in the shared cache, so a body built or a
+generation read by one worker serves all workers on the host.
+"""
+
+import hashlib
+import logging
+
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+
+from db.sql import db
+from models.cache_generation import CacheGeneration
+from config import GENERATION_POLL_SECONDS
+from services.shared_cache import get_cache
+from services.json_codec import dumps
+from services.compression import negotiate_encoding, compress, weaken_etag
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_GENERATION = "language_settings"
+# Bumped when retention deletes translations from the live tables
+TRANSLATIONS_REMOVED_GENERATION = "translations_removed"
+# Counters seeded by ``flask migrate``; bump_generation only updates rows
+GENERATIONS = (SETTINGS_GENERATION, TRANSLATIONS_REMOVED_GENERATION)
+# Session.info key: generations bumped in the session's open transaction
+_BUMPED = "bumped_generations"
+
+# generation name -> value, re-read from the database when it expires
+_generations = get_cache("generations", max_items=64, ttl=GENERATION_POLL_SECONDS)
+# "<cache key>@<generation>" -> serialized body, and
+# "<cache key>@<generation>:<encoding>" -> compressed body
+_bodies = get_cache("responses", max_items=64)
+
+
+def get_generation(name: str) -> int:
+    """Return the current value of a generation counter."""
+    value = _generations.get(name)
+    if value is not None:
+        return value
+
+    value = (
+        db.session.query(CacheGeneration.value)
+        .filter(CacheGeneration.name == name)
+        .scalar()
+    ) or 0
+    _generations.set(name, value)
+    return value
+
+
+def seed_generations() -> list[str]:
+    """Insert the missing counters of GENERATIONS at 0. Returns their names."""
+    existing = {name for (name,) in db.session.query(CacheGeneration.name)}
+    missing = [name for name in GENERATIONS if name not in existing]
+    db.session.add_all(CacheGeneration(name=name, value=0) for name in missing)
+    db.session.commit()
+    return missing
+
+
+def bump_generation(name: str) -> None:
+    """
+    Increment a generation counter inside the current transaction.
+    Call before ``db.session.commit()`` of the write it belongs to; the
+    cached value is dropped once that commit is done.
+    """
+    # A single UPDATE of a seeded row: concurrent bumps serialize on the row
+    # instead of racing to insert it
+    updated = (
+        db.session.query(CacheGeneration)
+        .filter(CacheGeneration.name == name)
+        .update({CacheGeneration.value: CacheGeneration.value + 1})
+    )
+    if not updated:
+        raise LookupError(f"Generation {name!r} is not seeded; run `flask migrate`")
+    db.session.info.setdefault(_BUMPED, set()).add(name)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _forget_bumped(session) -> None:
+    # Re-read on the next request instead of waiting out the poll interval.
+    # Not earlier: a reader could still cache the old value until it expires
+    for name in session.info.pop(_BUMPED, ()):
+        _generations.delete(name)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_bumped(session) -> None:
+    session.info.pop(_BUMPED, None)
+
+
+def _make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def cached_json_response(key: str, generation, build) -> Response:
+    """
+    Serve ``build()`` as JSON, reusing the serialized body while ``generation``
+    is unchanged and answering 304 when the client already has it.
+    """
+    body_key = f"{key}@{generation}"
+    body = _bodies.get(body_key)
+    if body is None:
+        body = dumps(build())
+        _bodies.set(body_key, body)
+        logger.debug("Rebuilt cached response %s for generation %s", key, generation)
+
+    etag = _make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(len(body))
+    if encoding:
+        encoded_key = f"{body_key}:{encoding}"
+        encoded = _bodies.get(encoded_key)
+        if encoded is None:
+            encoded = compress(body, encoding)
+            _bodies.set(encoded_key, encoded)
+        body = encoded
+        headers["Content-Encoding"] = encoding
+
+    # Compressed responses carry the weak form of the ETag
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(body, 200, headers=headers, mimetype="application/json")
+    if encoding:
+        weaken_etag(response)
+    return response
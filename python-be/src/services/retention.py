@@ -0,0 +1,203 @@
+"""
+Retention for the sessions and translations tables.
+
+Finished sessions older than RETENTION_ARCHIVE_AFTER_DAYS are moved,
+together with their translations, into compressed rows in ``session_archives``. Sessions
+that never left STATUS_CREATED are deleted after
+RETENTION_ABANDONED_AFTER_HOURS. Work happens in small batches, each in its
+own short transaction with SKIP LOCKED row locks, so live traffic is not
+blocked and several workers can run passes concurrently.
+"""
+
+import json
+import time
+import zlib
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from models.session_archive import SessionArchive
+from services.warmup import in_each_worker
+from services.response_cache import TRANSLATIONS_REMOVED_GENERATION, bump_generation
+from config import (
+    STATUS_CREATED,
+    STATUS_FINISHED,
+    RETENTION_ENABLED,
+    RETENTION_ARCHIVE_AFTER_DAYS,
+    RETENTION_ABANDONED_AFTER_HOURS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_BATCH_PAUSE_SECONDS,
+    RETENTION_INTERVAL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _translation_record(t: Translation) -> dict:
+    return {
+        "id": t.id,
+        **t.to_dict(),
+        "created_at": t.created_at.isoformat() if t.created_at else None,
+    }
+
+
+def _compress(session: Session, translations: list[Translation]) -> bytes:
+    document = {
+        "session": {
+            **session.to_dict(),
+            "created_at": (
+                session.created_at.isoformat() if session.created_at else None
+            ),
+        },
+        "translations": [_translation_record(t) for t in translations],
+    }
+    return zlib.compress(json.dumps(document, ensure_ascii=False).encode(), 9)
+
+
+def _lock_batch(query, batch_size: int) -> list[Session]:
+    # SKIP LOCKED lets concurrent workers take disjoint batches
+    return (
+        query.order_by(Session.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def _delete_sessions(ids: list[str]) -> None:
+    removed = Translation.query.filter(Translation.session_id.in_(ids)).delete(
+        synchronize_session=False
+    )
+    Session.query.filter(Session.id.in_(ids)).delete(synchronize_session=False)
+    if removed:
+        # Translation memories drop the removed turns
+        bump_generation(TRANSLATIONS_REMOVED_GENERATION)
+
+
+def archive_batch(cutoff: datetime, batch_size: int = RETENTION_BATCH_SIZE) -> int:
+    """Archive up to ``batch_size`` finished sessions created before ``cutoff``."""
+    sessions = _lock_batch(
+        Session.query.filter(
+            Session.created_at < cutoff, Session.status == STATUS_FINISHED
+        ),
+        batch_size,
+    )
+    if not sessions:
+        db.session.rollback()
+        return 0
+
+    ids = [s.id for s in sessions]
+    by_session: dict[str, list[Translation]] = {sid: [] for sid in ids}
+    for t in (
+        Translation.query.filter(Translation.session_id.in_(ids))
+        .order_by(Translation.id)
+        .all()
+    ):
+        by_session[t.session_id].append(t)
+
+    for s in sessions:
+        db.session.merge(
+            SessionArchive(
+                session_id=s.id,
+                status=s.status,
+                language_a=s.language_a,
+                language_b=s.language_b,
+                created_at=s.created_at,
+                translation_count=len(by_session[s.id]),
+                payload=_compress(s, by_session[s.id]),
+            )
+        )
+    _delete_sessions(ids)
+    db.session.commit()
+    return len(ids)
+
+
+def purge_abandoned_batch(
+    cutoff: datetime, batch_size: int = RETENTION_BATCH_SIZE
+) -> int:
+    """Delete up to ``batch_size`` never-started sessions created before ``cutoff``."""
+    sessions = _lock_batch(
+        Session.query.filter(
+            Session.created_at < cutoff, Session.status == STATUS_CREATED
+        ),
+        batch_size,
+    )
+    if not sessions:
+        db.session.rollback()
+        return 0
+
+    _delete_sessions([s.id for s in sessions])
+    db.session.commit()
+    return len(sessions)
+
+
+def _drain(step, cutoff: datetime) -> int:
+    total = 0
+    while True:
+        done = step(cutoff)
+        total += done
+        if done < RETENTION_BATCH_SIZE:
+            return total
+        time.sleep(RETENTION_BATCH_PAUSE_SECONDS)
+
+
+def run_retention_pass() -> dict:
+    """Run one full archive + purge pass. Needs an application context."""
+    now = datetime.utcnow()
+    archived = _drain(archive_batch, now - timedelta(days=RETENTION_ARCHIVE_AFTER_DAYS))
+    purged = _drain(
+        purge_abandoned_batch, now - timedelta(hours=RETENTION_ABANDONED_AFTER_HOURS)
+    )
+    if archived or purged:
+        logger.info("Retention pass: archived %d, purged %d sessions", archived, purged)
+    return {"archived": archived, "purged": purged}
+
+
+def load_archived_session(session_id: str):
+    """Return an archived session in the GetSession shape, or None."""
+    archive = db.session.get(SessionArchive, session_id)
+    if archive is None:
+        return None
+    document = json.loads(zlib.decompress(archive.payload))
+    session = document["session"]
+    session.pop("created_at", None)
+    return {
+        **session,
+        "translations": [
+            {k: t[k] for k in ("id", "from", "to", "original", "translated")}
+            for t in document["translations"]
+        ],
+        "archived": True,
+    }
+
+
+def _retention_loop(app) -> None:
+    # Spread the first pass so workers started together do not collide
+    time.sleep(random.uniform(0, min(RETENTION_INTERVAL_SECONDS, 300)))
+    while True:
+        try:
+            with app.app_context():
+                run_retention_pass()
+        except Exception:
+            logger.exception("Retention pass failed")
+        time.sleep(RETENTION_INTERVAL_SECONDS)
+
+
+def init_retention(app) -> None:
+    """Register the ``flask retention`` command and start the background worker."""
+
+    @app.cli.command("retention")
+    def retention_command():
+        """Archive old sessions and purge abandoned ones once."""
+        print(run_retention_pass())
+
+    if RETENTION_ENABLED:
+        in_each_worker(
+            lambda: threading.Thread(
+                target=_retention_loop, args=(app,), name="retention", daemon=True
+            ).start()
+        )
@@ -0,0 +1,335 @@
+"""
+Full-text search over conversation history (Translation.original/translated).
+
+Two backends:
+  • "mysql"    – MATCH ... AGAINST on a FULLTEXT index (production)
+  • "embedded" – in-process inverted index with BM25 ranking, for local and
+                 SQLite deployments; it catches up with new rows (by id) on
+                 every search, so every worker sees turns written by others,
+                 and drops rows retention removed once
+                 TRANSLATIONS_REMOVED_GENERATION changes.
+"""
+
+import re
+import math
+import logging
+import threading
+from collections import Counter
+
+from sqlalchemy import DDL, event, inspect, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from db.sql import db
+from models.translation import Translation
+from config import SEARCH_BACKEND
+from services.response_cache import TRANSLATIONS_REMOVED_GENERATION, get_generation
+
+logger = logging.getLogger(__name__)
+
+FULLTEXT_INDEX_NAME = "ft_translations_text"
+_FULLTEXT_DDL = (
+    f"ALTER TABLE translations ADD FULLTEXT INDEX {FULLTEXT_INDEX_NAME} "
+    "(original, translated)"
+)
+
+# New installations get the index together with the table
+event.listen(
+    Translation.__table__,
+    "after_create",
+    DDL(_FULLTEXT_DDL).execute_if(dialect="mysql"),
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SNIPPET_WIDTH = 160
+
+
+def tokenize(value: str) -> list[str]:
+    return _TOKEN_RE.findall((value or "").lower())
+
+
+def make_snippet(value: str, terms: list[str], width: int = SNIPPET_WIDTH) -> str:
+    """Cut a window of ``value`` around the first occurrence of any term."""
+    if not value:
+        return ""
+    lowered = value.lower()
+    positions = [p for p in (lowered.find(t) for t in terms) if p >= 0]
+    if len(value) <= width:
+        return value
+    start = max(0, min(positions) - width // 4) if positions else 0
+    end = min(len(value), start + width)
+    start = max(0, end - width)
+    return ("…" if start else "") + value[start:end] + ("…" if end < len(value) else "")
+
+
+def ensure_fulltext_index() -> bool:
+    """Add the FULLTEXT index to an existing MySQL table. Returns True if created."""
+    if db.engine.dialect.name != "mysql":
+        return False
+    indexes = {ix["name"] for ix in inspect(db.engine).get_indexes("translations")}
+    if FULLTEXT_INDEX_NAME in indexes:
+        return False
+    with db.engine.begin() as conn:
+        conn.execute(text(_FULLTEXT_DDL))
+    return True
+
+
+# ---------------------------------------------------------------------------
+# embedded backend
+# ---------------------------------------------------------------------------
+
+
+class InvertedIndex:
+    """BM25-ranked inverted index over translation rows, updated by id."""
+
+    K1 = 1.2
+    B = 0.75
+    CATCH_UP_BATCH = 5000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings: dict[str, dict[int, int]] = {}
+        self.docs: dict[int, tuple] = {}
+        self.total_length = 0
+        self.last_id = 0
+        # TRANSLATIONS_REMOVED_GENERATION when the rows were last checked
+        self.generation = None
+
+    def add(self, row) -> None:
+        tokens = tokenize(row.original) + tokenize(row.translated)
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[row.id] = tf
+        self.docs[row.id] = (
+            row.session_id,
+            row.from_lang,
+            row.to_lang,
+            row.created_at,
+            len(tokens),
+        )
+        self.total_length += len(tokens)
+        self.last_id = max(self.last_id, row.id)
+
+    def discard(self, ids) -> None:
+        """Forget rows deleted from the table (e.g. archived by retention)."""
+        with self._lock:
+            self._discard(ids)
+
+    def _discard(self, ids) -> None:
+        # Caller holds the lock
+        gone = {doc_id for doc_id in ids if doc_id in self.docs}
+        if not gone:
+            return
+        for doc_id in gone:
+            self.total_length -= self.docs.pop(doc_id)[4]
+        for term in list(self.postings):
+            posting = self.postings[term]
+            if len(gone) < len(posting):
+                for doc_id in gone:
+                    posting.pop(doc_id, None)
+            else:
+                for doc_id in [d for d in posting if d in gone]:
+                    del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+
+    def _prune(self) -> int:
+        # Caller holds the lock
+        ids = list(self.docs)
+        gone = []
+        for start in range(0, len(ids), self.CATCH_UP_BATCH):
+            chunk = ids[start:start + self.CATCH_UP_BATCH]
+            kept = {
+                doc_id
+                for (doc_id,) in db.session.query(Translation.id).filter(
+                    Translation.id.in_(chunk)
+                )
+            }
+            gone.extend(doc_id for doc_id in chunk if doc_id not in kept)
+        self._discard(gone)
+        return len(gone)
+
+    def catch_up(self) -> int:
+        """
+        Index rows written since the last call (by any worker), after
+        dropping rows retention removed meanwhile.
+        """
+        added = 0
+        generation = get_generation(TRANSLATIONS_REMOVED_GENERATION)
+        with self._lock:
+            if self.generation is not None and generation != self.generation:
+                removed = self._prune()
+                if removed:
+                    logger.info("Search index: dropped %d archived rows", removed)
+            self.generation = generation
+            while True:
+                rows = (
+                    db.session.query(
+                        Translation.id,
+                        Translation.session_id,
+                        Translation.from_lang,
+                        Translation.to_lang,
+                        Translation.original,
+                        Translation.translated,
+                        Translation.created_at,
+                    )
+                    .filter(Translation.id > self.last_id)
+                    .order_by(Translation.id)
+                    .limit(self.CATCH_UP_BATCH)
+                    .all()
+                )
+                for row in rows:
+                    self.add(row)
+                added += len(rows)
+                if len(rows) < self.CATCH_UP_BATCH:
+                    return added
+
+    def search(self, terms, matches) -> list[tuple[int, float]]:
+        """Return (id, score) for docs containing any term and passing ``matches``."""
+        with self._lock:
+            n_docs = len(self.docs) or 1
+            avg_len = self.total_length / n_docs or 1.0
+            scores: dict[int, float] = {}
+            for term in set(terms):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    doc = self.docs.get(doc_id)
+                    if doc is None or not matches(doc):
+                        continue
+                    norm = tf + self.K1 * (1 - self.B + self.B * doc[4] / avg_len)
+                    scores[doc_id] = (
+                        scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / norm
+                    )
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+_index = InvertedIndex()
+
+
+def _language_filter(languages: list[str]):
+    """Rows whose language pair matches: one code on either side, or both codes."""
+    codes = set(languages)
+    if not codes:
+        return None
+    if len(codes) == 1:
+        return lambda from_lang, to_lang: from_lang in codes or to_lang in codes
+    return lambda from_lang, to_lang: from_lang in codes and to_lang in codes
+
+
+def _search_embedded(terms, languages, since, until, page, per_page):
+    _index.catch_up()
+    lang_ok = _language_filter(languages)
+
+    def matches(doc):
+        _, from_lang, to_lang, created_at, _ = doc
+        if lang_ok and not lang_ok(from_lang, to_lang):
+            return False
+        if since and (created_at is None or created_at < since):
+            return False
+        if until and (created_at is None or created_at >= until):
+            return False
+        return True
+
+    ranked = _index.search(terms, matches)
+    first = (page - 1) * per_page
+    last = first + per_page
+    page_hits = ranked[first:last]
+    rows = {
+        t.id: t
+        for t in Translation.query.filter(
+            Translation.id.in_([doc_id for doc_id, _ in page_hits])
+        )
+    }
+    missing = [doc_id for doc_id, _ in page_hits if doc_id not in rows]
+    if missing:
+        _index.discard(missing)
+    hits = [(rows[doc_id], score) for doc_id, score in page_hits if doc_id in rows]
+    return len(ranked) - len(missing), hits
+
+
+# ---------------------------------------------------------------------------
+# MySQL backend
+# ---------------------------------------------------------------------------
+
+
+def _search_mysql(query, languages, since, until, page, per_page):
+    match = mysql_match(
+        Translation.original, Translation.translated, against=query
+    ).in_natural_language_mode()
+    score = match.label("score")
+
+    q = db.session.query(Translation, score).filter(match)
+    codes = list(set(languages))
+    if len(codes) == 1:
+        q = q.filter(
+            (Translation.from_lang == codes[0]) | (Translation.to_lang == codes[0])
+        )
+    elif codes:
+        q = q.filter(Translation.from_lang.in_(codes), Translation.to_lang.in_(codes))
+    if since:
+        q = q.filter(Translation.created_at >= since)
+    if until:
+        q = q.filter(Translation.created_at < until)
+
+    total = q.order_by(None).count()
+    hits = (
+        q.order_by(score.desc(), Translation.id.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+        .all()
+    )
+    return total, [(t, float(s)) for t, s in hits]
+
+
+# ---------------------------------------------------------------------------
+# public API
+# ---------------------------------------------------------------------------
+
+
+def search_translations(
+    query, languages=(), since=None, until=None, page=1, per_page=20
+):
+    """
+    Ranked, paginated search. ``languages`` holds one or two language codes;
+    ``since``/``until`` bound ``created_at`` (inclusive/exclusive).
+    """
+    terms = tokenize(query)
+    if not terms:
+        return {
+            "query": query,
+            "page": page,
+            "per_page": per_page,
+            "total": 0,
+            "results": [],
+        }
+
+    backend = SEARCH_BACKEND
+    if backend == "auto":
+        backend = "mysql" if db.engine.dialect.name == "mysql" else "embedded"
+    if backend == "mysql":
+        total, hits = _search_mysql(query, languages, since, until, page, per_page)
+    else:
+        total, hits = _search_embedded(terms, languages, since, until, page, per_page)
+
+    results = []
+    for t, score in hits:
+        original = (t.original or "").lower()
+        field = t.original if any(term in original for term in terms) else t.translated
+        results.append(
+            {
+                "translation_id": t.id,
+                "session_id": t.session_id,
+                **t.to_dict(),
+                "created_at": t.created_at.isoformat() if t.created_at else None,
+                "score": round(score, 4),
+                "snippet": make_snippet(field, terms),
+            }
+        )
+    return {
+        "query": query,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "results": results,
+    }
@@ -0,0 +1,280 @@
+"""
+Push channel per conversation session.
+
+Writers publish small deltas with ``publish(session_id, kind, data)``: a new
+turn, a status change, a recap. Every client streaming
+``GET /sessions/<id>/events`` receives them as server-sent events. Turns use
+their Translation id as the SSE event id, so a reconnecting client sends
+Last-Event-ID and only the turns after it are replayed from the database
+before the live stream continues.
+
+Each open stream holds a worker thread, so a worker serves at most
+CHANNEL_MAX_STREAMS of them at once (``open_stream``) and leaves the rest of
+its threads to the other endpoints.
+
+The broker is chosen by CHANNEL_BACKEND:
+  • memory – in-process fan-out; enough for a single worker process
+  • redis  – publishes through Redis pub/sub (CHANNEL_REDIS_URL) so clients on
+             any worker or replica see every event; each worker holds one
+             subscription and fans out to its own clients
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from config import (
+    CHANNEL_BACKEND,
+    CHANNEL_REDIS_URL,
+    CHANNEL_KEEPALIVE_SECONDS,
+    CHANNEL_STREAM_SECONDS,
+    CHANNEL_QUEUE_SIZE,
+    CHANNEL_MAX_STREAMS,
+)
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "session-events:"
+# Reconnect delay suggested to EventSource-style clients
+RETRY_MS = 2000
+
+_streams_lock = threading.Lock()
+_open_streams = 0
+_stream_stats = {"streams_rejected": 0}
+
+
+class Subscription:
+    """One client's buffered view of a session's events."""
+
+    def __init__(self, broker, session_id: str, maxsize: int):
+        self.broker = broker
+        self.session_id = session_id
+        self.queue: "queue.Queue[str]" = queue.Queue(maxsize)
+        # Set when an event had to be dropped; the client must resume instead
+        self.overflowed = False
+
+    def get(self, timeout: float):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class MemoryBroker:
+    """Fan-out to the subscribers of this process."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def subscribe(self, session_id: str) -> Subscription:
+        subscription = Subscription(self, session_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.session_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.session_id]
+
+    def publish(self, session_id: str, message: str) -> None:
+        self._stats["published"] += 1
+        self.deliver(session_id, message)
+
+    def deliver(self, session_id: str, message: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+                self._stats["delivered"] += 1
+            except queue.Full:
+                subscription.overflowed = True
+                self._stats["dropped"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = sum(len(s) for s in self._subscribers.values())
+            sessions = len(self._subscribers)
+        return {"clients": clients, "sessions": sessions, **self._stats}
+
+
+class RedisBroker(MemoryBroker):
+    """Publishes through Redis; one listener thread per worker delivers locally."""
+
+    def __init__(self, url: str, queue_size: int):
+        super().__init__(queue_size)
+        # Only needed for this backend
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._listener_lock = threading.Lock()
+        self._listener_pid = None
+
+    def _ensure_listener(self) -> None:
+        # The thread does not survive a fork, so start one per worker process
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            threading.Thread(
+                target=self._listen, name="session-channel", daemon=True
+            ).start()
+            self._listener_pid = os.getpid()
+
+    def subscribe(self, session_id: str) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(session_id)
+
+    def publish(self, session_id: str, message: str) -> None:
+        self._stats["published"] += 1
+        self._redis.publish(REDIS_PREFIX + session_id, message)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(REDIS_PREFIX + "*")
+                for item in pubsub.listen():
+                    if item["type"] != "pmessage":
+                        continue
+                    channel = item["channel"].decode()
+                    self.deliver(channel[len(REDIS_PREFIX):], item["data"].decode())
+            except Exception:
+                logger.exception("Session channel subscription lost, reconnecting")
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> MemoryBroker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            if CHANNEL_BACKEND == "redis":
+                _broker = RedisBroker(CHANNEL_REDIS_URL, CHANNEL_QUEUE_SIZE)
+            else:
+                _broker = MemoryBroker(CHANNEL_QUEUE_SIZE)
+        return _broker
+
+
+def publish(session_id: str, kind: str, data: dict, event_id: int | None = None) -> None:
+    """
+    Send an event to everyone watching ``session_id``. Call after the change
+    is committed; failures are logged, never raised, because clients catch
+    up from the database when they reconnect.
+    """
+    message = json.dumps(
+        {"kind": kind, "id": event_id, "data": data}, ensure_ascii=False, default=str
+    )
+    try:
+        get_broker().publish(session_id, message)
+    except Exception:
+        logger.exception("Could not publish %s event for session %s", kind, session_id)
+
+
+def turn_event(translation: Translation) -> dict:
+    created_at = translation.created_at
+    return {**translation.to_dict(), "created_at": created_at.isoformat() if created_at else None}
+
+
+def format_event(kind: str, data: dict, event_id: int | None = None) -> str:
+    """One server-sent event frame."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+    return f"{head}event: {kind}\ndata: {body}\n\n"
+
+
+def session_events(session_id: str, after: int = 0):
+    """
+    SSE frames for one client: the session's status, the turns after
+    ``after`` from the database, then live events until
+    CHANNEL_STREAM_SECONDS have passed or the client falls too far behind.
+    Needs an application context.
+    """
+    # Subscribe before reading the database so nothing slips in between;
+    # turns seen in both are sent once (ids only grow)
+    subscription = get_broker().subscribe(session_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        session_obj = Session.query.get(session_id)
+        if session_obj is not None:
+            yield format_event("status", session_obj.to_dict())
+
+        last_id = after
+        missed = (
+            Translation.query.filter(
+                Translation.session_id == session_id, Translation.id > after
+            )
+            .order_by(Translation.id)
+            .all()
+        )
+        for translation in missed:
+            yield format_event("turn", turn_event(translation), translation.id)
+            last_id = translation.id
+        # Do not hold a pooled connection for the lifetime of the stream
+        db.session.close()
+
+        deadline = time.monotonic() + CHANNEL_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            message = subscription.get(CHANNEL_KEEPALIVE_SECONDS)
+            if subscription.overflowed:
+                # Events were dropped; the client reconnects and resumes
+                return
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            event = json.loads(message)
+            if event["id"] is not None:
+                if event["id"] <= last_id:
+                    continue
+                last_id = event["id"]
+            yield format_event(event["kind"], event["data"], event["id"])
+    finally:
+        subscription.close()
+
+
+def open_stream() -> bool:
+    """Take one of this worker's stream slots; False when all are in use."""
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= CHANNEL_MAX_STREAMS:
+            _stream_stats["streams_rejected"] += 1
+            return False
+        _open_streams += 1
+        return True
+
+
+def close_stream() -> None:
+    """Give back a slot taken with ``open_stream``."""
+    global _open_streams
+    with _streams_lock:
+        _open_streams -= 1
+
+
+def channel_stats() -> dict:
+    return {
+        "backend": CHANNEL_BACKEND,
+        "streams": _open_streams,
+        "max_streams": CHANNEL_MAX_STREAMS,
+        **_stream_stats,
+        **get_broker().stats(),
+    }
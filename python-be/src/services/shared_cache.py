@@ -0,0 +1,455 @@
+"""
+Two-tier cache shared by the worker processes of a host.
+
+A ``TieredCache`` keeps recently used values in-process (an LRU of at most
+``max_items`` entries) in front of a shared tier: a memory-mapped file at
+SHARED_CACHE_PATH that every worker maps. A value built by one worker is
+found there by the others instead of being rebuilt once per process.
+
+The shared file is a set-associative table. A key's digest picks a set of
+SHARED_CACHE_WAYS slots of SHARED_CACHE_SLOT_BYTES each, and a full set
+overwrites its oldest entry, so the file never grows. Each set is guarded by
+an fcntl record lock (plus a thread lock, as record locks are per process),
+which makes get, set and add (set-if-absent) atomic across workers. Values
+are bytes or anything JSON-serialisable (and come back as JSON types);
+values larger than a slot stay in the worker's own tier.
+
+The file holds verified JWT claims, so it must be writable by this user
+only: it lives in a directory owned by the user with mode 0700 (created if
+missing), is created with O_EXCL, opened without following symlinks and
+checked to be a 0600 regular file owned by the user. Anything else disables
+the shared tier and every worker caches on its own.
+
+Entries expire after their TTL. Each namespace also has a generation
+counter in the file: ``invalidate()`` bumps it, which makes every entry of
+the namespace unreachable in all workers and both tiers at once. A plain
+``delete`` reaches other workers' in-process copies only when they expire.
+"""
+
+import os
+import json
+import mmap
+import stat
+import time
+import fcntl
+import struct
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import (
+    SHARED_CACHE_ENABLED,
+    SHARED_CACHE_PATH,
+    SHARED_CACHE_SLOTS,
+    SHARED_CACHE_SLOT_BYTES,
+    SHARED_CACHE_WAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"TRCACHE1"
+# magic, slots, slot size, ways
+_HEADER = struct.Struct("<8sIII")
+_HEADER_SIZE = 64
+# Namespaces hash onto this many generation counters; sharing one only
+# means an occasional extra invalidation
+_GENERATIONS = 256
+_COUNTER = struct.Struct("<Q")
+_SLOTS_OFFSET = _HEADER_SIZE + _GENERATIONS * _COUNTER.size
+# key digest, expires_at (0 = never), written_at, length, kind
+_SLOT = struct.Struct("<16sddIB3x")
+_EMPTY = bytes(16)
+_BYTES, _JSON = 0, 1
+_LOCK_STRIPES = 64
+
+_MISS = object()
+
+
+def _check_private(fd: int, path: str, is_kind) -> None:
+    info = os.fstat(fd)
+    if not is_kind(info.st_mode) or info.st_uid != os.geteuid():
+        raise PermissionError(f"{path} is of the wrong type or not owned by this user")
+    if info.st_mode & 0o077:
+        raise PermissionError(f"{path} is accessible to other users")
+
+
+def _open_private_dir(directory: str) -> int:
+    """
+    File descriptor of ``directory``, created if missing, which must be owned
+    by this user with mode 0700. Raises OSError (PermissionError) otherwise.
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+    try:
+        _check_private(dir_fd, directory, stat.S_ISDIR)
+    except BaseException:
+        os.close(dir_fd)
+        raise
+    return dir_fd
+
+
+def _open_private(path: str, create: bool = True) -> int:
+    """
+    File descriptor of the file at ``path`` (created unless ``create`` is
+    False), which only this user can reach. Raises OSError (PermissionError)
+    when that cannot be ensured.
+    """
+    dir_fd = _open_private_dir(os.path.dirname(os.path.abspath(path)))
+    try:
+        name = os.path.basename(path)
+        flags = os.O_RDWR | os.O_NOFOLLOW | os.O_CLOEXEC
+        fd = None
+        if create:
+            try:
+                fd = os.open(name, flags | os.O_CREAT | os.O_EXCL, 0o600, dir_fd=dir_fd)
+            except FileExistsError:
+                pass
+        if fd is None:
+            fd = os.open(name, flags, dir_fd=dir_fd)
+    finally:
+        os.close(dir_fd)
+    try:
+        _check_private(fd, path, stat.S_ISREG)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+class SharedStore:
+    """The memory-mapped tier. Keys are 16-byte digests."""
+
+    def __init__(self, path: str, slots: int, slot_bytes: int, ways: int):
+        self.path = path
+        self.ways = max(1, ways)
+        self.sets = max(1, slots // self.ways)
+        self.slot_bytes = max(slot_bytes, _SLOT.size + 1)
+        self.capacity = self.slot_bytes - _SLOT.size
+        self.size = _SLOTS_OFFSET + self.sets * self.ways * self.slot_bytes
+        self._stripes = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._counter_lock = threading.Lock()
+
+        self._fd = _open_private(path)
+        try:
+            self._prepare()
+            self._map = mmap.mmap(self._fd, self.size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _prepare(self) -> None:
+        header = _HEADER.pack(_MAGIC, self.sets * self.ways, self.slot_bytes, self.ways)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.pread(self._fd, _HEADER.size, 0) != header:
+                # New file or another layout: start empty (sparse on tmpfs)
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, header, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked_set(self, digest: bytes, exclusive: bool):
+        index = int.from_bytes(digest[:8], "little") % self.sets
+        start = _SLOTS_OFFSET + index * self.ways * self.slot_bytes
+        with self._stripes[index % _LOCK_STRIPES]:
+            # One byte stands for the whole set
+            fcntl.lockf(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH, 1, start)
+            try:
+                yield start
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, start)
+
+    def get(self, digest: bytes):
+        """(value, expires_at), or _MISS."""
+        now = time.time()
+        with self._locked_set(digest, exclusive=False) as start:
+            for way in range(self.ways):
+                offset = start + way * self.slot_bytes
+                key, expires_at, _, length, kind = _SLOT.unpack_from(self._map, offset)
+                if key != digest:
+                    continue
+                if expires_at and expires_at <= now:
+                    return _MISS
+                data = self._map[offset + _SLOT.size:offset + _SLOT.size + length]
+                break
+            else:
+                return _MISS
+        return (json.loads(data) if kind == _JSON else data), expires_at
+
+    def _encode(self, value):
+        """(kind, data), or None if it does not fit in a slot."""
+        if isinstance(value, bytes):
+            kind, data = _BYTES, value
+        else:
+            kind = _JSON
+            data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+        if len(data) > self.capacity:
+            return None
+        return kind, data
+
+    def _put(self, digest: bytes, kind: int, data: bytes, expires_at: float, replace: bool):
+        now = time.time()
+        with self._locked_set(digest, exclusive=True) as start:
+            # Same key, else a free or expired slot, else the oldest entry
+            victim, victim_rank = None, None
+            for way in range(self.ways):
+                offset = start + way * self.slot_bytes
+                key, expires, written_at, _, _ = _SLOT.unpack_from(self._map, offset)
+                if key == digest:
+                    if not replace and not (expires and expires <= now):
+                        return False
+                    victim = offset
+                    break
+                free = key == _EMPTY or (expires and expires <= now)
+                rank = -1.0 if free else written_at
+                if victim is None or rank < victim_rank:
+                    victim, victim_rank = offset, rank
+            self._map[victim + _SLOT.size:victim + _SLOT.size + len(data)] = data
+            _SLOT.pack_into(self._map, victim, digest, expires_at, now, len(data), kind)
+        return True
+
+    def set(self, digest: bytes, value, expires_at: float) -> bool:
+        """Store ``value``; False if it does not fit in a slot."""
+        encoded = self._encode(value)
+        if encoded is None:
+            return False
+        return self._put(digest, *encoded, expires_at, replace=True)
+
+    def add(self, digest: bytes, value, expires_at: float):
+        """
+        Store ``value`` unless the key holds a live value, checked and
+        written under the set's lock: True if stored, False if the key was
+        taken, None if the value does not fit in a slot.
+        """
+        encoded = self._encode(value)
+        if encoded is None:
+            return None
+        return self._put(digest, *encoded, expires_at, replace=False)
+
+    def delete(self, digest: bytes) -> None:
+        with self._locked_set(digest, exclusive=True) as start:
+            for way in range(self.ways):
+                offset = start + way * self.slot_bytes
+                if self._map[offset:offset + 16] == digest:
+                    self._map[offset:offset + 16] = _EMPTY
+
+    def _counter_offset(self, namespace: str) -> int:
+        digest = hashlib.blake2b(namespace.encode(), digest_size=8).digest()
+        return _HEADER_SIZE + int.from_bytes(digest, "little") % _GENERATIONS * _COUNTER.size
+
+    def generation(self, namespace: str) -> int:
+        # An aligned 8-byte read; no lock needed
+        return _COUNTER.unpack_from(self._map, self._counter_offset(namespace))[0]
+
+    def bump(self, namespace: str) -> None:
+        offset = self._counter_offset(namespace)
+        with self._counter_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _COUNTER.size, offset)
+            try:
+                value = _COUNTER.unpack_from(self._map, offset)[0]
+                _COUNTER.pack_into(self._map, offset, value + 1)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, _COUNTER.size, offset)
+
+
+_store = None
+_store_opened = False
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The host's shared tier, opened on first use; None if disabled or unusable."""
+    global _store, _store_opened
+    if _store_opened:
+        return _store
+    with _store_lock:
+        if not _store_opened:
+            if SHARED_CACHE_ENABLED:
+                try:
+                    _store = SharedStore(
+                        SHARED_CACHE_PATH,
+                        SHARED_CACHE_SLOTS,
+                        SHARED_CACHE_SLOT_BYTES,
+                        SHARED_CACHE_WAYS,
+                    )
+                except OSError as e:
+                    logger.warning(
+                        "Shared cache %s unavailable, caching per worker: %s",
+                        SHARED_CACHE_PATH,
+                        e,
+                    )
+            _store_opened = True
+    return _store
+
+
+_DEFAULT_STORE = object()
+
+
+class TieredCache:
+    """
+    In-process LRU in front of the shared tier, for one namespace. Values
+    from the in-process tier are returned as is; do not mutate them.
+    """
+
+    def __init__(self, namespace: str, max_items: int, ttl=None, store=_DEFAULT_STORE):
+        self.namespace = namespace
+        self.max_items = max_items
+        self.ttl = ttl
+        self._store = store
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, generation)
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        # Generation used when there is no shared tier
+        self._own_generation = 0
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "too_large": 0}
+
+    @property
+    def store(self):
+        # Resolved lazily so importing a module that owns a cache opens nothing
+        if self._store is _DEFAULT_STORE:
+            return get_store()
+        return self._store
+
+    def _generation(self, store) -> int:
+        return store.generation(self.namespace) if store else self._own_generation
+
+    def _digest(self, key: str, generation: int) -> bytes:
+        raw = f"{self.namespace}\0{generation}\0{key}".encode()
+        return hashlib.blake2b(raw, digest_size=16).digest()
+
+    def _remember(self, key: str, value, expires_at: float, generation: int) -> None:
+        with self._lock:
+            self._remember_locked(key, value, expires_at, generation)
+
+    def _remember_locked(self, key: str, value, expires_at: float, generation: int) -> None:
+        self._local[key] = (value, expires_at, generation)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_items:
+            self._local.popitem(last=False)
+
+    def get(self, key: str, default=None):
+        store = self.store
+        generation = self._generation(store)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                value, expires_at, entry_generation = entry
+                if entry_generation == generation and (
+                    not expires_at or expires_at > time.time()
+                ):
+                    self._local.move_to_end(key)
+                    self._stats["local_hits"] += 1
+                    return value
+                del self._local[key]
+
+        if store is not None:
+            hit = store.get(self._digest(key, generation))
+            if hit is not _MISS:
+                value, expires_at = hit
+                self._remember(key, value, expires_at, generation)
+                self._stats["shared_hits"] += 1
+                return value
+        self._stats["misses"] += 1
+        return default
+
+    def set(self, key: str, value, ttl=None) -> bool:
+        """
+        Store ``value`` in both tiers; ``ttl`` seconds (default: the cache's).
+        False if it was not stored: too large for the shared tier (it then
+        stays in this worker's tier) or a cache of size 0.
+        """
+        if self.max_items <= 0:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else 0.0
+        store = self.store
+        generation = self._generation(store)
+        self._remember(key, value, expires_at, generation)
+        if store is not None and not store.set(self._digest(key, generation), value, expires_at):
+            self._stats["too_large"] += 1
+            return False
+        return True
+
+    def add(self, key: str, value, ttl=None) -> bool:
+        """
+        Store ``value`` unless ``key`` holds a live value; True if it was
+        stored. The shared tier checks and writes in one step, so of several
+        workers adding the same key at once exactly one succeeds. A value too
+        large for a shared slot is only checked against this worker's tier.
+        """
+        if self.max_items <= 0:
+            return True
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else 0.0
+        store = self.store
+        generation = self._generation(store)
+        if store is not None:
+            added = store.add(self._digest(key, generation), value, expires_at)
+            if added is not None:
+                if added:
+                    self._remember(key, value, expires_at, generation)
+                return added
+            self._stats["too_large"] += 1
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[2] == generation and (
+                not entry[1] or entry[1] > time.time()
+            ):
+                return False
+            self._remember_locked(key, value, expires_at, generation)
+        return True
+
+    def delete(self, key: str) -> None:
+        store = self.store
+        with self._lock:
+            self._local.pop(key, None)
+        if store is not None:
+            store.delete(self._digest(key, self._generation(store)))
+
+    def invalidate(self) -> None:
+        """Drop every entry of this namespace, in every worker."""
+        store = self.store
+        with self._lock:
+            self._local.clear()
+            if store is None:
+                self._own_generation += 1
+        if store is not None:
+            store.bump(self.namespace)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"local_items": len(self._local), **self._stats}
+
+
+_caches: dict[str, TieredCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(namespace: str, max_items: int = 1024, ttl=None) -> TieredCache:
+    """The process-wide cache for ``namespace`` (created on first call)."""
+    with _registry_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = TieredCache(namespace, max_items, ttl)
+        return cache
+
+
+def cache_stats() -> dict:
+    with _registry_lock:
+        caches = list(_caches.values())
+    shared = None
+    if _store is not None:
+        shared = {
+            "path": _store.path,
+            "sets": _store.sets,
+            "ways": _store.ways,
+            "slot_bytes": _store.slot_bytes,
+        }
+    return {"shared": shared, **{c.namespace: c.stats() for c in caches}}
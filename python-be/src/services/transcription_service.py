@@ -1,14 +1,21 @@
 import os
+import re
 import logging
 from pathlib import Path
 import subprocess  # For ffmpeg
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
 from config import (
     AZURE_SPEECH_KEY,
     PROMTE_API_KEY,
     MODEL_URL_MAP,
+    TRANSCRIPTION_TIMEOUT_SECONDS,
+    TRANSCRIBE_PARALLELISM,
 )
+from services import deadline
+from services.circuit_breaker import provider_guard
+from services.deadline import DeadlineExceeded
+from services.http_client import get_session
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +28,11 @@ def transcribe_audio(audio_path: str, model_key: str, from_lang: str) -> str:
       • "promte_whisper"
       • "azure_speech"
 
-    No automatic fall-backs are attempted.
+    No automatic fall-backs are attempted. With VAD_ENABLED, silence is
+    trimmed first and a clip without speech returns "" without calling the
+    provider. Long clips are cut into chunks that are transcribed
+    concurrently (at most TRANSCRIBE_PARALLELISM at a time) and stitched.
+    Every step is bounded by the request's deadline (services/deadline.py).
     """
     logger.debug("=== TRANSCRIBE_AUDIO START ===")
     logger.debug(
@@ -40,38 +51,106 @@ def transcribe_audio(audio_path: str, model_key: str, from_lang: str) -> str:
     if not transcribe_url:
         raise ValueError(f"Transcription model URL not found for {model_key}")
 
-    # --- delegate to the selected engine -------------------------------------
-    if model_key == "promte_whisper":
-        return _transcribe_promte_whisper(audio_path, transcribe_url, from_lang)
+    if model_key not in ("promte_whisper", "azure_speech"):
+        raise ValueError(f"Unknown transcribe model: {model_key}")
 
-    if model_key == "azure_speech":
-        return _transcribe_azure_speech(audio_path, from_lang)
+    # numpy is only needed here; keep it out of app start-up
+    from services import vad
 
-    raise ValueError(f"Unknown transcribe model: {model_key}")
+    try:
+        chunks = vad.prepare_for_stt(audio_path)
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        logger.warning("VAD failed, sending the clip untrimmed", exc_info=True)
+        return _transcribe_file(audio_path, model_key, transcribe_url, from_lang)
+
+    def transcribe_chunk(chunk: str) -> str:
+        return _transcribe_file(chunk, model_key, transcribe_url, from_lang)
+
+    try:
+        if len(chunks) <= 1:
+            texts = [transcribe_chunk(chunk) for chunk in chunks]
+        else:
+            workers = min(TRANSCRIBE_PARALLELISM, len(chunks))
+            with ThreadPoolExecutor(workers, thread_name_prefix="stt-chunk") as pool:
+                texts = list(pool.map(deadline.carry(transcribe_chunk), chunks))
+    finally:
+        vad.remove_files(chunks)
+    return stitch_transcripts(texts)
 
 
 # ---------------------------------------------------------------------------
 # helpers
 # ---------------------------------------------------------------------------
 
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Words compared at each seam; covers TRANSCRIBE_CHUNK_OVERLAP_SECONDS of speech
+_STITCH_WINDOW = 12
+
+
+def _seam_key(word: str) -> str:
+    return "".join(_WORD_RE.findall(word.casefold()))
+
+
+def _seam(prev: list[str], nxt: list[str]) -> tuple[int, int]:
+    """
+    Find the words both sides of a seam share. Returns how many trailing
+    words to drop from ``prev`` and leading words to skip in ``nxt``. A word
+    cut in half at the seam may be ignored on either side. Single-word
+    matches are ignored: at a pause seam they are more likely a real repeat.
+    """
+    a = [_seam_key(w) for w in prev[-_STITCH_WINDOW:]]
+    b = [_seam_key(w) for w in nxt[:_STITCH_WINDOW]]
+    for k in range(min(len(a), len(b)), 1, -1):
+        for drop in (0, 1):
+            for skip in (0, 1):
+                tail = a[len(a) - drop - k:len(a) - drop]
+                if len(tail) == k and tail == b[skip:skip + k]:
+                    return drop, skip + k
+    return 0, 0
+
+
+def stitch_transcripts(texts: list[str]) -> str:
+    """Join chunk transcripts, removing words repeated in overlapping audio."""
+    words: list[str] = []
+    for text in texts:
+        nxt = (text or "").split()
+        if words and nxt:
+            drop, skip = _seam(words, nxt)
+            if drop:
+                del words[-drop:]
+            nxt = nxt[skip:]
+        words.extend(nxt)
+    return " ".join(words)
+
+
+def _transcribe_file(audio_path: str, model_key: str, url: str, from_lang: str) -> str:
+    # --- delegate to the selected engine -------------------------------------
+    if model_key == "promte_whisper":
+        return _transcribe_promte_whisper(audio_path, url, from_lang)
+    return _transcribe_azure_speech(audio_path, from_lang)
+
 
 def convert_to_wav(src_path: str, dest_path: str) -> None:
     """Convert any audio file to 16 kHz mono WAV using ffmpeg."""
     logger.debug("Converting '%s' → '%s'", src_path, dest_path)
-    subprocess.run(
-        [
-            "ffmpeg",
-            "-y",  # overwrite
-            "-i",
-            src_path,  # input
-            "-ar",
-            "16000",  # sample-rate
-            "-ac",
-            "1",  # mono
-            dest_path,
-        ],
-        check=True,
-    )
+    with deadline.bounded("ffmpeg"):
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",  # overwrite
+                "-i",
+                src_path,  # input
+                "-ar",
+                "16000",  # sample-rate
+                "-ac",
+                "1",  # mono
+                dest_path,
+            ],
+            check=True,
+            timeout=deadline.timeout(None, "ffmpeg"),
+        )
     logger.debug("Converted size: %d bytes", os.path.getsize(dest_path))
 
 
@@ -91,11 +170,18 @@ def _guess_mime_type(audio_path: str) -> str:
 def _transcribe_promte_whisper(path: str, url: str, from_lang: str) -> str:
     headers = {"Authorization": f"Bearer {PROMTE_API_KEY}"}
 
-    with open(path, "rb") as fp:
+    with provider_guard("promte_whisper"), open(path, "rb") as fp:
         files = {"file": (Path(path).name, fp)}
         data = {"language": from_lang}
-        r = requests.post(url, headers=headers, data=data, files=files, timeout=30)
-    r.raise_for_status()
+        with deadline.bounded("promte_whisper"):
+            r = get_session().post(
+                url,
+                headers=headers,
+                data=data,
+                files=files,
+                timeout=deadline.timeout(TRANSCRIPTION_TIMEOUT_SECONDS, "promte_whisper"),
+            )
+        r.raise_for_status()
 
     try:
         return r.json()["text"].strip()
@@ -124,11 +210,18 @@ def _transcribe_azure_speech(audio_path: str, from_lang: str) -> str:
     }
     params = {"language": from_lang}
 
-    with open(audio_path, "rb") as f:
-        resp = requests.post(transcribe_url, headers=headers, params=params, data=f)
-
-    logger.debug("Status: %s — %s", resp.status_code, resp.text)
-    if resp.status_code != 200:
-        raise RuntimeError(f"Azure speech failed: {resp.text}")
+    with provider_guard("azure_speech"), open(audio_path, "rb") as f:
+        with deadline.bounded("azure_speech"):
+            resp = get_session().post(
+                transcribe_url,
+                headers=headers,
+                params=params,
+                data=f,
+                timeout=deadline.timeout(TRANSCRIPTION_TIMEOUT_SECONDS, "azure_speech"),
+            )
+
+        logger.debug("Status: %s — %s", resp.status_code, resp.text)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Azure speech failed: {resp.text}")
 
     return resp.json().get("DisplayText", "").strip()
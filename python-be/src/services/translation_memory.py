@@ -0,0 +1,283 @@
+"""
+Translation memory over past rows of the ``translations`` table.
+
+Source texts are normalised (NFKC, case-folded, punctuation dropped) and
+indexed per (from_lang, to_lang) with MinHash signatures over character
+n-grams, banded for LSH lookups. Candidates are verified with the exact
+n-gram Jaccard similarity:
+
+  • score >= TM_SERVE_THRESHOLD and identical numbers → the stored
+    translation is served without calling a model
+  • score >= TM_EXAMPLE_THRESHOLD → passed to the model as few-shot examples
+
+A background thread per worker indexes the most recent TM_MAX_ROWS rows and
+then follows new ones by id, so lookups never touch the database. Past
+TM_MAX_ROWS the oldest rows are evicted. When retention archives or purges
+sessions it bumps TRANSLATIONS_REMOVED_GENERATION; every worker then drops
+the rows that are gone from the table.
+"""
+
+import re
+import time
+import random
+import hashlib
+import logging
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+
+from db.sql import db
+from models.translation import Translation
+from services.warmup import in_each_worker
+from services.response_cache import TRANSLATIONS_REMOVED_GENERATION, get_generation
+from config import (
+    TM_ENABLED,
+    TM_SERVE_THRESHOLD,
+    TM_EXAMPLE_THRESHOLD,
+    TM_MAX_EXAMPLES,
+    TM_MAX_ROWS,
+    TM_REFRESH_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 4
+NUM_PERM = 32
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Upper bound on candidates verified per lookup
+MAX_CANDIDATES = 200
+CATCH_UP_BATCH = 2000
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_NUMBER_RE = re.compile(r"\d+")
+
+# XOR masks act as the hash permutations; fixed seed so all workers agree
+_rng = random.Random(0x7A11)
+_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+
+def normalize(value: str) -> str:
+    value = unicodedata.normalize("NFKC", value or "").casefold()
+    return " ".join(_WORD_RE.findall(value))
+
+
+def shingles(normalized: str) -> set[int]:
+    padded = f" {normalized} "
+    count = max(1, len(padded) - SHINGLE_SIZE + 1)
+    grams = {padded[i:i + SHINGLE_SIZE] for i in range(count)}
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "big")
+        for g in grams
+    }
+
+
+def signature(hashes: set[int]) -> list[int]:
+    return [min(h ^ mask for h in hashes) for mask in _MASKS]
+
+
+def _bands(sig: list[int]):
+    for band in range(BANDS):
+        end = (band + 1) * ROWS_PER_BAND
+        yield band, tuple(sig[end - ROWS_PER_BAND:end])
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+@dataclass
+class MemoryMatch:
+    """Result of a lookup: a translation to serve, or few-shot examples."""
+
+    served: str | None = None
+    score: float = 0.0
+    examples: list[tuple[str, str]] = field(default_factory=list)
+
+
+class TranslationMemory:
+    def __init__(self, max_rows: int = TM_MAX_ROWS):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        # id → (pair, normalized source, original, translated), oldest first
+        self.docs: dict[int, tuple] = {}
+        self.buckets: dict[tuple, set[int]] = {}
+        self.exact: dict[tuple, int] = {}
+        self.last_id = 0
+        # TRANSLATIONS_REMOVED_GENERATION when the rows were last checked
+        self.generation = None
+
+    def add(self, row) -> None:
+        norm = normalize(row.original)
+        if not norm or not row.translated:
+            return
+        pair = (row.from_lang, row.to_lang)
+        sig = signature(shingles(norm))
+        with self._lock:
+            self.docs[row.id] = (pair, norm, row.original, row.translated)
+            self.exact[(pair, norm)] = row.id
+            for band, key in _bands(sig):
+                self.buckets.setdefault((pair, band, key), set()).add(row.id)
+            self.last_id = max(self.last_id, row.id)
+            while len(self.docs) > self.max_rows:
+                self._remove(next(iter(self.docs)))
+
+    def _remove(self, doc_id: int) -> None:
+        # Caller holds the lock
+        pair, norm, _, _ = self.docs.pop(doc_id)
+        if self.exact.get((pair, norm)) == doc_id:
+            del self.exact[(pair, norm)]
+        for band, key in _bands(signature(shingles(norm))):
+            bucket = self.buckets.get((pair, band, key))
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self.buckets[(pair, band, key)]
+
+    def prune(self) -> int:
+        """Forget rows no longer in the table. Needs an application context."""
+        with self._lock:
+            ids = list(self.docs)
+        gone = []
+        for start in range(0, len(ids), CATCH_UP_BATCH):
+            chunk = ids[start:start + CATCH_UP_BATCH]
+            kept = {
+                doc_id
+                for (doc_id,) in db.session.query(Translation.id).filter(
+                    Translation.id.in_(chunk)
+                )
+            }
+            gone.extend(doc_id for doc_id in chunk if doc_id not in kept)
+        with self._lock:
+            for doc_id in gone:
+                if doc_id in self.docs:
+                    self._remove(doc_id)
+        return len(gone)
+
+    def _candidates(self, pair, norm: str, hashes: set[int]) -> list[int]:
+        exact = self.exact.get((pair, norm))
+        if exact is not None:
+            return [exact]
+        seen: dict[int, int] = {}
+        for band, key in _bands(signature(hashes)):
+            for doc_id in self.buckets.get((pair, band, key), ()):
+                seen[doc_id] = seen.get(doc_id, 0) + 1
+        # Docs sharing more bands are likelier matches; newest first on ties
+        return sorted(seen, key=lambda d: (-seen[d], -d))[:MAX_CANDIDATES]
+
+    def lookup(self, original: str, from_lang: str, to_lang: str) -> MemoryMatch:
+        norm = normalize(original)
+        if not norm:
+            return MemoryMatch()
+        pair = (from_lang, to_lang)
+        hashes = shingles(norm)
+        with self._lock:
+            docs = [self.docs[d] for d in self._candidates(pair, norm, hashes)]
+
+        scored = []
+        seen_sources = set()
+        for _, doc_norm, doc_original, doc_translated in docs:
+            if doc_norm in seen_sources:
+                continue
+            seen_sources.add(doc_norm)
+            score = 1.0 if doc_norm == norm else jaccard(hashes, shingles(doc_norm))
+            if score >= TM_EXAMPLE_THRESHOLD:
+                scored.append((score, doc_norm, doc_original, doc_translated))
+        scored.sort(key=lambda item: -item[0])
+        if not scored:
+            return MemoryMatch()
+
+        best_score, best_norm, _, best_translated = scored[0]
+        # A differing date, time or amount must never be served from memory
+        same_numbers = _NUMBER_RE.findall(best_norm) == _NUMBER_RE.findall(norm)
+        if best_score >= TM_SERVE_THRESHOLD and same_numbers:
+            return MemoryMatch(served=best_translated, score=best_score)
+        return MemoryMatch(
+            score=best_score,
+            examples=[(o, t) for _, _, o, t in scored[:TM_MAX_EXAMPLES]],
+        )
+
+    def catch_up(self) -> int:
+        """
+        Index rows written since the last call, after dropping rows that
+        retention removed meanwhile. Needs an application context.
+        """
+        added = 0
+        generation = get_generation(TRANSLATIONS_REMOVED_GENERATION)
+        if self.generation is not None and generation != self.generation:
+            removed = self.prune()
+            if removed:
+                logger.info("Translation memory: dropped %d archived rows", removed)
+        self.generation = generation
+        if self.last_id == 0:
+            # Start from the most recent TM_MAX_ROWS rows
+            floor = (
+                db.session.query(Translation.id)
+                .order_by(Translation.id.desc())
+                .offset(TM_MAX_ROWS)
+                .limit(1)
+                .scalar()
+            )
+            self.last_id = floor or 0
+        while True:
+            rows = (
+                db.session.query(
+                    Translation.id,
+                    Translation.from_lang,
+                    Translation.to_lang,
+                    Translation.original,
+                    Translation.translated,
+                )
+                .filter(Translation.id > self.last_id)
+                .order_by(Translation.id)
+                .limit(CATCH_UP_BATCH)
+                .all()
+            )
+            for row in rows:
+                self.add(row)
+            if rows:
+                self.last_id = max(self.last_id, rows[-1].id)
+            added += len(rows)
+            if len(rows) < CATCH_UP_BATCH:
+                return added
+
+
+_memory = TranslationMemory()
+_stats = {"lookups": 0, "served": 0, "few_shot": 0}
+
+
+def lookup_translation(original: str, from_lang: str, to_lang: str) -> MemoryMatch:
+    """Look ``original`` up in this worker's memory (no database access)."""
+    match = _memory.lookup(original, from_lang, to_lang)
+    _stats["lookups"] += 1
+    if match.served is not None:
+        _stats["served"] += 1
+    elif match.examples:
+        _stats["few_shot"] += 1
+    return match
+
+
+def memory_stats() -> dict:
+    return {"enabled": TM_ENABLED, "indexed": len(_memory.docs), **_stats}
+
+
+def _memory_loop(app) -> None:
+    while True:
+        try:
+            with app.app_context():
+                added = _memory.catch_up()
+            if added:
+                logger.info("Translation memory: indexed %d rows", added)
+        except Exception:
+            logger.exception("Translation memory update failed")
+        time.sleep(TM_REFRESH_SECONDS)
+
+
+def init_translation_memory(app) -> None:
+    """Start the background indexer (in each worker) when TM_ENABLED is set."""
+    if TM_ENABLED:
+        in_each_worker(
+            lambda: threading.Thread(
+                target=_memory_loop, args=(app,), name="translation-memory", daemon=True
+            ).start()
+        )
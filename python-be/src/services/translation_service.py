@@ -1,45 +1,120 @@
-import requests
-from config import AZURE_OPENAI_KEY, PROMTE_API_KEY, MODEL_URL_MAP
+"""
+Text translation through the configured chat models.
 
+With TRANSLATION_HEDGE_ENABLED, a request that has not been answered within
+the primary model's recent TRANSLATION_HEDGE_PERCENTILE latency is sent again
+to its fallback from TRANSLATION_HEDGE_FALLBACKS; the first good answer wins.
+A primary that fails outright is failed over to the fallback at once.
 
-def translate_text(
-    original_text: str, model_key: str, from_lang: str, to_lang: str
+With TM_ENABLED, the translation memory is consulted first: a close enough
+match is served as is, weaker ones are sent along as few-shot examples.
+
+stream_translate yields the translation while the model is still writing it
+(server-sent chat deltas); split_sentences turns that into whole sentences.
+The model's stream is read on a thread of its own, so the provider slot and
+the circuit breaker's timing cover the HTTP exchange only, not the time the
+client takes to read or the TTS running in between.
+"""
+
+import re
+import json
+import time
+import queue
+import logging
+import threading
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import (
+    AZURE_OPENAI_KEY,
+    PROMTE_API_KEY,
+    MODEL_URL_MAP,
+    TRANSLATION_HEDGE_ENABLED,
+    TRANSLATION_HEDGE_PERCENTILE,
+    TRANSLATION_HEDGE_MIN_DELAY_MS,
+    TRANSLATION_HEDGE_MAX_DELAY_MS,
+    TRANSLATION_HEDGE_FALLBACKS,
+    TRANSLATION_TIMEOUT_SECONDS,
+    TM_ENABLED,
+)
+from services import deadline
+from services.deadline import DeadlineExceeded
+from services.admission import track_llm_call
+from services.circuit_breaker import provider_guard
+from services.rate_limit import post_within_quota
+from services.translation_memory import lookup_translation
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per model, and how many are needed to trust a percentile
+_LATENCY_WINDOW = 200
+_MIN_SAMPLES = 20
+
+_lock = threading.Lock()
+_latencies: dict[str, deque] = {}
+_stats = {"requests": 0, "hedged": 0, "failovers": 0, "errors": 0}
+_wins: Counter = Counter()
+_executor = None
+
+
+def _system_prompt(from_lang: str, to_lang: str) -> str:
+    return (
+        f"You are a translation assistant. Translate everything from {from_lang} to {to_lang}. "
+        f"You are a strict translation assistant. Your only task is to translate the following text "
+        f"from {from_lang} to {to_lang} with no commentary or additional output. "
+        "Even if the text is ambiguous or does not look like a complete sentence, "
+        "output exactly a translation or the same text if it cannot be translated."
+    )
+
+
+def _call_model(
+    original_text: str, model_key: str, from_lang: str, to_lang: str, examples=()
 ) -> str:
     """
-    Translate `original_text` using the given model_key (e.g. 'gpt4o-mini' or 'promte_4o').
-    Return the translated text.
+    One request to one model; raises on any non-200 answer. ``examples`` are
+    (original, translated) pairs sent ahead of the text as few-shot turns.
     """
+    translation_url, headers, payload, provider = _build_request(
+        original_text, model_key, from_lang, to_lang, examples
+    )
+
+    started = time.monotonic()
+    with provider_guard(model_key), track_llm_call():
+        response = post_within_quota(
+            model_key,
+            translation_url,
+            payload,
+            headers=headers,
+            timeout=TRANSLATION_TIMEOUT_SECONDS,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"{provider} translation failed: {response.text}")
+
+        content = response.json()["choices"][0]["message"]["content"]
+    _record_latency(model_key, time.monotonic() - started)
+    return content
+
+
+def _build_request(original_text, model_key, from_lang, to_lang, examples):
+    """URL, headers, chat payload and provider label for ``model_key``."""
     translation_url = MODEL_URL_MAP.get(model_key)
     if not translation_url:
         raise ValueError(f"Translation model URL not found for {model_key}")
 
+    messages = [{"role": "system", "content": _system_prompt(from_lang, to_lang)}]
+    for example_original, example_translated in examples:
+        messages.append({"role": "user", "content": example_original})
+        messages.append({"role": "assistant", "content": example_translated})
+    messages.append({"role": "user", "content": original_text})
+
     # Azure-based models
     if model_key in ["gpt4o-mini", "gpt35"]:
         headers = {
             "Content-Type": "application/json",
             "api-key": AZURE_OPENAI_KEY,
         }
-        payload = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        f"You are a translation assistant. Translate everything from {from_lang} to {to_lang}. "
-                        f"You are a strict translation assistant. Your only task is to translate the following text "
-                        f"from {from_lang} to {to_lang} with no commentary or additional output. "
-                        "Even if the text is ambiguous or does not look like a complete sentence, "
-                        "output exactly a translation or the same text if it cannot be translated."
-                    ),
-                },
-                {"role": "user", "content": original_text},
-            ],
-            "temperature": 0.2,
-        }
-        response = requests.post(translation_url, headers=headers, json=payload)
-        if response.status_code != 200:
-            raise RuntimeError(f"Azure translation failed: {response.text}")
-
-        return response.json()["choices"][0]["message"]["content"]
+        payload = {"messages": messages, "temperature": 0.2}
+        provider = "Azure"
 
     # Promte-based model
     elif model_key == "promte_4o":
@@ -47,26 +122,260 @@ def translate_text(
             "Content-Type": "application/json",
             "Authorization": f"Bearer {PROMTE_API_KEY}",
         }
-        payload = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        f"You are a translation assistant. Translate everything from {from_lang} to {to_lang}. "
-                        f"You are a strict translation assistant. Your only task is to translate the following text "
-                        f"from {from_lang} to {to_lang} with no commentary or additional output. "
-                        "Even if the text is ambiguous or does not look like a complete sentence, "
-                        "output exactly a translation or the same text if it cannot be translated."
-                    ),
-                },
-                {"role": "user", "content": original_text},
-            ]
-        }
-        response = requests.post(translation_url, headers=headers, json=payload)
-        if response.status_code != 200:
-            raise RuntimeError(f"Promte 4o translation failed: {response.text}")
-
-        return response.json()["choices"][0]["message"]["content"]
+        payload = {"messages": messages}
+        provider = "Promte 4o"
 
     else:
         raise ValueError(f"Unknown translation model: {model_key}")
+
+    return translation_url, headers, payload, provider
+
+
+def _record_latency(model_key: str, seconds: float) -> None:
+    with _lock:
+        samples = _latencies.get(model_key)
+        if samples is None:
+            samples = _latencies[model_key] = deque(maxlen=_LATENCY_WINDOW)
+        samples.append(seconds)
+
+
+def hedge_delay(model_key: str) -> float:
+    """Seconds to wait for ``model_key`` before hedging, from recent latencies."""
+    with _lock:
+        samples = sorted(_latencies.get(model_key, ()))
+    if len(samples) < _MIN_SAMPLES:
+        return TRANSLATION_HEDGE_MAX_DELAY_MS / 1000.0
+    rank = min(len(samples) - 1, int(len(samples) * TRANSLATION_HEDGE_PERCENTILE / 100))
+    delay_ms = samples[rank] * 1000
+    delay_ms = max(TRANSLATION_HEDGE_MIN_DELAY_MS, min(TRANSLATION_HEDGE_MAX_DELAY_MS, delay_ms))
+    return delay_ms / 1000.0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="translate-hedge")
+        return _executor
+
+
+def _count(key: str) -> None:
+    with _lock:
+        _stats[key] += 1
+
+
+def _translate_hedged(
+    original_text: str,
+    primary: str,
+    fallback: str,
+    from_lang: str,
+    to_lang: str,
+    examples=(),
+) -> str:
+    pool = _get_executor()
+    _count("requests")
+
+    call_model = deadline.carry(_call_model)
+    first = pool.submit(call_model, original_text, primary, from_lang, to_lang, examples)
+    attempts = {first: primary}
+    done, _ = wait([first], timeout=deadline.timeout(hedge_delay(primary), "translation"))
+    if not done or first.exception() is not None:
+        _count("failovers" if done else "hedged")
+        second = pool.submit(
+            call_model, original_text, fallback, from_lang, to_lang, examples
+        )
+        attempts[second] = fallback
+
+    errors = []
+    pending = set(attempts)
+    while pending:
+        done, pending = wait(
+            pending,
+            timeout=deadline.timeout(None, "translation"),
+            return_when=FIRST_COMPLETED,
+        )
+        if not done:
+            # Out of time; the calls end at their deadline-bound timeouts
+            for future in pending:
+                future.cancel()
+            raise DeadlineExceeded("translation")
+        for future in done:
+            if future.exception() is None:
+                # requests cannot abort a call mid-flight: the loser is
+                # dropped (or never started) and ends at its own timeout
+                for loser in pending:
+                    loser.cancel()
+                with _lock:
+                    _wins[attempts[future]] += 1
+                if attempts[future] != primary:
+                    logger.info("Translation hedge won: %s beat %s", fallback, primary)
+                return future.result()
+            errors.append(future.exception())
+
+    _count("errors")
+    raise errors[0]
+
+
+def translate_text(
+    original_text: str, model_key: str, from_lang: str, to_lang: str
+) -> str:
+    """
+    Translate `original_text` using the given model_key (e.g. 'gpt4o-mini' or 'promte_4o').
+    Return the translated text.
+    """
+    examples = ()
+    if TM_ENABLED:
+        match = lookup_translation(original_text, from_lang, to_lang)
+        if match.served is not None:
+            return match.served
+        examples = match.examples
+
+    fallback = TRANSLATION_HEDGE_FALLBACKS.get(model_key)
+    if (
+        TRANSLATION_HEDGE_ENABLED
+        and fallback
+        and fallback != model_key
+        and MODEL_URL_MAP.get(fallback)
+    ):
+        return _translate_hedged(
+            original_text, model_key, fallback, from_lang, to_lang, examples
+        )
+    return _call_model(original_text, model_key, from_lang, to_lang, examples)
+
+
+def hedge_stats() -> dict:
+    """Counters for the metrics endpoint: how often hedging fired and who won."""
+    with _lock:
+        models = set(_latencies) | set(_wins)
+        stats = dict(_stats, wins=dict(_wins))
+    stats["enabled"] = TRANSLATION_HEDGE_ENABLED
+    stats["delay_ms"] = {m: round(hedge_delay(m) * 1000, 1) for m in sorted(models)}
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# streaming
+# ---------------------------------------------------------------------------
+
+# A sentence ends at terminal punctuation (plus closing quotes/brackets)
+# followed by whitespace; CJK full stops need no space after them
+_SENTENCE_END = re.compile(r"(?:[.!?…؟]+[\"'»”’)\]]*\s+|[。！？]+)")
+
+
+# Put on the queue once the model's stream is complete
+_STREAM_END = object()
+
+
+def _read_stream(request, model_key: str, pieces: queue.Queue, stop: threading.Event):
+    """Fetch the model's deltas onto ``pieces``; runs on its own thread."""
+    translation_url, headers, payload, provider = request
+    try:
+        with provider_guard(model_key), track_llm_call():
+            response = post_within_quota(
+                model_key,
+                translation_url,
+                payload,
+                headers=headers,
+                timeout=TRANSLATION_TIMEOUT_SECONDS,
+                stream=True,
+            )
+            try:
+                if response.status_code != 200:
+                    raise RuntimeError(f"{provider} translation failed: {response.text}")
+
+                if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                    # Provider ignored "stream"; treat it as a single piece
+                    pieces.put(response.json()["choices"][0]["message"]["content"])
+                else:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if stop.is_set():
+                            # Nobody is reading any more
+                            break
+                        # Stop reading once the request's deadline has passed
+                        deadline.check("translation")
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        choices = json.loads(data).get("choices") or []
+                        delta = choices[0].get("delta", {}).get("content") if choices else None
+                        if delta:
+                            pieces.put(delta)
+            finally:
+                response.close()
+        pieces.put(_STREAM_END)
+    except Exception as e:
+        pieces.put(e)
+
+
+def _stream_model(original_text, model_key, from_lang, to_lang, examples):
+    translation_url, headers, payload, provider = _build_request(
+        original_text, model_key, from_lang, to_lang, examples
+    )
+    request = (translation_url, headers, dict(payload, stream=True), provider)
+    pieces: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    threading.Thread(
+        target=deadline.carry(_read_stream),
+        args=(request, model_key, pieces, stop),
+        name="translation-stream",
+        daemon=True,
+    ).start()
+    try:
+        while True:
+            # The reader always ends with _STREAM_END or an exception; its
+            # reads are bounded by the timeout and the deadline
+            piece = pieces.get()
+            if piece is _STREAM_END:
+                return
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+    finally:
+        stop.set()
+
+
+def stream_translate(
+    original_text: str, model_key: str, from_lang: str, to_lang: str
+):
+    """
+    Yield the translation of ``original_text`` in pieces as they are
+    generated. If the stream fails before producing anything, the regular
+    (hedged) translate_text is used instead.
+    """
+    examples = ()
+    if TM_ENABLED:
+        match = lookup_translation(original_text, from_lang, to_lang)
+        if match.served is not None:
+            yield match.served
+            return
+        examples = match.examples
+
+    produced = False
+    try:
+        for piece in _stream_model(original_text, model_key, from_lang, to_lang, examples):
+            produced = True
+            yield piece
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        if produced:
+            raise
+        logger.warning("Streaming translation failed, retrying without streaming")
+        yield translate_text(original_text, model_key, from_lang, to_lang)
+
+
+def split_sentences(pieces):
+    """Regroup streamed text pieces into sentences (whitespace kept)."""
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while True:
+            match = _SENTENCE_END.search(buffer)
+            if not match:
+                break
+            yield buffer[:match.end()]
+            buffer = buffer[match.end():]
+    if buffer.strip():
+        yield buffer
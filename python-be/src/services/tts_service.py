@@ -0,0 +1,35 @@
+import threading
+
+from config import TTS_TIMEOUT_SECONDS
+from services import deadline
+from services.circuit_breaker import provider_guard
+from services.voices import make_speech_config
+
+
+def synthesize_speech(text: str, voice: str) -> bytes:
+    """
+    Synthesize ``text`` with the given Azure neural voice and return WAV
+    bytes. Raises RuntimeError if synthesis does not complete within
+    TTS_TIMEOUT_SECONDS, DeadlineExceeded if the request's deadline passes
+    first.
+    """
+    # The Speech SDK loads a native library; import it on first use only
+    import azure.cognitiveservices.speech as speechsdk
+
+    speech_config = make_speech_config()
+    speech_config.speech_synthesis_voice_name = voice
+    synthesizer = speechsdk.SpeechSynthesizer(speech_config, audio_config=None)
+    done = threading.Event()
+    synthesizer.synthesis_completed.connect(lambda evt: done.set())
+    synthesizer.synthesis_canceled.connect(lambda evt: done.set())
+
+    with provider_guard("azure_tts"):
+        future = synthesizer.speak_text_async(text)
+        if not done.wait(deadline.timeout(TTS_TIMEOUT_SECONDS, "azure_tts")):
+            synthesizer.stop_speaking_async()
+            deadline.check("azure_tts")
+            raise RuntimeError("TTS timed out")
+        result = future.get()
+        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            raise RuntimeError(f"TTS failed: {result.reason}")
+    return result.audio_data
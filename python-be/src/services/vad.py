@@ -0,0 +1,237 @@
+"""
+Energy-based voice activity detection ahead of speech-to-text.
+
+Audio is decoded to 16 kHz mono PCM and cut into VAD_FRAME_MS frames whose
+RMS level (dBFS) is computed in one vectorised pass. The speech threshold
+adapts to the clip: VAD_MARGIN_DB above its noise floor (10th percentile),
+but never more than VAD_MARGIN_DB below its loud frames (95th percentile)
+and never below VAD_FLOOR_DB. Speech frames are padded by VAD_PAD_MS on
+both sides, leading/trailing silence is dropped and pauses are shortened to
+VAD_MAX_PAUSE_MS. A clip with no speech is never sent to a provider.
+
+Clips longer than TRANSCRIBE_CHUNK_SECONDS are cut into chunks at pauses so
+they can be transcribed in parallel. Only speech that runs longer than a
+chunk without a pause is cut mid-stream; those cuts overlap by
+TRANSCRIBE_CHUNK_OVERLAP_SECONDS so no word is lost at the seam.
+"""
+
+import os
+import wave
+import logging
+import subprocess
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from config import (
+    VAD_ENABLED,
+    VAD_FRAME_MS,
+    VAD_MARGIN_DB,
+    VAD_FLOOR_DB,
+    VAD_PAD_MS,
+    VAD_MIN_SPEECH_MS,
+    VAD_MAX_PAUSE_MS,
+    TRANSCRIBE_CHUNK_SECONDS,
+    TRANSCRIBE_CHUNK_OVERLAP_SECONDS,
+)
+from services import deadline
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+_lock = threading.Lock()
+_stats = {"clips": 0, "silent_clips": 0, "seconds_in": 0.0, "seconds_sent": 0.0}
+
+
+@dataclass
+class SpeechAnalysis:
+    samples: np.ndarray
+    # (start, end) sample offsets of detected speech, padded
+    segments: list[tuple[int, int]]
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+
+def read_pcm(path: str) -> np.ndarray:
+    """Decode ``path`` to 16 kHz mono int16 samples (ffmpeg unless already so)."""
+    try:
+        with wave.open(path, "rb") as wav:
+            if (
+                wav.getnchannels() == 1
+                and wav.getsampwidth() == 2
+                and wav.getframerate() == SAMPLE_RATE
+            ):
+                return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    except (wave.Error, EOFError):
+        pass
+    with deadline.bounded("ffmpeg"):
+        pcm = subprocess.run(
+            [
+                "ffmpeg",
+                "-v",
+                "error",
+                "-i",
+                path,
+                "-f",
+                "s16le",  # raw 16-bit PCM on stdout
+                "-ac",
+                "1",
+                "-ar",
+                str(SAMPLE_RATE),
+                "-",
+            ],
+            check=True,
+            capture_output=True,
+            timeout=deadline.timeout(None, "ffmpeg"),
+        ).stdout
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+def write_wav(samples: np.ndarray, path: str) -> None:
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.astype(np.int16).tobytes())
+
+
+def frame_levels(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS level of each full frame in dBFS."""
+    n_frames = len(samples) // frame_len
+    frames = samples[: n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def detect_speech(samples: np.ndarray) -> list[tuple[int, int]]:
+    frame_len = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    levels = frame_levels(samples, frame_len)
+    if not len(levels):
+        return []
+
+    noise, loud = np.percentile(levels, [10, 95])
+    threshold = max(VAD_FLOOR_DB, min(noise + VAD_MARGIN_DB, loud - VAD_MARGIN_DB))
+    speech = levels > threshold
+
+    # Drop isolated clicks shorter than VAD_MIN_SPEECH_MS, then pad
+    min_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start < min_frames:
+            speech[start:end] = False
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    if pad:
+        speech = np.convolve(speech, np.ones(2 * pad + 1), mode="same") > 0
+
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    return [
+        (int(start) * frame_len, min(len(samples), int(end) * frame_len))
+        for start, end in zip(edges[::2], edges[1::2])
+    ]
+
+
+def analyze(path: str) -> SpeechAnalysis:
+    """Decode ``path`` and find its speech (all of it when VAD is disabled)."""
+    samples = read_pcm(path)
+    if not VAD_ENABLED:
+        return SpeechAnalysis(samples, [(0, len(samples))] if len(samples) else [])
+    return SpeechAnalysis(samples, detect_speech(samples))
+
+
+def render(samples: np.ndarray, segments: list[tuple[int, int]]) -> np.ndarray:
+    """Concatenate speech segments, keeping pauses up to VAD_MAX_PAUSE_MS."""
+    parts = []
+    for i, (start, end) in enumerate(segments):
+        if i:
+            gap = start - segments[i - 1][1]
+            parts.append(np.zeros(_pause(max(0, gap)), dtype=np.int16))
+        parts.append(samples[start:end])
+    return np.concatenate(parts) if parts else samples[:0]
+
+
+def _pause(gap: int) -> int:
+    return min(gap, SAMPLE_RATE * VAD_MAX_PAUSE_MS // 1000)
+
+
+def plan_chunks(
+    segments: list[tuple[int, int]], max_seconds: float, overlap_seconds: float
+) -> list[list[tuple[int, int]]]:
+    """
+    Group segments into chunks whose rendered length stays within
+    ``max_seconds``, cutting at pauses. A segment longer than a chunk is cut
+    into pieces that overlap by ``overlap_seconds``.
+    """
+    limit = int(max_seconds * SAMPLE_RATE)
+    overlap = min(int(overlap_seconds * SAMPLE_RATE), limit // 2)
+
+    pieces = []
+    for start, end in segments:
+        while end - start > limit:
+            pieces.append((start, start + limit))
+            start += limit - overlap
+        pieces.append((start, end))
+
+    chunks: list[list[tuple[int, int]]] = []
+    length = 0
+    for start, end in pieces:
+        if chunks:
+            added = _pause(max(0, start - chunks[-1][-1][1])) + end - start
+            if length + added <= limit:
+                chunks[-1].append((start, end))
+                length += added
+                continue
+        chunks.append([(start, end)])
+        length = end - start
+    return chunks
+
+
+def _record(seconds_in: float, seconds_sent: float) -> None:
+    with _lock:
+        _stats["clips"] += 1
+        _stats["seconds_in"] += seconds_in
+        _stats["seconds_sent"] += seconds_sent
+        if not seconds_sent:
+            _stats["silent_clips"] += 1
+
+
+def prepare_for_stt(path: str) -> list[str]:
+    """
+    Write the speech in ``path`` to trimmed 16 kHz WAV files next to it and
+    return their paths in order: none for a silent clip, several when it is
+    longer than TRANSCRIBE_CHUNK_SECONDS. The caller removes them.
+    """
+    analysis = analyze(path)
+    groups = plan_chunks(
+        analysis.segments, TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP_SECONDS
+    )
+
+    paths, sent = [], 0
+    for i, group in enumerate(groups):
+        audio = render(analysis.samples, group)
+        chunk_path = f"{path}.vad{i}.wav"
+        write_wav(audio, chunk_path)
+        paths.append(chunk_path)
+        sent += len(audio)
+    _record(analysis.duration, sent / SAMPLE_RATE)
+    return paths
+
+
+def vad_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+    stats["seconds_saved"] = round(stats["seconds_in"] - stats["seconds_sent"], 1)
+    stats["seconds_in"] = round(stats["seconds_in"], 1)
+    stats["seconds_sent"] = round(stats["seconds_sent"], 1)
+    return stats
+
+
+def remove_files(paths: list[str]) -> None:
+    for p in paths:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
@@ -1,33 +1,109 @@
-import functools
-from babel import Locale
-import azure.cognitiveservices.speech as speechsdk
-from config import AZURE_SPEECH_KEY, AZURE_SPEECH_REGION
+"""
+Azure voice catalog.
 
+The voice list (450+ voices, each needing babel display names) is fetched
+once per host and persisted as a JSON snapshot at VOICE_CATALOG_PATH. Every
+worker loads that snapshot at startup and picks up newer ones written by
+its siblings; a background thread refreshes it after VOICE_CATALOG_TTL_SECONDS.
+Only the worker holding the file lock talks to Azure.
+
+The snapshot decides which voices are offered, so like the shared cache
+file it must be writable by this user only: its directory is checked (or
+created) to be owned by the user with mode 0700, and the snapshot and its
+lock file to be 0600 regular files owned by the user.
+"""
+
+import os
+import json
+import time
+import fcntl
+import logging
+import tempfile
+import threading
+
+from config import (
+    AZURE_SPEECH_KEY,
+    AZURE_SPEECH_REGION,
+    VOICE_CATALOG_PATH,
+    VOICE_CATALOG_TTL_SECONDS,
+)
+from services.shared_cache import _open_private, _open_private_dir
+
+logger = logging.getLogger(__name__)
+
+# How often a worker stats the snapshot file for updates from other workers
+_RELOAD_CHECK_SECONDS = 30
+# Back-off between refresh attempts while Azure keeps failing
+_REFRESH_RETRY_SECONDS = 300
+
+_catalog = None
+_catalog_mtime = 0.0
+_last_reload_check = 0.0
+_catalog_lock = threading.Lock()
+_refresh_thread = None
+_last_refresh_attempt = None
+
+
+class VoiceCatalog:
+    """Immutable snapshot of the voice list with lookup indexes."""
+
+    def __init__(self, voices: list[dict[str, str]], fetched_at: float):
+        self.voices = voices
+        self.fetched_at = fetched_at
+        self.by_short_name: dict[str, dict[str, str]] = {}
+        self.by_locale: dict[str, list[dict[str, str]]] = {}
+        self.locale_names: dict[str, dict[str, str]] = {}
+
+        for voice in voices:
+            locale = voice["locale"]
+            self.by_short_name[voice["short_name"]] = voice
+            self.by_locale.setdefault(locale, []).append(voice)
+            self.locale_names.setdefault(
+                locale,
+                {
+                    "english_name": voice["locale_english_name"],
+                    "native_name": voice["locale_native_name"],
+                },
+            )
+
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at >= VOICE_CATALOG_TTL_SECONDS
+
+
+def make_speech_config():
+    import azure.cognitiveservices.speech as speechsdk
 
-def make_speech_config() -> speechsdk.SpeechConfig:
     return speechsdk.SpeechConfig(
         subscription=AZURE_SPEECH_KEY,
         region=AZURE_SPEECH_REGION,
     )
 
 
-@functools.lru_cache()
-def list_voices() -> list[dict[str, str]]:
+def _fetch_voices() -> list[dict[str, str]]:
+    # Heavy imports, only needed by the worker that refreshes the snapshot
+    import azure.cognitiveservices.speech as speechsdk
+    from babel import Locale
+
     cfg = make_speech_config()
     synthesizer = speechsdk.SpeechSynthesizer(speech_config=cfg)
     result = synthesizer.get_voices_async().get()
     if result.reason != speechsdk.ResultReason.VoicesListRetrieved:
         raise RuntimeError(f"Voice list failed: {result.reason}")
 
+    # Display names only depend on the locale, so resolve each locale once
+    locale_names: dict[str, tuple[str, str]] = {}
     voices_info = []
     for voice in result.voices:
-        try:
-            babel_locale = Locale.parse(voice.locale.replace("-", "_"))
-            locale_english_name = babel_locale.get_display_name("en").title()
-            locale_native_name = babel_locale.get_display_name(babel_locale).title()
-        except Exception as e:
-            locale_english_name = voice.locale
-            locale_native_name = voice.locale
+        if voice.locale not in locale_names:
+            try:
+                babel_locale = Locale.parse(voice.locale.replace("-", "_"))
+                locale_names[voice.locale] = (
+                    babel_locale.get_display_name("en").title(),
+                    babel_locale.get_display_name(babel_locale).title(),
+                )
+            except Exception:
+                locale_names[voice.locale] = (voice.locale, voice.locale)
+        locale_english_name, locale_native_name = locale_names[voice.locale]
 
         voices_info.append(
             {
@@ -43,3 +119,163 @@ def list_voices() -> list[dict[str, str]]:
         )
 
     return voices_info
+
+
+# ---------------------------------------------------------------------------
+# snapshot file
+# ---------------------------------------------------------------------------
+
+
+def _read_snapshot():
+    """Return (catalog, mtime) from disk, or (None, 0.0) if unusable."""
+    try:
+        fd = _open_private(VOICE_CATALOG_PATH, create=False)
+        with os.fdopen(fd, "rb") as fp:
+            mtime = os.fstat(fd).st_mtime
+            data = json.load(fp)
+        return VoiceCatalog(data["voices"], data["fetched_at"]), mtime
+    except FileNotFoundError:
+        return None, 0.0
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning(
+            "Ignoring unreadable voice catalog %s: %s", VOICE_CATALOG_PATH, exc
+        )
+        return None, 0.0
+
+
+def _write_snapshot(voices: list[dict[str, str]], fetched_at: float) -> None:
+    directory = os.path.dirname(os.path.abspath(VOICE_CATALOG_PATH))
+    os.close(_open_private_dir(directory))
+    # mkstemp creates the file with mode 0600
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".voices-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            json.dump(
+                {"fetched_at": fetched_at, "voices": voices}, fp, ensure_ascii=False
+            )
+        os.replace(tmp_path, VOICE_CATALOG_PATH)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _refresh_snapshot(blocking: bool) -> bool:
+    """
+    Fetch from Azure and rewrite the snapshot while holding the host-wide lock.
+
+    With ``blocking=False`` the call gives up immediately if another worker is
+    already refreshing. Returns True if this process wrote a new snapshot.
+    """
+    with os.fdopen(_open_private(VOICE_CATALOG_PATH + ".lock"), "a") as lock_fp:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_fp, flags)
+        except BlockingIOError:
+            return False
+        try:
+            # Another worker may have finished a refresh while we waited
+            current, _ = _read_snapshot()
+            if current is not None and not current.is_stale():
+                return False
+            fetched_at = time.time()
+            _write_snapshot(_fetch_voices(), fetched_at)
+            logger.info("Voice catalog refreshed from Azure")
+            return True
+        finally:
+            fcntl.flock(lock_fp, fcntl.LOCK_UN)
+
+
+def _background_refresh() -> None:
+    global _refresh_thread
+    try:
+        _refresh_snapshot(blocking=False)
+        _load_if_changed(force=True)
+    except Exception as e:
+        logger.warning("Background voice catalog refresh failed: %s", str(e))
+    finally:
+        _refresh_thread = None
+
+
+def _schedule_refresh() -> None:
+    global _refresh_thread, _last_refresh_attempt
+    with _catalog_lock:
+        if _refresh_thread is not None:
+            return
+        if (
+            _last_refresh_attempt is not None
+            and time.monotonic() - _last_refresh_attempt < _REFRESH_RETRY_SECONDS
+        ):
+            return
+        _last_refresh_attempt = time.monotonic()
+        _refresh_thread = threading.Thread(
+            target=_background_refresh, name="voice-catalog-refresh", daemon=True
+        )
+        _refresh_thread.start()
+
+
+def _load_if_changed(force: bool = False) -> None:
+    global _catalog, _catalog_mtime, _last_reload_check
+    now = time.monotonic()
+    if not force and now - _last_reload_check < _RELOAD_CHECK_SECONDS:
+        return
+    _last_reload_check = now
+    try:
+        mtime = os.path.getmtime(VOICE_CATALOG_PATH)
+    except OSError:
+        return
+    if mtime == _catalog_mtime and _catalog is not None:
+        return
+    catalog, mtime = _read_snapshot()
+    if catalog is not None:
+        with _catalog_lock:
+            _catalog, _catalog_mtime = catalog, mtime
+
+
+# ---------------------------------------------------------------------------
+# public API
+# ---------------------------------------------------------------------------
+
+
+def get_catalog() -> VoiceCatalog:
+    """Return the current voice catalog, loading or fetching it if needed."""
+    if _catalog is None:
+        _load_if_changed(force=True)
+        if _catalog is None:
+            _refresh_snapshot(blocking=True)
+            _load_if_changed(force=True)
+        if _catalog is None:
+            raise RuntimeError("Voice catalog unavailable")
+    else:
+        _load_if_changed()
+
+    if _catalog.is_stale():
+        _schedule_refresh()
+    return _catalog
+
+
+def warm_catalog() -> VoiceCatalog:
+    """
+    Load a fresh catalog, fetching it now if the snapshot is missing or
+    stale. Starts no background thread, so it is safe before a fork.
+    """
+    current, _ = _read_snapshot()
+    if current is None or current.is_stale():
+        _refresh_snapshot(blocking=True)
+    _load_if_changed(force=True)
+    if _catalog is None:
+        raise RuntimeError("Voice catalog unavailable")
+    return _catalog
+
+
+def list_voices() -> list[dict[str, str]]:
+    return get_catalog().voices
+
+
+def catalog_generation() -> float:
+    """
+    Version of the catalog this worker currently holds, without fetching it.
+    Returns 0.0 while no catalog has been loaded yet.
+    """
+    _load_if_changed()
+    return _catalog.fetched_at if _catalog is not None else 0.0
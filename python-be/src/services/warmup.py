@@ -0,0 +1,218 @@
+"""
+Warm-up before a worker takes traffic.
+
+gunicorn preloads the app (see gunicorn.conf.py) and calls ``warm_master()``
+once, before any port is bound: it imports the heavy libraries and fills
+the host-wide caches (voice catalog, JWKS document), so every worker forks
+with them in memory. Sockets do not survive a fork, so each worker then runs
+``warm_worker(app)`` before it accepts requests: it opens its database pool
+and a keep-alive connection to every provider host.
+
+Steps are best effort: a failure is logged and reported, and warm-up goes on.
+A worker answers GET /api/v1/misc/ready with 503 until its warm-up is done.
+"""
+
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+
+from config import MODEL_URL_MAP, WARMUP_ENABLED, WARMUP_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Set by gunicorn.conf.py before the app is imported
+_preloading = False
+_worker_hooks: list = []
+# Inherited by the workers when the master ran it
+_master_warmed = False
+_state = "cold"
+_steps: dict[str, dict] = {}
+
+
+def mark_preloading() -> None:
+    global _preloading
+    _preloading = True
+
+
+def in_each_worker(hook) -> None:
+    """
+    Run ``hook()`` now or, when the app is preloaded, in each worker after
+    the fork. For starting background threads, which a fork does not copy.
+    """
+    if _preloading:
+        _worker_hooks.append(hook)
+    else:
+        hook()
+
+
+def after_fork() -> None:
+    for hook in _worker_hooks:
+        hook()
+
+
+def _run_step(name: str, step) -> None:
+    started = time.monotonic()
+    try:
+        detail = step()
+    except Exception as e:
+        logger.warning("Warm-up step %s failed: %s", name, e)
+        result = {"ok": False, "error": str(e)}
+    else:
+        result = {"ok": True}
+        if detail is not None:
+            result["detail"] = detail
+    result["seconds"] = round(time.monotonic() - started, 3)
+    _steps[name] = result
+
+
+# ---- master: shared by every worker ------------------------------------------
+
+
+def _import_libraries():
+    import numpy  # noqa: F401
+    import babel  # noqa: F401
+    import jose.jwt  # noqa: F401
+    import services.vad  # noqa: F401
+
+    # Loads the SDK's native library
+    import azure.cognitiveservices.speech  # noqa: F401
+
+
+def _load_voice_catalog():
+    from services.voices import warm_catalog
+
+    return f"{len(warm_catalog().voices)} voices"
+
+
+def _fetch_jwks():
+    from auth.auth import TENANT_ID, refresh_jwks
+
+    if not TENANT_ID:
+        return "skipped, no TENANT_ID"
+    refresh_jwks()
+
+
+def _master_steps() -> dict:
+    return {
+        "libraries": _import_libraries,
+        "voice_catalog": _load_voice_catalog,
+        "jwks": _fetch_jwks,
+    }
+
+
+def warm_master() -> None:
+    """
+    Run in the gunicorn master before forking. Sequential and threadless, so
+    no thread can hold a lock when the workers fork.
+    """
+    global _master_warmed
+    if not WARMUP_ENABLED:
+        return
+    started = time.monotonic()
+    for name, step in _master_steps().items():
+        _run_step(name, step)
+    _master_warmed = True
+    logger.info("Master warm-up finished in %.2fs", time.monotonic() - started)
+
+
+# ---- worker: per process -----------------------------------------------------
+
+
+def _open_db_connections(app):
+    from db.sql import db
+
+    with app.app_context():
+        engine = db.engine
+        # Connections inherited from the master must not be shared
+        engine.dispose(close=False)
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        connections = [engine.connect() for _ in range(size)]
+        for connection in connections:
+            connection.close()
+    return f"{size} connections"
+
+
+def _provider_origins() -> list[str]:
+    origins = set()
+    for url in MODEL_URL_MAP.values():
+        parts = urlsplit(url or "")
+        if parts.scheme in ("http", "https") and parts.netloc:
+            origins.add(f"{parts.scheme}://{parts.netloc}")
+    return sorted(origins)
+
+
+def _open_provider_connections():
+    from services.http_client import get_session
+
+    session = get_session()
+    failed = []
+    for origin in _provider_origins():
+        try:
+            # Any status will do: the pooled TLS connection is what we want
+            session.head(origin, timeout=WARMUP_TIMEOUT_SECONDS)
+        except Exception as e:
+            failed.append(f"{origin}: {e}")
+    if failed:
+        raise RuntimeError("; ".join(failed))
+    return f"{len(_provider_origins())} hosts"
+
+
+def _load_worker_caches():
+    from auth.auth import TENANT_ID, get_jwks_keys
+    from services.voices import get_catalog
+
+    get_catalog()
+    if TENANT_ID:
+        # Also starts this worker's JWKS refresher
+        get_jwks_keys()
+
+
+def _worker_steps(app) -> dict:
+    return {
+        "db_connections": lambda: _open_db_connections(app),
+        "provider_connections": _open_provider_connections,
+        "caches": _load_worker_caches,
+    }
+
+
+def warm_worker(app) -> None:
+    """
+    Run in each worker before it accepts requests. Steps run in parallel;
+    the ones still running after WARMUP_TIMEOUT_SECONDS are reported as timed
+    out and the worker becomes ready anyway.
+    """
+    global _state
+    if not WARMUP_ENABLED:
+        _state = "ready"
+        return
+    _state = "warming"
+    started = time.monotonic()
+    if not _master_warmed:
+        # Not preloaded (dev server, gunicorn without the config file)
+        for name, step in _master_steps().items():
+            _run_step(name, step)
+
+    threads = {}
+    for name, step in _worker_steps(app).items():
+        threads[name] = threading.Thread(
+            target=_run_step, args=(name, step), name=f"warmup-{name}", daemon=True
+        )
+        threads[name].start()
+    deadline = time.monotonic() + WARMUP_TIMEOUT_SECONDS
+    for name, thread in threads.items():
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            logger.warning("Warm-up step %s still running, not waiting", name)
+            _steps[name] = {"ok": False, "error": "timed out"}
+
+    _state = "ready"
+    logger.info("Worker warm-up finished in %.2fs", time.monotonic() - started)
+
+
+def is_ready() -> bool:
+    return _state == "ready" or not WARMUP_ENABLED
+
+
+def warmup_report() -> dict:
+    return {"ready": is_ready(), "state": _state, "steps": dict(_steps)}
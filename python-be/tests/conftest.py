@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+import pytest
+
+# Give each test run its own shared cache file, apart from any running server
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "cache"))
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build the app on a fresh, migrated SQLite database; ``config`` overrides."""
+    # Imported here, once SHARED_CACHE_PATH is set
+    from app import create_app
+    from db.migrate import run_migrations
+    from services import response_cache
+
+    def make(**config):
+        app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/t.db",
+                **config,
+            }
+        )
+        with app.app_context():
+            run_migrations()
+            # Every test database starts at generation 0: forget the values
+            # and bodies earlier tests cached in the shared cache
+            response_cache._generations.invalidate()
+            response_cache._bodies.invalidate()
+        return app
+
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def session_id(app):
+    """A session between en-GB and da-DK."""
+    from db.sql import db
+    from models.session import Session
+
+    with app.app_context():
+        session = Session(language_a="en-GB", language_b="da-DK")
+        db.session.add(session)
+        db.session.commit()
+        return session.id
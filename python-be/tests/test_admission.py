@@ -0,0 +1,153 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from db import pool
+from routes import sessions
+from services import admission
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_MAX_INFLIGHT_LLM", 4)
+    monkeypatch.setattr(admission, "ADMISSION_LISTING_SHARE", 0.5)
+    monkeypatch.setattr(admission, "ADMISSION_QUEUE_SECONDS", 2)
+    monkeypatch.setattr(admission, "_stats", dict.fromkeys(admission._stats, 0))
+    monkeypatch.setattr(sessions, "translate_text", lambda text, *args: text.upper())
+
+
+class _ModelCalls:
+    """Hold ``n`` model calls in flight."""
+
+    def __init__(self, n):
+        self.n = n
+        self.release = threading.Event()
+        self._started = threading.Barrier(n + 1)
+        self._threads = []
+
+    def _hold(self):
+        with admission.track_llm_call():
+            self._started.wait()
+            self.release.wait(5)
+
+    def __enter__(self):
+        for _ in range(self.n):
+            thread = threading.Thread(target=self._hold)
+            thread.start()
+            self._threads.append(thread)
+        self._started.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release.set()
+        for thread in self._threads:
+            thread.join()
+
+
+def _list(app):
+    return app.test_client().get("/api/v1/sessions/list", headers=API_KEY_HEADER)
+
+
+def _translate(app, session_id):
+    return app.test_client().post(
+        "/api/v1/sessions/translate",
+        json={"session_id": session_id, "from": "en-GB", "to": "da-DK", "text": "hi"},
+        headers=API_KEY_HEADER,
+    )
+
+
+def test_listing_is_shed_above_its_share(app, session_id):
+    assert _list(app).status_code == 200
+    with _ModelCalls(2):
+        response = _list(app)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == str(admission.ADMISSION_RETRY_AFTER_SECONDS)
+        # Interactive requests still get in
+        assert _translate(app, session_id).status_code == 200
+    assert admission._stats["shed_listing"] == 1
+    assert admission._stats["queued"] == 0
+
+
+def test_only_listings_are_shed_early(app, session_id):
+    client = app.test_client()
+    with _ModelCalls(2):
+        for path in ("/api/v1/sessions/search?q=hi", "/api/v1/sessions/export"):
+            assert client.get(path, headers=API_KEY_HEADER).status_code == 429
+        session = client.get(f"/api/v1/sessions/{session_id}", headers=API_KEY_HEADER)
+        assert session.status_code == 200
+        bulk = client.put(
+            "/api/v1/languages/bulk",
+            json=[{"code": "da-DK", "enabled": True}],
+            headers=API_KEY_HEADER,
+        )
+        assert bulk.status_code == 200
+    assert admission._stats == {"queued": 0, "shed_interactive": 0, "shed_listing": 2}
+
+
+def test_interactive_request_queues_for_capacity(app, session_id):
+    with _ModelCalls(3) as calls, ThreadPoolExecutor(1) as executor:
+        with _ModelCalls(1) as last:
+            future = executor.submit(_translate, app, session_id)
+            while admission._stats["queued"] < 1:
+                time.sleep(0.01)
+            assert not future.done()
+            last.release.set()
+        assert future.result(timeout=5).status_code == 200
+        calls.release.set()
+    assert admission._stats["shed_interactive"] == 0
+
+
+def test_interactive_request_is_shed_when_the_queue_times_out(app, session_id, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_QUEUE_SECONDS", 0.1)
+    with _ModelCalls(4):
+        response = _translate(app, session_id)
+    assert response.status_code == 429
+    assert "model calls" in response.get_json()["error"]
+    assert admission._stats == {"queued": 1, "shed_interactive": 1, "shed_listing": 0}
+
+
+def test_pool_records_checkout_waits(tmp_path, monkeypatch):
+    metrics = pool.PoolMetrics()
+    monkeypatch.setattr(pool, "pool_metrics", metrics)
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/p.db",
+        poolclass=pool.TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert metrics.timeouts == 1
+    assert metrics.ewma_wait >= 0.1 * pool._EWMA_ALPHA
+    assert metrics.recent_wait() == metrics.ewma_wait
+    held.close()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert metrics.checkouts == 2
+    assert metrics.waiting == 0
+    assert metrics.max_wait >= 0.1
+
+    stats = pool.pool_stats(engine)
+    assert stats["timeouts"] == 1
+    assert stats["recent_wait_ms"] > 0
+    engine.dispose()
+
+
+def test_pool_wait_sheds_listings(app, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_MAX_POOL_WAIT_MS", 100)
+    metrics = pool.PoolMetrics()
+    monkeypatch.setattr(admission, "pool_metrics", metrics)
+    metrics.end_wait(0.3, timed_out=False)
+    metrics.end_wait(0.3, timed_out=False)
+
+    response = _list(app)
+    assert response.status_code == 429
+    assert "database" in response.get_json()["error"]
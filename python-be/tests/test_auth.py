@@ -0,0 +1,81 @@
+import time
+from unittest import mock
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from auth import auth
+from services.shared_cache import TieredCache
+
+
+def _make_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    public["kid"] = kid
+    return pem, public
+
+
+def _sign(pem, kid, **claims):
+    claims.setdefault("iss", auth.ISSUER)
+    claims.setdefault("exp", int(time.time()) + 600)
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+def _jwks_response(*keys):
+    resp = mock.Mock()
+    resp.json.return_value = {"keys": list(keys)}
+    resp.raise_for_status.return_value = None
+    return resp
+
+
+@pytest.fixture(autouse=True)
+def reset_auth_state(monkeypatch):
+    monkeypatch.setattr(auth, "_jwks_cache", None)
+    monkeypatch.setattr(auth, "_jwks_by_kid", {})
+    monkeypatch.setattr(auth, "_jwks_fetched_at", 0.0)
+    monkeypatch.setattr(auth, "_jwks_refresher_pid", auth.os.getpid())
+    monkeypatch.setattr(auth, "JWKS_MIN_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(auth, "_jwks_shared", TieredCache("jwks", 1, store=None))
+    monkeypatch.setattr(auth, "_claims_cache", TieredCache("jwt-claims", 16, store=None))
+
+
+def test_verified_token_is_served_from_cache():
+    pem, public = _make_key("k1")
+    token = _sign(pem, "k1", sub="alice")
+
+    with mock.patch("requests.get", return_value=_jwks_response(public)):
+        assert auth.validate_jwt_token(token)["sub"] == "alice"
+        with mock.patch("jose.jwt.decode") as decode:
+            assert auth.validate_jwt_token(token)["sub"] == "alice"
+            decode.assert_not_called()
+
+
+def test_unknown_kid_triggers_single_refresh():
+    pem_old, public_old = _make_key("old")
+    pem_new, public_new = _make_key("new")
+    responses = [_jwks_response(public_old), _jwks_response(public_old, public_new)]
+
+    with mock.patch("requests.get", side_effect=responses) as get:
+        auth.validate_jwt_token(_sign(pem_old, "old"))
+        claims = auth.validate_jwt_token(_sign(pem_new, "new", sub="bob"))
+
+    assert claims["sub"] == "bob"
+    assert get.call_count == 2
+    assert get.call_args.kwargs["timeout"] == auth.JWKS_TIMEOUT_SECONDS
+
+
+def test_expired_cache_entry_is_not_served():
+    now = time.time()
+    auth._remember_claims(b"digest", {"sub": "x", "exp": now + 0.05}, now)
+    assert auth._cached_claims(b"digest") == {"sub": "x", "exp": now + 0.05}
+    time.sleep(0.1)
+    assert auth._cached_claims(b"digest") is None
+    auth._remember_claims(b"expired", {"sub": "x", "exp": now - 1}, now)
+    assert auth._cached_claims(b"expired") is None
@@ -0,0 +1,111 @@
+import time
+import threading
+
+import pytest
+import requests
+
+from services import circuit_breaker as cb
+from services import deadline
+
+
+@pytest.fixture(autouse=True)
+def fast_breaker(monkeypatch):
+    monkeypatch.setattr(cb, "BREAKER_ENABLED", True)
+    monkeypatch.setattr(cb, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(cb, "BREAKER_ERROR_RATE", 0.5)
+    monkeypatch.setattr(cb, "BREAKER_OPEN_SECONDS", 60)
+    monkeypatch.setattr(cb, "PROVIDER_QUEUE_SECONDS", 0.01)
+
+
+def _run(breaker, fail=False):
+    with breaker.call():
+        if fail:
+            raise RuntimeError("boom")
+
+
+def test_opens_on_error_rate_and_fails_fast():
+    breaker = cb.CircuitBreaker("promte_4o", max_concurrency=4)
+    _run(breaker)
+    _run(breaker)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            _run(breaker, fail=True)
+    assert breaker.state == cb.OPEN
+
+    with pytest.raises(cb.ProviderUnavailable) as excinfo:
+        _run(breaker)
+    assert excinfo.value.retry_after > 1
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_half_open_trial_closes_or_reopens(monkeypatch):
+    breaker = cb.CircuitBreaker("gpt4o-mini", max_concurrency=4)
+    breaker._open(0.0)  # long enough ago for the open period to have passed
+
+    with pytest.raises(RuntimeError):
+        _run(breaker, fail=True)
+    assert breaker.state == cb.OPEN
+
+    monkeypatch.setattr(cb, "BREAKER_OPEN_SECONDS", 0)
+    _run(breaker)
+    assert breaker.state == cb.CLOSED
+
+
+def test_bulkhead_rejects_when_all_slots_are_busy():
+    breaker = cb.CircuitBreaker("azure_speech", max_concurrency=1)
+    entered, release = threading.Event(), threading.Event()
+
+    def hold_slot():
+        with breaker.call():
+            entered.set()
+            release.wait()
+
+    worker = threading.Thread(target=hold_slot)
+    worker.start()
+    entered.wait()
+    try:
+        with pytest.raises(cb.ProviderUnavailable):
+            _run(breaker)
+    finally:
+        release.set()
+        worker.join()
+    _run(breaker)
+    assert breaker.stats()["rejected_busy"] == 1
+
+
+def _time_out(breaker, seconds):
+    with breaker.call(), deadline.bounded(breaker.name):
+        time.sleep(seconds)
+        raise requests.Timeout("read timed out")
+
+
+def test_client_deadline_does_not_open_the_circuit():
+    breaker = cb.CircuitBreaker("gpt4o-mini", max_concurrency=4)
+    for _ in range(6):
+        # A tiny X-Request-Timeout: the request's budget, not the provider, ran out
+        with deadline.budget(0.001), pytest.raises(deadline.DeadlineExceeded):
+            _time_out(breaker, 0.005)
+    assert breaker.state == cb.CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+    # The provider's own timeout cap still counts
+    for _ in range(4):
+        with deadline.budget(30), pytest.raises(requests.Timeout):
+            _time_out(breaker, 0)
+    assert breaker.state == cb.OPEN
+
+
+def test_abandoned_generator_is_not_a_failure():
+    breaker = cb.CircuitBreaker("gpt4o-mini", max_concurrency=4)
+
+    def stream():
+        with breaker.call():
+            yield "piece"
+            yield "more"
+
+    for _ in range(4):
+        pieces = stream()
+        next(pieces)
+        pieces.close()
+    assert breaker.stats()["window_calls"] == 0
+    assert breaker.stats()["inflight"] == 0
@@ -0,0 +1,115 @@
+import gzip
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from flask import jsonify
+
+from db.sql import db
+from models.language import LanguageSetting
+from models.session import Session
+from models.translation import Translation
+from services import json_codec
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+GZIP_HEADERS = {**API_KEY_HEADER, "Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        for code in ("da-DK", "de-DE", "en-GB", "en-US", "fr-FR", "nl-NL", "sv-SE", "uk-UA"):
+            db.session.add(
+                LanguageSetting(code=code, enabled=True, translation_model="gpt4o-mini")
+            )
+        for i in range(30):
+            session = Session(language_a="en-GB", language_b="da-DK")
+            db.session.add(session)
+            db.session.flush()
+            db.session.add(
+                Translation(
+                    session_id=session.id,
+                    from_lang="en-GB",
+                    to_lang="da-DK",
+                    original=f"Good morning, this is turn {i}",
+                    translated=f"Godmorgen, dette er tur {i}",
+                )
+            )
+        db.session.commit()
+    return app
+
+
+def test_listing_is_compressed_when_accepted(app):
+    client = app.test_client()
+    plain = client.get("/api/v1/sessions/list", headers=API_KEY_HEADER)
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    response = client.get("/api/v1/sessions/list", headers=GZIP_HEADERS)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert int(response.headers["Content-Length"]) < len(plain.data)
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+
+
+def test_small_and_refused_responses_are_not_compressed(app):
+    client = app.test_client()
+    small = client.get("/api/v1/misc/ping", headers=GZIP_HEADERS)
+    assert "Content-Encoding" not in small.headers
+    assert small.get_json() == {"message": "pong"}
+
+    refused = client.get(
+        "/api/v1/sessions/list", headers={**API_KEY_HEADER, "Accept-Encoding": "gzip;q=0"}
+    )
+    assert "Content-Encoding" not in refused.headers
+
+
+def test_cached_listing_keeps_conditional_requests(app):
+    client = app.test_client()
+    first = client.get("/api/v1/languages/enabled", headers=GZIP_HEADERS)
+    assert first.headers["Content-Encoding"] == "gzip"
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert json.loads(gzip.decompress(first.data))
+
+    again = client.get(
+        "/api/v1/languages/enabled", headers={**GZIP_HEADERS, "If-None-Match": etag}
+    )
+    assert again.status_code == 304
+    # The uncompressed representation keeps the strong ETag
+    plain = client.get("/api/v1/languages/enabled", headers=API_KEY_HEADER)
+    assert plain.headers["ETag"] == etag[2:]
+    assert json.loads(gzip.decompress(first.data)) == plain.get_json()
+
+
+def test_streamed_export_stays_streamed(app):
+    client = app.test_client()
+    plain = client.get("/api/v1/sessions/export", headers=API_KEY_HEADER)
+    response = client.get("/api/v1/sessions/export", headers=GZIP_HEADERS)
+
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert len(lines) == 30
+    assert lines == plain.data.decode().splitlines()
+
+
+def test_fast_encoder_matches_flask_output(app):
+    value = {
+        "at": datetime(2025, 4, 2, 12, 30),
+        "price": Decimal("1.50"),
+        "text": "Grüß Gott",
+        "b": 1,
+        "a": [None, True],
+    }
+    with app.test_request_context():
+        body = jsonify(value).get_data()
+    assert json.loads(body) == {
+        "a": [None, True],
+        "at": "Wed, 02 Apr 2025 12:30:00 GMT",
+        "b": 1,
+        "price": "1.50",
+        "text": "Grüß Gott",
+    }
+    assert "Grüß".encode() in json_codec.dumps(value)
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from models.translation import Translation
+from routes import sessions
+from services import deadline
+from services.deadline import DeadlineExceeded
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+def _translate(app, session_id, headers=None):
+    return app.test_client().post(
+        "/api/v1/sessions/translate",
+        json={"session_id": session_id, "from": "en-GB", "to": "da-DK", "text": "hi"},
+        headers={**API_KEY_HEADER, **(headers or {})},
+    )
+
+
+def test_spent_budget_answers_504(app, session_id, monkeypatch):
+    def slow_translate(text, *args):
+        time.sleep(0.3)
+        deadline.check("translation")
+        return text.upper()
+
+    monkeypatch.setattr(sessions, "translate_text", slow_translate)
+    response = _translate(app, session_id, {deadline.HEADER: "0.1"})
+
+    assert response.status_code == 504
+    assert "translation" in response.get_json()["error"]
+    assert deadline.remaining() is None
+
+    assert _translate(app, session_id, {deadline.HEADER: "5"}).status_code == 200
+
+
+def test_finished_turn_is_saved_after_the_deadline(app, session_id, monkeypatch):
+    def slow_translate(text, *args):
+        time.sleep(0.2)
+        return text.upper()
+
+    monkeypatch.setattr(sessions, "translate_text", slow_translate)
+    response = _translate(app, session_id, {deadline.HEADER: "0.1"})
+
+    assert response.status_code == 200
+    with app.app_context():
+        assert Translation.query.filter_by(translated="HI").count() == 1
+
+
+def test_budget_comes_from_header_or_endpoint(app, session_id, monkeypatch):
+    seen = []
+
+    def translate(text, *args):
+        seen.append(deadline.remaining())
+        return text.upper()
+
+    monkeypatch.setattr(sessions, "translate_text", translate)
+    monkeypatch.setitem(deadline.REQUEST_DEADLINES, "sessions_translate", 60)
+    _translate(app, session_id)
+    _translate(app, session_id, {deadline.HEADER: "1000"})
+    _translate(app, session_id, {deadline.HEADER: "2"})
+    monkeypatch.setitem(deadline.REQUEST_DEADLINES, "sessions_translate", 0)
+    _translate(app, session_id)
+
+    assert 59 < seen[0] <= 60
+    assert seen[1] <= deadline.REQUEST_DEADLINE_MAX_SECONDS
+    assert 1 < seen[2] <= 2
+    assert seen[3] is None
+
+
+def test_timeout_is_the_time_left_capped():
+    assert deadline.timeout(5, "x") == 5
+    assert deadline.timeout(None, "x") is None
+    with deadline.budget(2):
+        assert deadline.timeout(5, "x") <= 2
+        assert deadline.timeout(1, "x") == 1
+    with deadline.budget(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            deadline.timeout(5, "x")
+
+
+def test_thread_pool_work_keeps_the_deadline():
+    with deadline.budget(10), ThreadPoolExecutor(1) as pool:
+        assert pool.submit(deadline.remaining).result() is None
+        assert 9 < pool.submit(deadline.carry(deadline.remaining)).result() <= 10
+
+
+def test_sqlite_read_is_interrupted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/d.db")
+    deadline.configure_engine(engine)
+    endless = text(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+        "SELECT count(*) FROM n"
+    )
+    with engine.connect() as conn, deadline.budget(0.1):
+        started = time.monotonic()
+        with pytest.raises(exc.OperationalError, match="interrupted"):
+            conn.execute(endless)
+        assert time.monotonic() - started < 5
+        with pytest.raises(DeadlineExceeded):
+            conn.execute(text("SELECT 1"))
+    engine.dispose()
+
+
+def test_importing_the_app_does_not_load_requests():
+    code = "import sys, app; sys.exit('requests' in sys.modules)"
+    env = {**os.environ, "PYTHONPATH": os.path.join(os.path.dirname(__file__), "..", "src")}
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True)
+    assert result.returncode == 0
@@ -0,0 +1,111 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from services import export
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        turns = {
+            "finished": [("en-GB", "da-DK", 1), ("da-DK", "en-GB", 2), ("en-GB", "da-DK", 3)],
+            "ongoing": [("en-GB", "de-DE", 4), ("de-DE", "en-GB", 5)],
+        }
+        for status, rows in turns.items():
+            session = Session(status=status, language_a=rows[0][0], language_b=rows[0][1])
+            db.session.add(session)
+            db.session.flush()
+            for from_lang, to_lang, day in rows:
+                db.session.add(
+                    Translation(
+                        session_id=session.id,
+                        from_lang=from_lang,
+                        to_lang=to_lang,
+                        original=f"turn {day}, \"quoted\"",
+                        translated=f"tur {day}",
+                        created_at=datetime(2025, 3, day, 12),
+                    )
+                )
+        # No turns: not exported
+        db.session.add(Session(status="language_set", language_a="en-GB", language_b="fr-FR"))
+        db.session.commit()
+    return app
+
+
+def _export(app, **params):
+    return app.test_client().get(
+        "/api/v1/sessions/export", query_string=params, headers=API_KEY_HEADER
+    )
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_ndjson_has_one_record_per_translation(app):
+    response = _export(app)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    records = _ndjson(response)
+
+    assert [r["cursor"] for r in records] == [1, 2, 3, 4, 5]
+    assert list(records[0]) == export.EXPORT_FIELDS
+    assert records[0]["session_status"] == "finished"
+    assert records[0]["original"] == 'turn 1, "quoted"'
+    assert records[0]["created_at"] == "2025-03-01T12:00:00"
+    assert {r["language_b"] for r in records} == {"da-DK", "de-DE"}
+
+
+def test_csv_matches_ndjson(app):
+    response = _export(app, format="csv")
+    assert response.mimetype == "text/csv"
+    assert "translations-export.csv" in response.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+
+    assert list(rows[0]) == export.EXPORT_FIELDS
+    expected = [{k: str(v) for k, v in r.items()} for r in _ndjson(_export(app))]
+    assert rows == expected
+
+
+def test_resumes_after_the_cursor(app):
+    records = _ndjson(_export(app, after=2))
+    assert [r["cursor"] for r in records] == [3, 4, 5]
+    assert _export(app, after=5).data == b""
+
+
+def test_gzip_stream_decodes_to_the_plain_export(app, monkeypatch):
+    # Several sync-flushed chunks
+    monkeypatch.setattr(export, "EXPORT_CHUNK_BYTES", 100)
+    plain = _export(app, format="csv").data
+    response = _export(app, format="csv", gzip="true")
+
+    assert response.is_streamed
+    assert response.mimetype == "application/gzip"
+    assert "translations-export.csv.gz" in response.headers["Content-Disposition"]
+    assert gzip.decompress(response.data) == plain
+
+
+def test_filters(app):
+    def cursors(**params):
+        return [r["cursor"] for r in _ndjson(_export(app, **params))]
+
+    assert cursors(status="ongoing") == [4, 5]
+    assert cursors(since="2025-03-02", until="2025-03-04") == [2, 3]
+    assert cursors(language="de-DE") == [4, 5]
+    assert cursors(status="finished", language="da-DK", after=1) == [2, 3]
+
+
+def test_bad_parameters_are_rejected(app):
+    assert _export(app, format="xml").status_code == 400
+    assert _export(app, since="yesterday").status_code == 400
+    assert _export(app, after="x").status_code == 400
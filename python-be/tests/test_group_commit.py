@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from services.group_commit import GroupCommitWriter
+
+
+def test_concurrent_writes_are_committed_together(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'gc.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        session = Session()
+        db.session.add(session)
+        db.session.commit()
+        session_id = session.id
+
+    writer = GroupCommitWriter(app, window_ms=50, max_batch=64)
+    ids = []
+
+    def write(i):
+        fields = {
+            "session_id": session_id,
+            "from_lang": "en-GB",
+            "to_lang": "da-DK",
+            "original": f"hello {i}",
+            "translated": f"hej {i}",
+        }
+        ids.append(writer.write(fields))
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(ids) == list(range(1, 21))
+    with app.app_context():
+        assert Translation.query.count() == 20
+        assert db.session.get(Session, session_id).status == "ongoing"
+
+
+def _app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'gc.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        session = Session()
+        db.session.add(session)
+        db.session.commit()
+        app.config["SESSION_ID"] = session.id
+    return app
+
+
+def _fields(app, i):
+    return {
+        "session_id": app.config["SESSION_ID"],
+        "from_lang": "en-GB",
+        "to_lang": "da-DK",
+        "original": f"hello {i}",
+        "translated": f"hej {i}",
+    }
+
+
+def test_queued_writes_share_one_commit(tmp_path):
+    app = _app(tmp_path)
+    commits = []
+    with app.app_context():
+        event.listen(db.engine, "commit", lambda conn: commits.append(1))
+
+    writer = GroupCommitWriter(app, window_ms=200, max_batch=64)
+    futures = [writer.submit(_fields(app, i)) for i in range(10)]
+    assert [f.result(timeout=5) for f in futures] == list(range(1, 11))
+    assert len(commits) == 1
+
+
+def test_writer_survives_a_failed_batch(tmp_path, monkeypatch):
+    app = _app(tmp_path)
+    writer = GroupCommitWriter(app, window_ms=0, max_batch=64)
+    flush = writer._flush
+    failures = [RuntimeError("session teardown failed")]
+
+    def flaky_flush(batch):
+        if failures:
+            raise failures.pop()
+        flush(batch)
+
+    monkeypatch.setattr(writer, "_flush", flaky_flush)
+    with pytest.raises(RuntimeError, match="teardown"):
+        writer.write(_fields(app, 0), timeout=5)
+    assert writer.write(_fields(app, 1), timeout=5) == 1
+
+
+def test_timed_out_write_is_withdrawn(tmp_path, monkeypatch):
+    app = _app(tmp_path)
+    writer = GroupCommitWriter(app, window_ms=0, max_batch=64)
+    flush = writer._flush
+    busy, release = threading.Event(), threading.Event()
+
+    def slow_flush(batch):
+        busy.set()
+        release.wait(5)
+        flush(batch)
+
+    monkeypatch.setattr(writer, "_flush", slow_flush)
+    first = writer.submit(_fields(app, 0))
+    busy.wait(5)
+    with pytest.raises(TimeoutError):
+        writer.write(_fields(app, 1), timeout=0.05)
+    release.set()
+
+    assert first.result(timeout=5) == 1
+    assert writer.write(_fields(app, 2), timeout=5) == 2
+    with app.app_context():
+        assert [t.original for t in Translation.query.order_by(Translation.id)] == [
+            "hello 0",
+            "hello 2",
+        ]
@@ -0,0 +1,178 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models.translation import Translation
+from routes import sessions
+from services import deadline, idempotency
+from services.circuit_breaker import ProviderUnavailable
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(idempotency, "_stats", dict.fromkeys(idempotency._stats, 0))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def translate(text, *args):
+        calls.append(text)
+        return text.upper()
+
+    monkeypatch.setattr(sessions, "translate_text", translate)
+    return calls
+
+
+def _translate(app, session_id, text="hello", key=None):
+    headers = {**API_KEY_HEADER, **({"Idempotency-Key": key} if key else {})}
+    return app.test_client().post(
+        "/api/v1/sessions/translate",
+        json={"session_id": session_id, "from": "en-GB", "to": "da-DK", "text": text},
+        headers=headers,
+    )
+
+
+def _turns(app, session_id):
+    with app.app_context():
+        return Translation.query.filter_by(session_id=session_id).count()
+
+
+def test_retry_with_the_same_key_gets_the_first_response(app, session_id, calls):
+    key = str(uuid.uuid4())
+    first = _translate(app, session_id, key=key)
+    retry = _translate(app, session_id, key=key)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert calls == ["hello"]
+    assert _turns(app, session_id) == 1
+
+    # A new key is a new turn
+    assert _translate(app, session_id, key=str(uuid.uuid4())).status_code == 200
+    assert _turns(app, session_id) == 2
+
+
+def test_key_reused_for_a_different_request_is_rejected(app, session_id, calls):
+    key = str(uuid.uuid4())
+    _translate(app, session_id, "hello", key=key)
+    response = _translate(app, session_id, "goodbye", key=key)
+
+    assert response.status_code == 422
+    assert calls == ["hello"]
+
+
+def test_concurrent_identical_requests_share_one_call(app, session_id, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_translate(text, *args):
+        calls.append(text)
+        started.set()
+        release.wait(5)
+        return text.upper()
+
+    monkeypatch.setattr(sessions, "translate_text", slow_translate)
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(_translate, app, session_id)
+        started.wait(5)
+        followers = [pool.submit(_translate, app, session_id) for _ in range(3)]
+        while idempotency._stats["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        responses = [leader.result()] + [f.result() for f in followers]
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert all(r.get_json()["translated"] == "HELLO" for r in responses)
+    assert calls == ["hello"]
+    assert _turns(app, session_id) == 1
+    # Without a key nothing is kept once the request is done
+    assert _translate(app, session_id).status_code == 200
+    assert _turns(app, session_id) == 2
+
+
+def test_failures_are_not_replayed(app, session_id, monkeypatch):
+    def unavailable(*args):
+        raise ProviderUnavailable("gpt4o-mini", "circuit open", 7)
+
+    monkeypatch.setattr(sessions, "translate_text", unavailable)
+    key = str(uuid.uuid4())
+    assert _translate(app, session_id, key=key).status_code == 503
+
+    monkeypatch.setattr(sessions, "translate_text", lambda text, *a: text.upper())
+    response = _translate(app, session_id, key=key)
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+    assert _turns(app, session_id) == 1
+
+
+def test_tts_audio_is_replayed(app, monkeypatch):
+    calls = []
+
+    def synthesize(text, voice):
+        calls.append(voice)
+        return b"RIFF" + bytes(2000)
+
+    monkeypatch.setattr(sessions, "synthesize_speech", synthesize)
+    headers = {**API_KEY_HEADER, "Idempotency-Key": str(uuid.uuid4())}
+    body = {"text": "Hej", "lang": "da-DK"}
+    client = app.test_client()
+    first = client.post("/api/v1/sessions/tts", json=body, headers=headers)
+    retry = client.post("/api/v1/sessions/tts", json=body, headers=headers)
+
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.mimetype == "audio/wav"
+    assert retry.data == first.data
+    assert len(calls) == 1
+
+
+def test_retry_waits_for_the_attempt_running_in_another_worker(app, session_id, calls):
+    key = str(uuid.uuid4())
+    flight = f"/api/v1/sessions/translate:{key}"
+    _translate(app, session_id, key=key)
+    record = idempotency._responses.get(flight)
+
+    # As seen from another worker: the first attempt is still running
+    idempotency._responses.delete(flight)
+    idempotency._running.set(flight, record["fingerprint"])
+
+    def other_worker_finishes():
+        time.sleep(0.2)
+        idempotency._responses.set(flight, record)
+        idempotency._running.delete(flight)
+
+    threading.Thread(target=other_worker_finishes).start()
+    retry = _translate(app, session_id, key=key)
+
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json()["translated"] == "HELLO"
+    assert calls == ["hello"]
+    assert idempotency._stats["awaited"] == 1
+
+
+def test_retry_that_gives_up_leaves_the_running_marker(app, session_id, calls):
+    key = str(uuid.uuid4())
+    flight = f"/api/v1/sessions/translate:{key}"
+    # Another worker took the marker first and is still running
+    assert idempotency._running.add(flight, "fingerprint-of-the-first-attempt")
+
+    headers = {**API_KEY_HEADER, "Idempotency-Key": key, deadline.HEADER: "0.2"}
+    retry = app.test_client().post(
+        "/api/v1/sessions/translate",
+        json={"session_id": session_id, "from": "en-GB", "to": "da-DK", "text": "hi"},
+        headers=headers,
+    )
+
+    assert retry.status_code == 504
+    assert calls == []
+    assert idempotency._running.get(flight) == "fingerprint-of-the-first-attempt"
+    assert idempotency._responses.get(flight) is None
+    idempotency._running.delete(flight)
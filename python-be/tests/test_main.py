@@ -1,11 +1,11 @@
 import os
 import pytest
-from app import app
+from app import create_app
 
 
 @pytest.fixture
 def client():
-    app.config["TESTING"] = True
+    app = create_app({"TESTING": True})
     with app.test_client() as client:
         yield client
 
@@ -0,0 +1,75 @@
+import time
+from unittest import mock
+
+import pytest
+
+from services import rate_limit as rl
+
+
+def _response(status=200, headers=None, usage=None):
+    resp = mock.Mock(status_code=status, headers=headers or {})
+    resp.json.return_value = {"usage": {"total_tokens": usage}} if usage else {}
+    return resp
+
+
+def _limiter(tpm=6000, rpm=60):
+    # 10 s of quota: 1000 tokens, 10 requests
+    return rl.DeploymentLimiter("gpt4o-mini", tpm, rpm)
+
+
+def test_estimate_counts_prompt_and_expected_completion():
+    payload = {
+        "messages": [
+            {"role": "system", "content": "x" * 400},
+            {"role": "user", "content": "y" * 400},
+        ]
+    }
+    # 2 x (100 + 4) prompt tokens + 150 expected completion tokens
+    assert rl.estimate_tokens(payload) == pytest.approx(358)
+
+
+def test_empty_bucket_rejects_beyond_queue_budget():
+    limiter = _limiter()
+    limiter.acquire(1000, deadline=time.monotonic())
+    with pytest.raises(rl.RateLimited) as excinfo:
+        limiter.acquire(500, deadline=time.monotonic() + 0.1)
+    # 500 tokens at 100 tokens/s
+    assert excinfo.value.retry_after == 5
+
+
+def test_usage_and_headers_resynchronise_the_buckets():
+    limiter = _limiter()
+    limiter.acquire(800, deadline=time.monotonic())
+    limiter.observe(_response(usage=300), estimated_tokens=800)
+    assert limiter.tokens.level == pytest.approx(700, abs=5)
+
+    limiter.observe(
+        _response(headers={"x-ratelimit-remaining-tokens": "120"}), estimated_tokens=0
+    )
+    assert limiter.tokens.level == pytest.approx(120)
+
+
+def test_429_blocks_until_retry_after():
+    limiter = _limiter()
+    assert limiter.observe(_response(429, {"retry-after-ms": "200"}), 0) == 0.2
+    started = time.monotonic()
+    limiter.acquire(1, deadline=time.monotonic() + 1)
+    assert time.monotonic() - started >= 0.19
+
+
+def test_streamed_429_is_closed_before_retrying(monkeypatch):
+    limited = _response(429, {"retry-after-ms": "10"})
+    ok = _response()
+    session = mock.Mock()
+    session.post.side_effect = [limited, ok, limited]
+    monkeypatch.setattr(rl, "get_session", lambda: session)
+    monkeypatch.setattr(rl, "get_limiter", lambda model_key: _limiter())
+
+    assert rl.post_within_quota("gpt4o-mini", "https://x", {}, stream=True) is ok
+    limited.close.assert_called_once()
+    ok.close.assert_not_called()
+
+    limited.headers = {"retry-after": "60"}
+    with pytest.raises(rl.RateLimited):
+        rl.post_within_quota("gpt4o-mini", "https://x", {}, stream=True)
+    assert limited.close.call_count == 2
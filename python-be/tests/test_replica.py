@@ -0,0 +1,101 @@
+import os
+import time
+
+import pytest
+
+from db import replica
+from db.sql import db
+from models.replica_heartbeat import ReplicaHeartbeat
+from models.session import Session
+from routes import sessions
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+@pytest.fixture
+def app(make_app, tmp_path, monkeypatch):
+    """Two local databases: the primary and a 'replica' nothing replicates to."""
+    app = make_app(SQLALCHEMY_BINDS={"replica": f"sqlite:///{tmp_path}/replica.db"})
+    with app.app_context():
+        db.metadata.create_all(db.engines["replica"])
+    # Lag is checked by the tests, not by the monitor thread
+    monkeypatch.setattr(replica, "_monitor_pid", os.getpid())
+    monkeypatch.setattr(replica, "_lag", 0.0)
+    monkeypatch.setattr(replica, "_checked_at", time.monotonic())
+    monkeypatch.setattr(replica, "_stats", dict.fromkeys(replica._stats, 0))
+    return app
+
+
+def _add_session(app, bind, session_id):
+    with app.app_context():
+        with db.engines[bind].begin() as connection:
+            connection.execute(
+                Session.__table__.insert().values(
+                    id=session_id, status="created", language_a="en-GB", language_b="da-DK"
+                )
+            )
+
+
+def _listed(client):
+    response = client.get("/api/v1/sessions/list", headers=API_KEY_HEADER)
+    return {s["session_id"] for s in response.get_json()}
+
+
+def test_reads_use_the_replica_and_writes_the_primary(app):
+    _add_session(app, None, "on-primary")
+    _add_session(app, "replica", "on-replica")
+    client = app.test_client()
+
+    assert _listed(client) == {"on-replica"}
+
+    response = client.post("/api/v1/sessions/start-session", headers=API_KEY_HEADER)
+    new_id = response.get_json()["session_id"]
+    with app.app_context():
+        assert db.session.get(Session, new_id) is not None  # outside a request: primary
+
+
+def test_session_just_written_is_read_from_the_primary(app, monkeypatch):
+    monkeypatch.setattr(sessions, "translate_text", lambda text, *a: text.upper())
+    _add_session(app, None, "busy")
+    _add_session(app, None, "quiet")
+    writer, reader = app.test_client(), app.test_client()
+
+    writer.post(
+        "/api/v1/sessions/translate",
+        json={"session_id": "busy", "from": "en-GB", "to": "da-DK", "text": "hi"},
+        headers=API_KEY_HEADER,
+    )
+
+    # Another screen following the session sees the new turn
+    response = reader.get("/api/v1/sessions/busy", headers=API_KEY_HEADER)
+    assert response.status_code == 200
+    assert [t["translated"] for t in response.get_json()["translations"]] == ["HI"]
+    # Sessions nobody wrote to are still read from the replica
+    assert reader.get("/api/v1/sessions/quiet", headers=API_KEY_HEADER).status_code == 404
+    # The writing client reads the primary for a while, whatever it asks for
+    assert _listed(writer) == {"busy", "quiet"}
+    assert _listed(reader) == set()
+
+
+def test_lagging_replica_falls_back_to_the_primary(app):
+    _add_session(app, None, "on-primary")
+    client = app.test_client()
+
+    with app.app_context():
+        with db.engines["replica"].begin() as connection:
+            connection.execute(
+                ReplicaHeartbeat.__table__.insert().values(
+                    id=1, beat_ms=int((time.time() - 60) * 1000)
+                )
+            )
+    assert replica.check_replica() > 59
+    assert _listed(client) == {"on-primary"}
+
+    with app.app_context():
+        with db.engines["replica"].begin() as connection:
+            connection.execute(
+                ReplicaHeartbeat.__table__.update().values(beat_ms=int(time.time() * 1000))
+            )
+    assert replica.check_replica() < 1
+    assert _listed(client) == set()
+    assert replica.replica_stats()["lagging"] == 1
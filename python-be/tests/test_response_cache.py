@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from db.migrate import run_migrations
+from db.sql import db
+from models.language import LanguageSetting
+from services import response_cache
+from services.response_cache import (
+    SETTINGS_GENERATION,
+    TRANSLATIONS_REMOVED_GENERATION,
+    bump_generation,
+    get_generation,
+)
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        for code in ("da-DK", "en-GB", "de-DE"):
+            db.session.add(
+                LanguageSetting(code=code, enabled=True, translation_model="gpt4o-mini")
+            )
+        db.session.commit()
+    return app
+
+
+def _enabled(client, etag=None):
+    headers = {**API_KEY_HEADER, **({"If-None-Match": etag} if etag else {})}
+    return client.get("/api/v1/languages/enabled", headers=headers)
+
+
+def test_unchanged_listing_is_not_modified(app):
+    client = app.test_client()
+    first = _enabled(client)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert etag.startswith('"')
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert [lang["code"] for lang in first.get_json()] == ["da-DK", "de-DE", "en-GB"]
+
+    again = _enabled(client, etag)
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_write_makes_cached_responses_stale(app):
+    client = app.test_client()
+    etag = _enabled(client).headers["ETag"]
+
+    response = client.put(
+        "/api/v1/languages/de-DE", json={"enabled": False}, headers=API_KEY_HEADER
+    )
+    assert response.status_code == 200
+
+    fresh = _enabled(client, etag)
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert [lang["code"] for lang in fresh.get_json()] == ["da-DK", "en-GB"]
+
+
+def test_generation_read_before_the_commit_is_not_kept(app):
+    with app.app_context():
+        before = get_generation(SETTINGS_GENERATION)
+        bump_generation(SETTINGS_GENERATION)
+        # A concurrent request reads and caches the committed (old) value
+        response_cache._generations.set(SETTINGS_GENERATION, before)
+        db.session.commit()
+        assert get_generation(SETTINGS_GENERATION) == before + 1
+
+        # A rolled back bump changes nothing
+        bump_generation(SETTINGS_GENERATION)
+        db.session.rollback()
+        assert get_generation(SETTINGS_GENERATION) == before + 1
+
+
+def test_concurrent_first_bumps_both_count(app):
+    with app.app_context():
+        assert run_migrations() == []
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def bump():
+        with app.app_context():
+            barrier.wait()
+            try:
+                bump_generation(TRANSLATIONS_REMOVED_GENERATION)
+                db.session.commit()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=bump) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        assert get_generation(TRANSLATIONS_REMOVED_GENERATION) == 2
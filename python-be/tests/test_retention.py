@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.sql import db
+from models.session import Session
+from models.session_archive import SessionArchive
+from models.translation import Translation
+from services import retention
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+OLD = datetime.utcnow() - timedelta(days=200)
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        yield app
+
+
+def _session(status, created_at, turns=0):
+    session = Session(
+        status=status, language_a="en-GB", language_b="da-DK", created_at=created_at
+    )
+    db.session.add(session)
+    db.session.flush()
+    for i in range(turns):
+        db.session.add(
+            Translation(
+                session_id=session.id,
+                from_lang="en-GB",
+                to_lang="da-DK",
+                original=f"hello {i}",
+                translated=f"hej {i}",
+            )
+        )
+    db.session.commit()
+    return session.id
+
+
+def test_only_old_finished_sessions_are_archived(app):
+    finished = _session("finished", OLD, turns=2)
+    ongoing = _session("ongoing", OLD, turns=1)
+    recent = _session("finished", NOW, turns=1)
+    live = app.test_client().get(f"/api/v1/sessions/{finished}", headers=API_KEY_HEADER)
+
+    assert retention.archive_batch(NOW - timedelta(days=90)) == 1
+
+    assert db.session.get(Session, finished) is None
+    assert Translation.query.filter_by(session_id=finished).count() == 0
+    assert db.session.get(SessionArchive, finished).translation_count == 2
+    for kept in (ongoing, recent):
+        assert db.session.get(Session, kept) is not None
+        assert db.session.get(SessionArchive, kept) is None
+
+    # Served from the archive in the same shape as before
+    response = app.test_client().get(f"/api/v1/sessions/{finished}", headers=API_KEY_HEADER)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body.pop("archived") is True
+    assert body == live.get_json()
+    assert [t["id"] for t in body["translations"]]
+
+
+def test_abandoned_sessions_are_purged(app):
+    abandoned = _session("created", OLD)
+    fresh = _session("created", NOW)
+    started = _session("language_set", OLD)
+
+    assert retention.purge_abandoned_batch(NOW - timedelta(hours=24)) == 1
+
+    assert db.session.get(Session, abandoned) is None
+    assert db.session.get(SessionArchive, abandoned) is None
+    assert db.session.get(Session, fresh) is not None
+    assert db.session.get(Session, started) is not None
+
+
+def test_pass_works_in_batches(app, monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_BATCH_SIZE", 2)
+    monkeypatch.setattr(retention, "RETENTION_BATCH_PAUSE_SECONDS", 0)
+    for _ in range(5):
+        _session("finished", OLD, turns=1)
+    _session("created", OLD)
+
+    assert retention.archive_batch(NOW, batch_size=2) == 2
+    assert retention.run_retention_pass() == {"archived": 3, "purged": 1}
+    assert SessionArchive.query.count() == 5
+    assert Session.query.count() == 0
+    assert Translation.query.count() == 0
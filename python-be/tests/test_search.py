@@ -0,0 +1,103 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from services import retention, search
+from services.search import InvertedIndex, make_snippet, tokenize
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+Row = namedtuple(
+    "Row", "id session_id from_lang to_lang original translated created_at"
+)
+
+
+def _index(*rows):
+    index = InvertedIndex()
+    for row in rows:
+        index.add(row)
+    return index
+
+
+def test_tokenize_is_unicode_aware():
+    assert tokenize("Opholdstilladelse, Søren!") == ["opholdstilladelse", "søren"]
+
+
+def test_snippet_is_centred_on_the_match():
+    text = "a" * 300 + " passport " + "b" * 300
+    snippet = make_snippet(text, ["passport"], width=60)
+    assert "passport" in snippet
+    assert snippet.startswith("…") and snippet.endswith("…")
+
+
+def test_ranking_prefers_rarer_terms_and_applies_filters():
+    now = datetime(2025, 1, 1)
+    index = _index(
+        Row(1, "s1", "fr-FR", "da-DK", "mon passeport", "mit pas", now),
+        Row(2, "s1", "da-DK", "fr-FR", "mit pas og mit pas", "passeport", now),
+        Row(3, "s2", "ar-EG", "da-DK", "مرحبا", "hej med dig", now),
+    )
+
+    ranked = index.search(["pas"], lambda doc: True)
+    assert [doc_id for doc_id, _ in ranked] == [2, 1]
+
+    only_arabic = index.search(["hej"], lambda doc: doc[1] == "ar-EG")
+    assert [doc_id for doc_id, _ in only_arabic] == [3]
+
+    index.discard([2])
+    assert [doc_id for doc_id, _ in index.search(["pas"], lambda doc: True)] == [1]
+    assert "og" not in index.postings
+    assert set(index.postings["pas"]) == {1}
+
+
+@pytest.fixture
+def app(app, monkeypatch):
+    monkeypatch.setattr(search, "_index", InvertedIndex())
+    with app.app_context():
+        yield app
+
+
+def _session(status, created_at, turns):
+    session = Session(
+        status=status, language_a="en-GB", language_b="da-DK", created_at=created_at
+    )
+    db.session.add(session)
+    db.session.flush()
+    for _ in range(turns):
+        db.session.add(
+            Translation(
+                session_id=session.id,
+                from_lang="en-GB",
+                to_lang="da-DK",
+                original="where is my passport",
+                translated="hvor er mit pas",
+            )
+        )
+    db.session.commit()
+
+
+def _total(app):
+    response = app.test_client().get(
+        "/api/v1/sessions/search?q=passport&per_page=1", headers=API_KEY_HEADER
+    )
+    assert response.status_code == 200
+    return response.get_json()["total"]
+
+
+def test_route_catches_up_and_drops_archived_turns(app):
+    now = datetime.utcnow()
+    _session("finished", now - timedelta(days=200), turns=3)
+    _session("ongoing", now, turns=1)
+    assert _total(app) == 4
+
+    _session("ongoing", now, turns=2)
+    assert _total(app) == 6
+
+    assert retention.archive_batch(now - timedelta(days=90)) == 1
+    # The archived turns are not on the served page but leave the total
+    assert _total(app) == 3
+    assert len(search._index.docs) == 3
@@ -0,0 +1,180 @@
+import json
+import queue
+import threading
+
+import pytest
+
+from db.sql import db
+from models.translation import Translation
+from routes import sessions
+from services import session_channel as channel
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+@pytest.fixture(autouse=True)
+def broker(monkeypatch):
+    broker = channel.MemoryBroker(queue_size=4)
+    monkeypatch.setattr(channel, "_broker", broker)
+    monkeypatch.setattr(channel, "CHANNEL_KEEPALIVE_SECONDS", 0.05)
+    monkeypatch.setattr(channel, "CHANNEL_STREAM_SECONDS", 1)
+    monkeypatch.setattr(channel, "_open_streams", 0)
+    return broker
+
+
+def _open_stream(app, url, headers):
+    """Read the event stream on its own thread and client, as a second screen would."""
+    frames = queue.Queue()
+
+    def read():
+        response = app.test_client().get(
+            url, headers={**API_KEY_HEADER, **headers}, buffered=False
+        )
+        frames.put(response.mimetype)
+        for frame in response.response:
+            frames.put(frame.decode())
+        response.close()
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    return lambda: frames.get(timeout=2), reader
+
+
+def _parse(frame: str):
+    fields = dict(
+        line.split(": ", 1) for line in frame.strip().splitlines() if ": " in line
+    )
+    return fields.get("event"), fields.get("id"), json.loads(fields.get("data", "null"))
+
+
+def test_broker_fans_out_and_flags_slow_clients(broker):
+    fast = broker.subscribe("s1")
+    slow = broker.subscribe("s1")
+    other = broker.subscribe("s2")
+
+    for i in range(5):
+        broker.publish("s1", str(i))
+        assert fast.get(0) == str(i)
+
+    assert slow.overflowed and not fast.overflowed
+    assert other.get(0) is None
+    slow.close()
+    assert broker.stats()["clients"] == 2
+
+
+@pytest.fixture
+def client(app, session_id):
+    with app.app_context():
+        db.session.add_all(
+            Translation(
+                session_id=session_id,
+                from_lang="en-GB",
+                to_lang="da-DK",
+                original=f"hello {i}",
+                translated=f"hej {i}",
+            )
+            for i in range(3)
+        )
+        db.session.commit()
+    with app.test_client() as client:
+        yield app, client, session_id
+
+
+def test_stream_resumes_after_last_event_id_then_goes_live(client, monkeypatch):
+    app, client, session_id = client
+    monkeypatch.setattr(sessions, "translate_text", lambda text, *a: text.upper())
+
+    next_frame, reader = _open_stream(
+        app, f"/api/v1/sessions/{session_id}/events", {"Last-Event-ID": "1"}
+    )
+    assert next_frame() == "text/event-stream"
+
+    assert next_frame().startswith("retry:")
+    kind, _, data = _parse(next_frame())
+    assert kind == "status" and data["session_id"] == session_id
+    replayed = [_parse(next_frame()) for _ in range(2)]
+    assert [(k, i, d["original"]) for k, i, d in replayed] == [
+        ("turn", "2", "hello 1"),
+        ("turn", "3", "hello 2"),
+    ]
+    assert next_frame().startswith(": keepalive")
+
+    client.post(
+        "/api/v1/sessions/translate",
+        json={"session_id": session_id, "from": "en-GB", "to": "da-DK", "text": "bye"},
+        headers=API_KEY_HEADER,
+    )
+    frame = next_frame()
+    while frame.startswith(":"):
+        frame = next_frame()
+    kind, _, data = _parse(frame)
+    assert (kind, data["status"]) == ("status", "ongoing")
+    kind, event_id, data = _parse(next_frame())
+    assert (kind, event_id, data["translated"]) == ("turn", "4", "BYE")
+    reader.join()
+
+
+def test_turns_already_replayed_are_not_sent_twice(client, broker):
+    app, _, session_id = client
+    # Published between subscribing and reading the database
+    broker.subscribe = _publish_on_subscribe(broker.subscribe, session_id)
+    next_frame, reader = _open_stream(
+        app, f"/api/v1/sessions/{session_id}/events?after=2", {}
+    )
+    next_frame()  # mimetype
+    frames = [_parse(next_frame()) for _ in range(4)]
+    assert [(kind, event_id) for kind, event_id, _ in frames] == [
+        (None, None),  # retry
+        ("status", None),
+        ("turn", "3"),
+        ("recap", None),
+    ]
+    reader.join()
+
+
+def _publish_on_subscribe(subscribe, session_id):
+    def wrapped(sid):
+        subscription = subscribe(sid)
+        channel.publish(session_id, "turn", {"original": "hello 2"}, 3)
+        channel.publish(session_id, "recap", {"summary": "done"})
+        return subscription
+
+    return wrapped
+
+
+def test_unknown_session_is_404(client):
+    _, client, _ = client
+    response = client.get("/api/v1/sessions/nope/events", headers=API_KEY_HEADER)
+    assert response.status_code == 404
+
+
+def test_streams_per_worker_are_capped(client, monkeypatch):
+    app, client, session_id = client
+    monkeypatch.setattr(channel, "CHANNEL_MAX_STREAMS", 1)
+    url = f"/api/v1/sessions/{session_id}/events"
+    opened, leave = threading.Event(), threading.Event()
+
+    def hold_stream():
+        # A screen that connects, then goes away without reading to the end
+        response = app.test_client().get(url, headers=API_KEY_HEADER, buffered=False)
+        next(iter(response.response))
+        opened.set()
+        leave.wait(5)
+        response.close()
+
+    screen = threading.Thread(target=hold_stream)
+    screen.start()
+    opened.wait(5)
+    rejected = client.get(url, headers=API_KEY_HEADER)
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "2"
+    assert channel.channel_stats()["streams_rejected"] == 1
+    # Other endpoints are unaffected
+    assert client.get(f"/api/v1/sessions/{session_id}", headers=API_KEY_HEADER).status_code == 200
+
+    leave.set()
+    screen.join()
+    assert channel.channel_stats()["streams"] == 0
+    next_frame, reader = _open_stream(app, url, {})
+    assert next_frame() == "text/event-stream"
+    reader.join()
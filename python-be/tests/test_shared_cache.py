@@ -0,0 +1,148 @@
+import os
+import stat
+import time
+import multiprocessing
+
+import pytest
+
+from services.shared_cache import SharedStore, TieredCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def _worker(path, namespace):
+    """Another process on the host: opens the same file and caches a value."""
+    cache = TieredCache(namespace, 8, store=SharedStore(path, 16, 1024, 4))
+    cache.set("voices", {"da-DK": ["Christel", "Jeppe"]})
+    cache.set("body", b"\x00raw")
+
+
+def test_value_built_in_one_process_is_served_to_another(path):
+    process = multiprocessing.get_context("fork").Process(
+        target=_worker, args=(path, "ns")
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+    cache = TieredCache("ns", 8, store=SharedStore(path, 16, 1024, 4))
+    assert cache.get("voices") == {"da-DK": ["Christel", "Jeppe"]}
+    assert cache.get("body") == b"\x00raw"
+    assert cache.stats()["shared_hits"] == 2
+    assert cache.get("voices") is not None
+    assert cache.stats()["local_hits"] == 1
+
+
+def test_entries_expire(path):
+    cache = TieredCache("ns", 8, store=SharedStore(path, 16, 1024, 4))
+    cache.set("k", "v", ttl=0.05)
+    assert cache.get("k") == "v"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+
+def test_full_set_evicts_its_oldest_entry(path):
+    # One set of two ways
+    store = SharedStore(path, 2, 1024, 2)
+    cache = TieredCache("ns", 0, store=store)
+    reader = TieredCache("ns", 8, store=store)
+    for key in ("a", "b", "c"):
+        store.set(cache._digest(key, 0), key, 0.0)
+        time.sleep(0.001)
+    assert [reader.get(k) for k in ("a", "b", "c")] == [None, "b", "c"]
+
+
+def test_invalidate_reaches_every_worker(path):
+    first = TieredCache("settings", 8, store=SharedStore(path, 16, 1024, 4))
+    second = TieredCache("settings", 8, store=SharedStore(path, 16, 1024, 4))
+    other = TieredCache("voices", 8, store=SharedStore(path, 16, 1024, 4))
+    first.set("lang", "da-DK")
+    other.set("lang", "en-GB")
+    assert second.get("lang") == "da-DK"
+
+    first.invalidate()
+    assert second.get("lang") is None
+    assert first.get("lang") is None
+    assert other.get("lang") == "en-GB"
+
+
+def _add(path, start, results):
+    cache = TieredCache("running", 8, store=SharedStore(path, 16, 1024, 4))
+    start.wait()
+    results.put(cache.add("flight", os.getpid(), ttl=5))
+
+
+def test_add_succeeds_in_one_worker_only(path):
+    context = multiprocessing.get_context("fork")
+    start, results = context.Event(), context.Queue()
+    processes = [context.Process(target=_add, args=(path, start, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    start.set()
+    added = [results.get(timeout=5) for _ in processes]
+    for process in processes:
+        process.join()
+    assert sorted(added) == [False, False, False, True]
+
+    cache = TieredCache("running", 8, store=SharedStore(path, 16, 1024, 4))
+    assert cache.add("flight", "mine", ttl=0.05) is False
+    cache.delete("flight")
+    assert cache.add("flight", "mine", ttl=0.05) is True
+    time.sleep(0.1)
+    # An expired entry is absent
+    assert cache.add("flight", "again") is True
+    assert cache.get("flight") == "again"
+
+
+def test_values_larger_than_a_slot_stay_local(path):
+    cache = TieredCache("ns", 8, store=SharedStore(path, 16, 128, 4))
+    sibling = TieredCache("ns", 8, store=SharedStore(path, 16, 128, 4))
+    cache.set("big", "x" * 500)
+    assert cache.get("big") == "x" * 500
+    assert sibling.get("big") is None
+    assert cache.stats()["too_large"] == 1
+
+
+def test_works_without_shared_tier():
+    cache = TieredCache("ns", 2, store=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None  # LRU bound
+    assert cache.get("c") == 3
+    cache.invalidate()
+    assert cache.get("c") is None
+    assert cache.add("c", 4) is True
+    assert cache.add("c", 5) is False
+    assert cache.get("c") == 4
+
+
+def test_refuses_a_file_other_users_can_reach(tmp_path):
+    path = str(tmp_path / "cache")
+    SharedStore(path, 16, 1024, 4)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    os.chmod(path, 0o666)
+    with pytest.raises(PermissionError):
+        SharedStore(path, 16, 1024, 4)
+
+    # A symlink planted where the file should be is not followed
+    os.symlink(tmp_path / "elsewhere", tmp_path / "link")
+    with pytest.raises(OSError):
+        SharedStore(str(tmp_path / "link"), 16, 1024, 4)
+    assert not (tmp_path / "elsewhere").exists()
+
+
+def test_refuses_a_shared_directory(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o1777)
+    with pytest.raises(PermissionError):
+        SharedStore(str(shared / "cache"), 16, 1024, 4)
+
+    # A missing directory is created private
+    SharedStore(str(tmp_path / "private" / "cache"), 16, 1024, 4)
+    assert stat.S_IMODE(os.stat(tmp_path / "private").st_mode) == 0o700
@@ -0,0 +1,166 @@
+import io
+import os
+import json
+import time
+import tempfile
+from unittest import mock
+
+import pytest
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from routes import sessions
+from services import circuit_breaker
+from services import translation_service as ts
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+def _sse_response(*deltas):
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": d}}]}) for d in deltas
+    ] + ["data: [DONE]"]
+    resp = mock.Mock(status_code=200, headers={"Content-Type": "text/event-stream"})
+    resp.iter_lines.return_value = iter(lines)
+    return resp
+
+
+def test_split_sentences_waits_for_whole_sentences():
+    pieces = ["Hej. Hvor", "dan går det", "? Godt!", " Tak"]
+    assert list(ts.split_sentences(pieces)) == [
+        "Hej. ",
+        "Hvordan går det? ",
+        "Godt! ",
+        "Tak",
+    ]
+    assert list(ts.split_sentences(["1.5 kg.", " 我很好。你呢？"])) == [
+        "1.5 kg. ",
+        "我很好。",
+        "你呢？",
+    ]
+
+
+def test_stream_translate_yields_model_deltas(monkeypatch):
+    monkeypatch.setattr(ts, "MODEL_URL_MAP", {"gpt4o-mini": "http://model"})
+    monkeypatch.setattr(
+        ts, "post_within_quota", lambda *a, **kw: _sse_response("Hel", "lo.")
+    )
+    assert list(ts.stream_translate("Hej.", "gpt4o-mini", "da-DK", "en-GB")) == [
+        "Hel",
+        "lo.",
+    ]
+
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield app, client
+
+
+def test_speech_to_speech_streams_transcript_sentences_and_audio(client, monkeypatch):
+    app, client = client
+    with app.app_context():
+        session = Session()
+        db.session.add(session)
+        db.session.commit()
+        session_id = session.id
+
+    monkeypatch.setattr(sessions, "transcribe_audio", lambda *a: "Hej. Hvordan går det?")
+    monkeypatch.setattr(
+        sessions,
+        "stream_translate",
+        lambda *a: iter(["Hello. How", " are you?"]),
+    )
+    monkeypatch.setattr(sessions, "synthesize_speech", lambda text, voice: text.encode())
+
+    response = client.post(
+        "/api/v1/sessions/speech-to-speech",
+        data={
+            "session_id": session_id,
+            "from": "da-DK",
+            "to": "en-GB",
+            "audio": (io.BytesIO(b"RIFF"), "turn.wav"),
+        },
+        headers=API_KEY_HEADER,
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.data.decode().splitlines()]
+
+    assert events[0] == {"type": "transcript", "original": "Hej. Hvordan går det?"}
+    assert [e["text"] for e in events if e["type"] == "translation"] == [
+        "Hello.",
+        "How are you?",
+    ]
+    audio = [e for e in events if e["type"] == "audio"]
+    assert [a["index"] for a in audio] == [0, 1]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["translated"] == "Hello. How are you?"
+
+    with app.app_context():
+        saved = Translation.query.filter_by(session_id=session_id).one()
+        assert saved.translated == "Hello. How are you?"
+
+
+def test_client_leaving_mid_stream_does_not_count_against_the_provider(monkeypatch):
+    monkeypatch.setattr(ts, "MODEL_URL_MAP", {"gpt4o-mini": "http://model"})
+    monkeypatch.setattr(
+        ts, "post_within_quota", lambda *a, **kw: _sse_response("Hel", "lo. ", "Bye.")
+    )
+    breaker = circuit_breaker.CircuitBreaker("gpt4o-mini", max_concurrency=4)
+    monkeypatch.setattr(circuit_breaker, "BREAKER_ENABLED", True)
+    monkeypatch.setattr(circuit_breaker, "_breakers", {"gpt4o-mini": breaker})
+
+    for _ in range(3):
+        pieces = ts.stream_translate("Hej.", "gpt4o-mini", "da-DK", "en-GB")
+        assert next(pieces) == "Hel"
+        pieces.close()
+    while breaker.stats()["inflight"]:
+        time.sleep(0.01)
+
+    stats = breaker.stats()
+    assert stats["window_error_rate"] == 0.0
+    assert breaker.state == circuit_breaker.CLOSED
+
+    # The slot is held only while the model's stream is read
+    pieces = ts.stream_translate("Hej.", "gpt4o-mini", "da-DK", "en-GB")
+    assert next(pieces) == "Hel"
+    while breaker.stats()["inflight"]:
+        time.sleep(0.01)
+    assert list(pieces) == ["lo. ", "Bye."]
+
+
+def test_uploads_get_private_temporary_names(client, monkeypatch):
+    app, client = client
+    with app.app_context():
+        session = Session()
+        db.session.add(session)
+        db.session.commit()
+        session_id = session.id
+    paths = []
+
+    def transcribe(path, *args):
+        paths.append(path)
+        assert os.path.exists(path)
+        return ""
+
+    monkeypatch.setattr(sessions, "transcribe_audio", transcribe)
+    for _ in range(2):
+        client.post(
+            "/api/v1/sessions/speech-to-speech",
+            data={
+                "session_id": session_id,
+                "from": "da-DK",
+                "to": "en-GB",
+                "audio": (io.BytesIO(b"RIFF"), "../../etc/turn.wav"),
+            },
+            headers=API_KEY_HEADER,
+            content_type="multipart/form-data",
+        )
+
+    assert len(set(paths)) == 2
+    for path in paths:
+        assert os.path.dirname(path) == tempfile.gettempdir()
+        assert path.endswith(".wav")
+        assert not os.path.exists(path)
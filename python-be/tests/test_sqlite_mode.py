@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from db.sql import db
+from db.sqlite import WriterQueue, writer_queue
+from models.session import Session
+from models.translation import Translation
+from routes import sessions
+
+API_KEY_HEADER = {"x-api-key": "change-me-in-production"}
+
+
+def test_connections_are_tuned(app):
+    with app.app_context():
+        pragma = lambda name: db.session.execute(text(f"PRAGMA {name}")).scalar()  # noqa: E731
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("foreign_keys") == 1
+        assert pragma("busy_timeout") == 5000
+
+
+def test_concurrent_translate_commits_do_not_lock(app, monkeypatch):
+    monkeypatch.setattr(sessions, "translate_text", lambda text, *a: text.upper())
+    with app.app_context():
+        session = Session(language_a="en-GB", language_b="da-DK")
+        db.session.add(session)
+        db.session.commit()
+        session_id = session.id
+    writes_before = writer_queue.stats()["writes"]
+
+    def post(i):
+        response = app.test_client().post(
+            "/api/v1/sessions/translate",
+            json={"session_id": session_id, "from": "en-GB", "to": "da-DK", "text": f"hi {i}"},
+            headers=API_KEY_HEADER,
+        )
+        return response.status_code
+
+    with ThreadPoolExecutor(8) as pool:
+        statuses = list(pool.map(post, range(40)))
+
+    assert statuses == [200] * 40
+    with app.app_context():
+        assert Translation.query.filter_by(session_id=session_id).count() == 40
+    stats = writer_queue.stats()
+    assert stats["writes"] - writes_before >= 40
+    assert stats["queued"] == 0 and stats["timeouts"] == 0
+
+
+def test_writer_queue_serves_in_arrival_order():
+    queue = WriterQueue()
+    assert queue.acquire(1)
+    order = []
+
+    def writer(name, ready):
+        ready.set()
+        assert queue.acquire(1)
+        order.append(name)
+        queue.release()
+
+    threads = []
+    for name in "abc":
+        ready = threading.Event()
+        thread = threading.Thread(target=writer, args=(name, ready))
+        thread.start()
+        ready.wait()
+        while queue.stats()["queued"] < len(threads) + 1:
+            pass
+        threads.append(thread)
+
+    assert not queue.acquire(0.01)
+    queue.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["a", "b", "c"]
+    assert queue.stats()["timeouts"] == 1
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from services import transcription_service as ts
+from services import vad
+
+
+def test_stitch_removes_overlap_and_half_words():
+    assert (
+        ts.stitch_transcripts(
+            ["We need your passport and the", "passport and the residence permit."]
+        )
+        == "We need your passport and the residence permit."
+    )
+    # The seam cut "residence" in half on both sides
+    assert (
+        ts.stitch_transcripts(
+            ["bring the permit and the resid", "ence the permit and the residence card"]
+        )
+        == "bring the permit and the residence card"
+    )
+    assert ts.stitch_transcripts(["Hello.", "", "How are you?"]) == "Hello. How are you?"
+
+
+def test_chunks_are_transcribed_concurrently(monkeypatch, tmp_path):
+    audio = tmp_path / "long.webm"
+    audio.write_bytes(b"")
+    chunks = [str(tmp_path / f"c{i}.wav") for i in range(4)]
+    monkeypatch.setattr(ts, "MODEL_URL_MAP", {"azure_speech": "http://stt"})
+    monkeypatch.setattr(ts, "TRANSCRIBE_PARALLELISM", 4)
+    monkeypatch.setattr(vad, "prepare_for_stt", lambda path: chunks)
+
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_transcribe(path, model_key, url, from_lang):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return f"part {path[-5]}"
+
+    monkeypatch.setattr(ts, "_transcribe_file", fake_transcribe)
+    text = ts.transcribe_audio(str(audio), "azure_speech", "da-DK")
+    assert text == "part 0 part 1 part 2 part 3"
+    assert peak[0] > 1
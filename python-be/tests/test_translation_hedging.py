@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from services import translation_service as ts
+
+
+@pytest.fixture(autouse=True)
+def hedging(monkeypatch):
+    monkeypatch.setattr(ts, "TRANSLATION_HEDGE_ENABLED", True)
+    monkeypatch.setattr(ts, "TRANSLATION_HEDGE_FALLBACKS", {"slow": "fast"})
+    monkeypatch.setattr(ts, "MODEL_URL_MAP", {"slow": "http://a", "fast": "http://b"})
+    monkeypatch.setattr(ts, "TRANSLATION_HEDGE_MAX_DELAY_MS", 50)
+    monkeypatch.setattr(ts, "_latencies", {})
+    monkeypatch.setattr(ts, "_wins", ts.Counter())
+    monkeypatch.setattr(
+        ts, "_stats", {"requests": 0, "hedged": 0, "failovers": 0, "errors": 0}
+    )
+
+
+def _fake_models(behaviour):
+    def call(text, model_key, from_lang, to_lang, examples=()):
+        delay, result = behaviour[model_key]
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return call
+
+
+def test_slow_primary_is_hedged_and_fallback_wins(monkeypatch):
+    monkeypatch.setattr(
+        ts, "_call_model", _fake_models({"slow": (0.5, "late"), "fast": (0, "hej")})
+    )
+    assert ts.translate_text("hi", "slow", "en-US", "da-DK") == "hej"
+    stats = ts.hedge_stats()
+    assert stats["hedged"] == 1 and stats["wins"] == {"fast": 1}
+
+
+def test_failed_primary_fails_over_without_waiting(monkeypatch):
+    monkeypatch.setattr(ts, "TRANSLATION_HEDGE_MAX_DELAY_MS", 5000)
+    monkeypatch.setattr(
+        ts,
+        "_call_model",
+        _fake_models({"slow": (0, RuntimeError("503")), "fast": (0, "hej")}),
+    )
+    started = time.monotonic()
+    assert ts.translate_text("hi", "slow", "en-US", "da-DK") == "hej"
+    assert time.monotonic() - started < 1
+    assert ts.hedge_stats()["failovers"] == 1
+
+
+def test_delay_follows_recorded_percentile(monkeypatch):
+    monkeypatch.setattr(ts, "TRANSLATION_HEDGE_MAX_DELAY_MS", 3000)
+    monkeypatch.setattr(ts, "TRANSLATION_HEDGE_MIN_DELAY_MS", 100)
+    monkeypatch.setattr(ts, "TRANSLATION_HEDGE_PERCENTILE", 90)
+    for ms in range(1, 101):
+        ts._record_latency("slow", ms * 0.01)
+    assert ts.hedge_delay("slow") == pytest.approx(0.91)
+    assert ts.hedge_delay("unknown") == pytest.approx(3.0)
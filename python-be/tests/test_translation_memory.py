@@ -0,0 +1,94 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.sql import db
+from models.session import Session
+from models.translation import Translation
+from services import retention
+from services import translation_memory as tm
+
+Row = namedtuple("Row", "id from_lang to_lang original translated")
+
+PASSPORT = "Do you have your passport with you today?"
+MEETING = "The meeting is on 12 May at 10"
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    monkeypatch.setattr(tm, "TM_SERVE_THRESHOLD", 0.95)
+    monkeypatch.setattr(tm, "TM_EXAMPLE_THRESHOLD", 0.5)
+    memory = tm.TranslationMemory()
+    for row in [
+        Row(1, "da-DK", "en-GB", "Har du dit pas med i dag?", PASSPORT),
+        Row(2, "da-DK", "en-GB", "Mødet er den 12. maj kl. 10", MEETING),
+        Row(3, "en-GB", "da-DK", "Do you have your passport?", "Har du dit pas?"),
+    ]:
+        memory.add(row)
+    return memory
+
+
+def test_normalised_repeat_is_served(memory):
+    match = memory.lookup("har du dit PAS med i dag", "da-DK", "en-GB")
+    assert match.served == PASSPORT
+    assert match.score == 1.0
+
+
+def test_different_numbers_become_examples_not_answers(memory):
+    match = memory.lookup("Mødet er den 14. maj kl. 10", "da-DK", "en-GB")
+    assert match.served is None
+    assert match.examples == [("Mødet er den 12. maj kl. 10", MEETING)]
+
+
+def test_lookups_stay_within_the_language_pair(memory):
+    assert memory.lookup("Har du dit pas med i dag?", "da-DK", "fr-FR").served is None
+    assert memory.lookup("unrelated words entirely", "da-DK", "en-GB").examples == []
+
+
+def test_oldest_rows_are_evicted_past_the_limit():
+    memory = tm.TranslationMemory(max_rows=2)
+    memory.add(Row(1, "da-DK", "en-GB", "Har du dit pas med i dag?", PASSPORT))
+    memory.add(Row(2, "da-DK", "en-GB", "Mødet er den 12. maj kl. 10", MEETING))
+    memory.add(Row(3, "da-DK", "en-GB", "Godmorgen", "Good morning"))
+
+    assert list(memory.docs) == [2, 3]
+    assert memory.lookup("Har du dit pas med i dag?", "da-DK", "en-GB") == tm.MemoryMatch()
+    assert not any(1 in ids for ids in memory.buckets.values())
+    assert memory.lookup("Godmorgen", "da-DK", "en-GB").served == "Good morning"
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        yield app
+
+
+def _session_with_turn(status, created_at, original, translated):
+    session = Session(status=status, language_a="da-DK", language_b="en-GB", created_at=created_at)
+    db.session.add(session)
+    db.session.flush()
+    db.session.add(
+        Translation(
+            session_id=session.id,
+            from_lang="da-DK",
+            to_lang="en-GB",
+            original=original,
+            translated=translated,
+        )
+    )
+    db.session.commit()
+
+
+def test_archived_turns_are_forgotten(app):
+    old = datetime.utcnow() - timedelta(days=200)
+    _session_with_turn("finished", old, "Har du dit pas med i dag?", PASSPORT)
+    _session_with_turn("ongoing", old, "Godmorgen", "Good morning")
+    memory = tm.TranslationMemory()
+    assert memory.catch_up() == 2
+
+    assert retention.archive_batch(datetime.utcnow()) == 1
+    assert memory.catch_up() == 0
+    assert list(memory.docs) == [2]
+    assert memory.lookup("Har du dit pas med i dag?", "da-DK", "en-GB").served is None
+    assert memory.lookup("Godmorgen", "da-DK", "en-GB").served == "Good morning"
@@ -0,0 +1,57 @@
+import numpy as np
+
+from services import vad
+
+RATE = vad.SAMPLE_RATE
+
+
+def _clip(*parts):
+    """Build a clip from (seconds, is_speech) parts over a faint noise floor."""
+    rng = np.random.default_rng(0)
+    chunks = []
+    for seconds, is_speech in parts:
+        n = int(seconds * RATE)
+        noise = rng.normal(0, 30, n)
+        if is_speech:
+            t = np.arange(n) / RATE
+            noise += 8000 * np.sin(2 * np.pi * 220 * t)
+        chunks.append(noise)
+    return np.concatenate(chunks).astype(np.int16)
+
+
+def test_leading_and_trailing_silence_is_trimmed():
+    samples = _clip((2, False), (1, True), (3, False))
+    segments = vad.detect_speech(samples)
+    assert len(segments) == 1
+    start, end = segments[0]
+    assert 1.6 < start / RATE < 2.0 and 3.0 < end / RATE < 3.4
+
+
+def test_silent_clip_is_not_sent(tmp_path):
+    path = str(tmp_path / "silence.wav")
+    vad.write_wav(_clip((3, False)), path)
+    assert vad.prepare_for_stt(path) == []
+    assert vad.vad_stats()["silent_clips"] >= 1
+
+
+def test_long_pauses_are_shortened_and_clips_split(monkeypatch):
+    samples = _clip((1, True), (4, False), (1, True))
+    segments = vad.detect_speech(samples)
+    assert len(segments) == 2
+
+    rendered = vad.render(samples, segments)
+    pause = vad.VAD_MAX_PAUSE_MS / 1000
+    assert len(rendered) / RATE < 1 + 1 + pause + 4 * vad.VAD_PAD_MS / 1000
+
+    assert len(vad.plan_chunks(segments, 3, 1)) == 2
+    assert len(vad.plan_chunks(segments, 10, 1)) == 1
+
+
+def test_continuous_speech_is_cut_into_overlapping_chunks():
+    segments = [(0, 70 * RATE)]
+    chunks = vad.plan_chunks(segments, max_seconds=30, overlap_seconds=2)
+    assert [c[0] for c in chunks] == [
+        (0, 30 * RATE),
+        (28 * RATE, 58 * RATE),
+        (56 * RATE, 70 * RATE),
+    ]
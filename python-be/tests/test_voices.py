@@ -0,0 +1,82 @@
+import os
+import stat
+from unittest import mock
+
+import pytest
+
+from services import voices
+
+FAKE_VOICES = [
+    {
+        "name": "Microsoft Server Speech Text to Speech Voice (da-DK, ChristelNeural)",
+        "short_name": "da-DK-ChristelNeural",
+        "locale": "da-DK",
+        "local_name": "Christel",
+        "locale_english_name": "Danish (Denmark)",
+        "locale_native_name": "Dansk (Danmark)",
+        "gender": "Female",
+        "voice_type": "OnlineNeural",
+    },
+    {
+        "name": "Microsoft Server Speech Text to Speech Voice (da-DK, JeppeNeural)",
+        "short_name": "da-DK-JeppeNeural",
+        "locale": "da-DK",
+        "local_name": "Jeppe",
+        "locale_english_name": "Danish (Denmark)",
+        "locale_native_name": "Dansk (Danmark)",
+        "gender": "Male",
+        "voice_type": "OnlineNeural",
+    },
+]
+
+
+@pytest.fixture(autouse=True)
+def isolated_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(voices, "VOICE_CATALOG_PATH", str(tmp_path / "voices.json"))
+    monkeypatch.setattr(voices, "_catalog", None)
+    monkeypatch.setattr(voices, "_catalog_mtime", 0.0)
+
+
+def test_catalog_is_fetched_once_and_shared_through_snapshot(monkeypatch):
+    with mock.patch.object(voices, "_fetch_voices", return_value=FAKE_VOICES) as fetch:
+        catalog = voices.get_catalog()
+        # A fresh worker only reads the snapshot written by the first one
+        monkeypatch.setattr(voices, "_catalog", None)
+        assert voices.list_voices() == FAKE_VOICES
+
+    assert fetch.call_count == 1
+    assert [v["local_name"] for v in catalog.by_locale["da-DK"]] == ["Christel", "Jeppe"]
+    assert catalog.by_short_name["da-DK-JeppeNeural"]["gender"] == "Male"
+    assert catalog.locale_names["da-DK"] == {
+        "english_name": "Danish (Denmark)",
+        "native_name": "Dansk (Danmark)",
+    }
+
+
+def test_stale_catalog_is_served_while_refreshing(monkeypatch):
+    voices._write_snapshot(FAKE_VOICES, fetched_at=0.0)
+    with mock.patch.object(voices, "_schedule_refresh") as schedule:
+        assert voices.list_voices() == FAKE_VOICES
+    schedule.assert_called_once()
+
+
+def test_snapshot_is_private_to_the_user(tmp_path, monkeypatch):
+    path = tmp_path / "runtime" / "voices.json"
+    monkeypatch.setattr(voices, "VOICE_CATALOG_PATH", str(path))
+    with mock.patch.object(voices, "_fetch_voices", return_value=FAKE_VOICES):
+        voices.get_catalog()
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(f"{path}.lock").st_mode) == 0o600
+
+    # A snapshot other users could have written is not trusted
+    os.chmod(path, 0o666)
+    assert voices._read_snapshot() == (None, 0.0)
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o1777)
+    monkeypatch.setattr(voices, "VOICE_CATALOG_PATH", str(shared / "voices.json"))
+    with pytest.raises(PermissionError):
+        voices._write_snapshot(FAKE_VOICES, fetched_at=0.0)
+    assert not (shared / "voices.json").exists()
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from app import create_app
+from services import warmup
+
+
+@pytest.fixture(autouse=True)
+def state(monkeypatch):
+    monkeypatch.setattr(warmup, "_state", "cold")
+    monkeypatch.setattr(warmup, "_steps", {})
+    monkeypatch.setattr(warmup, "_worker_hooks", [])
+    monkeypatch.setattr(warmup, "_preloading", False)
+    # No network: the master steps count as done
+    monkeypatch.setattr(warmup, "_master_warmed", True)
+    monkeypatch.setattr(warmup, "_load_worker_caches", lambda: None)
+    monkeypatch.setattr(warmup, "MODEL_URL_MAP", {})
+
+
+@pytest.fixture
+def app(tmp_path):
+    return create_app(
+        {"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/t.db"}
+    )
+
+
+def test_ready_only_after_worker_warmup(app):
+    client = app.test_client()
+    response = client.get("/api/v1/misc/ready")
+    assert response.status_code == 503
+
+    warmup.warm_worker(app)
+
+    response = client.get("/api/v1/misc/ready")
+    assert response.status_code == 200
+    steps = response.get_json()["steps"]
+    assert steps["db_connections"]["ok"]
+    assert steps["provider_connections"]["detail"] == "0 hosts"
+
+
+def test_failed_or_slow_steps_do_not_block_readiness(app, monkeypatch):
+    def boom():
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(warmup, "_open_provider_connections", boom)
+    monkeypatch.setattr(warmup, "_load_worker_caches", lambda: time.sleep(1))
+    monkeypatch.setattr(warmup, "WARMUP_TIMEOUT_SECONDS", 0.1)
+
+    warmup.warm_worker(app)
+
+    assert warmup.is_ready()
+    steps = warmup.warmup_report()["steps"]
+    assert steps["provider_connections"] == {
+        "ok": False,
+        "error": "provider down",
+        "seconds": steps["provider_connections"]["seconds"],
+    }
+    assert steps["caches"]["error"] == "timed out"
+
+
+def test_background_threads_wait_for_the_fork_when_preloaded(monkeypatch):
+    started = []
+    warmup.in_each_worker(lambda: started.append("now"))
+    assert started == ["now"]
+
+    warmup.mark_preloading()
+    warmup.in_each_worker(lambda: started.append("worker"))
+    assert started == ["now"]
+    warmup.after_fork()
+    assert started == ["now", "worker"]
+
+
+def test_provider_origins_are_deduplicated(monkeypatch):
+    monkeypatch.setattr(
+        warmup,
+        "MODEL_URL_MAP",
+        {
+            "gpt4o": "https://res.openai.azure.com/openai/deployments/a/chat",
+            "gpt35": "https://res.openai.azure.com/openai/deployments/b/chat",
+            "local": "http://ollama:11434/api/generate",
+            "missing": None,
+        },
+    )
+    assert warmup._provider_origins() == ["http://ollama:11434", "https://res.openai.azure.com"]
@@ -3,9 +3,12 @@ import ChatPanel, { ChatMessage } from './ChatPanel'
 import { SessionData } from '../App'
 import { API_URL, API_KEY } from '../config'
 import { useFetchWithAuth } from '../lib/fetchWithAuth'
+import { followSessionEvents } from '../lib/sessionEvents'
+import { postIdempotent } from '../lib/postIdempotent'
 import { useTTS } from '../hooks/useTTS'
 
 interface Translation {
+  id?: number
   created_at: string
   from: string
   to: string
@@ -44,43 +47,37 @@ const SessionView: React.FC<SessionViewProps> = ({
 
   useEffect(() => {
     if (!sessionData) return
+    const controller = new AbortController()
 
-    const fetchSession = async () => {
-      const res = await fetchWithAuth(
-        `${API_URL}/sessions/${sessionData.session_id}`,
-        {
-          headers: { 'Content-Type': 'application/json', 'x-api-key': API_KEY },
-        },
-      )
-      const data = await res.json()
-
-      if (data.translations) {
+    // New turns are pushed by the server; both screens see them at once
+    followSessionEvents(
+      sessionData.session_id,
+      fetchWithAuth,
+      ({ event, data }) => {
+        if (event !== 'turn') return
         setTranslations((prev) => {
-          const real = data.translations
+          if (prev.some((t) => t.id === data.id)) return prev
+          const real = prev.filter((msg) => !msg.tempId)
           const optimistic = prev.filter((msg) => msg.tempId)
 
           // Keep optimistic messages that haven’t been fulfilled yet
           const stillPending = optimistic.filter(
             (opt) =>
-              !real.some(
-                (realMsg: { original: string; from: string; to: string }) =>
-                  realMsg.original === opt.original &&
-                  realMsg.from === opt.from &&
-                  realMsg.to === opt.to,
+              !(
+                data.original === opt.original &&
+                data.from === opt.from &&
+                data.to === opt.to
               ) && !opt.tempId?.includes('-typing'), // remove typing if real message is in
           )
 
-          return [...real, ...stillPending]
+          return [...real, data, ...stillPending]
         })
-      }
-
-      setProcessingA(false)
-      setProcessingB(false)
-    }
-
-    fetchSession()
-    const interval = setInterval(fetchSession, 1000)
-    return () => clearInterval(interval)
+        setProcessingA(false)
+        setProcessingB(false)
+      },
+      controller.signal,
+    )
+    return () => controller.abort()
   }, [sessionData])
 
   if (!sessionData) {
@@ -130,11 +127,13 @@ const SessionView: React.FC<SessionViewProps> = ({
     if (text) formData.append('text', text)
     if (audioFile) formData.append('audio', audioFile)
 
-    await fetchWithAuth(`${API_URL}/sessions/translate`, {
-      method: 'POST',
+    await postIdempotent(fetchWithAuth, `${API_URL}/sessions/translate`, {
       headers: { 'x-api-key': API_KEY },
       body: formData,
     })
+    // Normally cleared by the pushed turn; also covers failed requests
+    setProcessingA(false)
+    setProcessingB(false)
   }
 
   const transcribeOnly = async (lang: string, file: File): Promise<string> => {
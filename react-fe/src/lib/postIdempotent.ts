@@ -0,0 +1,33 @@
+/** Anything that behaves like the wrapped fetchWithAuth we use everywhere */
+type Fetcher = (input: RequestInfo, init?: RequestInit) => Promise<Response>
+
+/**
+ * POST that survives flaky Wi-Fi.
+ *
+ * Every attempt carries the same `Idempotency-Key`, so when the connection
+ * drops (or the BE says an identical request is still running, 409) the
+ * retry is answered with the first attempt's response – the turn is not
+ * transcribed, translated and saved twice.
+ *
+ * @param attempts – Total tries, including the first
+ */
+export async function postIdempotent(
+    fetcher: Fetcher,
+    url: string,
+    init: RequestInit,
+    attempts = 3,
+): Promise<Response> {
+    const headers = new Headers(init.headers || {})
+    headers.set('Idempotency-Key', crypto.randomUUID())
+
+    for (let attempt = 1; ; attempt++) {
+        try {
+            const res = await fetcher(url, { ...init, method: 'POST', headers })
+            if (res.status !== 409 || attempt >= attempts) return res
+        } catch (err) {
+            // fetch only rejects when no response arrived
+            if (attempt >= attempts) throw err
+        }
+        await new Promise((resolve) => setTimeout(resolve, 500 * attempt))
+    }
+}
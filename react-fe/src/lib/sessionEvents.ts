@@ -0,0 +1,78 @@
+import { API_URL, API_KEY } from '../config'
+
+export interface SessionEvent {
+  event: string
+  id?: number
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  data: any
+}
+
+type FetchFn = (input: RequestInfo, init?: RequestInit) => Promise<Response>
+
+const RECONNECT_DELAY_MS = 2000
+
+function parseFrame(frame: string): SessionEvent | null {
+  let event = 'message'
+  let id: number | undefined
+  const data: string[] = []
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event: ')) event = line.slice(7)
+    else if (line.startsWith('id: ')) id = Number(line.slice(4))
+    else if (line.startsWith('data: ')) data.push(line.slice(6))
+  }
+  // keep-alive comments and retry hints carry no data
+  if (!data.length) return null
+  return { event, id, data: JSON.parse(data.join('\n')) }
+}
+
+/**
+ * Follows `GET /sessions/<id>/events` (server-sent events) until `signal`
+ * aborts. Every reconnect sends the last turn id as Last-Event-ID, so turns
+ * written in between are replayed and none is missed.
+ *
+ * EventSource cannot send our auth headers, hence fetch + a tiny parser.
+ */
+export async function followSessionEvents(
+  sessionId: string,
+  fetchWithAuth: FetchFn,
+  onEvent: (event: SessionEvent) => void,
+  signal: AbortSignal,
+): Promise<void> {
+  let lastId = 0
+  while (!signal.aborted) {
+    let failed = false
+    let delay = RECONNECT_DELAY_MS
+    try {
+      const res = await fetchWithAuth(`${API_URL}/sessions/${sessionId}/events`, {
+        headers: { 'x-api-key': API_KEY, 'Last-Event-ID': String(lastId) },
+        signal,
+      })
+      // 503: the server has all the streams it can hold; come back when told
+      const retryAfter = Number(res.headers.get('Retry-After'))
+      if (res.status === 503 && retryAfter > 0) delay = retryAfter * 1000
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`)
+
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+        let end: number
+        while ((end = buffer.indexOf('\n\n')) >= 0) {
+          const event = parseFrame(buffer.slice(0, end))
+          buffer = buffer.slice(end + 2)
+          if (!event) continue
+          if (event.id !== undefined) lastId = event.id
+          onEvent(event)
+        }
+      }
+    } catch (err) {
+      if (signal.aborted) return
+      console.warn('[sessionEvents] stream interrupted', err)
+      failed = true
+    }
+    // The server ends streams periodically; only back off after an error
+    if (failed) await new Promise((resolve) => setTimeout(resolve, delay))
+  }
+}
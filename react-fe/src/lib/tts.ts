@@ -1,4 +1,5 @@
 import { API_KEY, API_URL } from '../config'
+import { postIdempotent } from './postIdempotent'
 
 /** Anything that behaves like the wrapped fetchWithAuth we use everywhere */
 type Fetcher = (input: RequestInfo, init?: RequestInit) => Promise<Response>
@@ -29,8 +30,7 @@ export async function playTTS(
     if (!text.trim()) return
 
     // ---------- 1️⃣  hit the BE -------------------------------------------------
-    const res = await fetcher(`${API_URL}/sessions/tts`, {
-        method: 'POST',
+    const res = await postIdempotent(fetcher, `${API_URL}/sessions/tts`, {
         headers: {
             'Content-Type': 'application/json',
             'x-api-key': API_KEY,